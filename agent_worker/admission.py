@@ -0,0 +1,282 @@
+"""
+Load-aware job admission.
+
+With default `WorkerOptions` the worker accepted every room it was
+offered, whatever CPU, memory or session capacity was left. A spike could
+then push a node past the point where every session on it degrades.
+`LoadCalculator` combines four signals into one load figure:
+
+- active sessions: running jobs, plus jobs accepted that have not
+  started yet, over `max_sessions`. An accepted job holds a reservation
+  until the running count goes up (or, as a backstop, for
+  `reservation_ttl` seconds), so it is never counted twice.
+- event-loop lag of the worker process, over `max_lag`
+- RSS of the worker process and its job processes, over `max_rss_mb`
+- node CPU usage, from `/proc/stat`, over `max_cpu`
+
+Load is the largest of the four ratios, so whichever resource runs out
+first limits admission. `load_fnc` reports it to the LiveKit server,
+which stops dispatching to the worker above `load_threshold`.
+`request_fnc` decides each job:
+
+- accept below `accept_below`
+- reject at `reject_above` or more, so that another worker takes the job
+- in between, defer. The decision is re-checked every `defer_interval`
+  seconds, for up to `max_defer` seconds. The job is accepted if load
+  has fallen below `accept_below`, and rejected otherwise.
+
+Thresholds come from a node-size preset (`WORKER_NODE_SIZE`: small,
+medium or large). Individual limits can be overridden with
+`WORKER_MAX_SESSIONS`, `WORKER_MAX_RSS_MB` and `WORKER_MAX_CPU`.
+"""
+
+import asyncio
+import os
+import resource
+import time
+from collections import deque
+from dataclasses import dataclass, asdict, replace
+from typing import Any, Callable, Deque, Dict, Optional
+
+from utils.py_logger.adaptive import EventLoopLagMonitor
+
+
+@dataclass(frozen=True)
+class NodeProfile:
+    """Admission limits for one node size."""
+    max_sessions: int
+    max_rss_mb: float
+    max_lag: float = 0.2  # seconds
+    max_cpu: float = 0.85  # fraction of all cores
+    accept_below: float = 0.75
+    reject_above: float = 0.95
+    defer_interval: float = 0.5
+    max_defer: float = 3.0
+    reservation_ttl: float = 15.0
+
+
+NODE_PROFILES = {
+    "small": NodeProfile(max_sessions=4, max_rss_mb=1536),    # 2 vCPU, 2 GB
+    "medium": NodeProfile(max_sessions=12, max_rss_mb=6144),  # 4 vCPU, 8 GB
+    "large": NodeProfile(max_sessions=30, max_rss_mb=13312),  # 8 vCPU, 16 GB
+}
+
+
+def node_profile(size: Optional[str] = None) -> NodeProfile:
+    """The preset for `size` (default `WORKER_NODE_SIZE` or medium), with env overrides applied."""
+    size = (size or os.getenv("WORKER_NODE_SIZE", "medium")).lower()
+    if size not in NODE_PROFILES:
+        raise ValueError(f"Unknown node size: {size} (expected one of {', '.join(NODE_PROFILES)})")
+    overrides = {}
+    for field_name, env_name, cast in (("max_sessions", "WORKER_MAX_SESSIONS", int),
+                                       ("max_rss_mb", "WORKER_MAX_RSS_MB", float),
+                                       ("max_cpu", "WORKER_MAX_CPU", float)):
+        if os.getenv(env_name):
+            overrides[field_name] = cast(os.getenv(env_name))
+    return replace(NODE_PROFILES[size], **overrides)
+
+
+class CpuSampler:
+    """Node CPU usage between successive samples, from /proc/stat."""
+
+    def __init__(self, smoothing: float = 0.5):
+        self.smoothing = smoothing
+        self.usage = 0.0
+        self._last = self._read()
+
+    @staticmethod
+    def _read():
+        try:
+            with open("/proc/stat") as f:
+                values = [int(value) for value in f.readline().split()[1:]]
+        except (OSError, ValueError):
+            return None
+        idle = values[3] + (values[4] if len(values) > 4 else 0)  # idle + iowait
+        return sum(values), idle
+
+    def sample(self) -> float:
+        """Smoothed fraction of all cores busy since the previous sample."""
+        current = self._read()
+        if current is None or self._last is None:
+            # No /proc: fall back to the 1-minute load average
+            try:
+                usage = os.getloadavg()[0] / (os.cpu_count() or 1)
+            except OSError:
+                return self.usage
+        else:
+            total = current[0] - self._last[0]
+            if total <= 0:
+                return self.usage
+            usage = 1.0 - (current[1] - self._last[1]) / total
+            self._last = current
+        self.usage += self.smoothing * (min(usage, 1.0) - self.usage)
+        return self.usage
+
+
+def process_tree_rss_mb(pid: Optional[int] = None) -> float:
+    """RSS of a process and all of its descendants (the worker and its job processes)."""
+    pid = pid or os.getpid()
+    try:
+        children: Dict[int, list] = {}
+        rss_pages: Dict[int, int] = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    stat = f.read()
+                with open(f"/proc/{entry}/statm") as f:
+                    rss_pages[int(entry)] = int(f.read().split()[1])
+            except (OSError, ValueError, IndexError):
+                continue
+            # The command name may contain spaces; fields resume after its ')'
+            parent = int(stat[stat.rindex(")") + 2:].split()[1])
+            children.setdefault(parent, []).append(int(entry))
+    except OSError:
+        # No /proc: peak RSS of this process (KB on Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        total += rss_pages.get(current, 0)
+        stack.extend(children.get(current, ()))
+    return total * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+@dataclass
+class LoadSample:
+    """One load reading and the inputs it came from."""
+    load: float
+    limited_by: str
+    sessions: int
+    event_loop_lag: float
+    rss_mb: float
+    cpu: float
+
+
+class LoadCalculator:
+    """Combines session count, loop lag, RSS and CPU into a load figure for admission."""
+
+    def __init__(self, profile: Optional[NodeProfile] = None,
+                 active_sessions: Optional[Callable[[], int]] = None,
+                 cpu: Optional[Callable[[], float]] = None,
+                 rss_mb: Optional[Callable[[], float]] = None,
+                 min_interval: float = 1.0, logger=None):
+        self.profile = profile or node_profile()
+        self.active_sessions = active_sessions
+        self.cpu = cpu or CpuSampler().sample
+        self.rss_mb = rss_mb or process_tree_rss_mb
+        self.min_interval = min_interval
+        self.logger = logger
+        self.lag_monitor: Optional[EventLoopLagMonitor] = None
+        self.last: Optional[LoadSample] = None
+
+        self._worker: Any = None
+        self._last_time = 0.0
+        self._reservations: Deque[float] = deque()
+        self._running = 0
+        self._accepted = 0
+        self._deferred = 0
+        self._rejected = 0
+
+    def _sessions(self) -> int:
+        """Running jobs plus accepted jobs that have not started yet."""
+        now = time.monotonic()
+        reservations = self._reservations
+        while reservations and now - reservations[0] > self.profile.reservation_ttl:
+            reservations.popleft()
+        if self.active_sessions is not None:
+            running = self.active_sessions()
+        elif self._worker is not None:
+            running = len(getattr(self._worker, "active_jobs", ()))
+        else:
+            running = 0
+        # Jobs that started since the last reading were reserved when accepted
+        for _ in range(min(running - self._running, len(reservations))):
+            reservations.popleft()
+        self._running = running
+        return running + len(reservations)
+
+    def _lag(self) -> float:
+        if self.lag_monitor is None:
+            try:
+                self.lag_monitor = EventLoopLagMonitor(asyncio.get_running_loop())
+            except RuntimeError:
+                return 0.0
+        return self.lag_monitor.sample()
+
+    def sample(self, force: bool = False) -> LoadSample:
+        """Current load; readings are reused for `min_interval` seconds unless forced."""
+        now = time.monotonic()
+        if not force and self.last is not None and now - self._last_time < self.min_interval:
+            return self.last
+        profile = self.profile
+        sessions, lag, rss, cpu = self._sessions(), self._lag(), self.rss_mb(), self.cpu()
+        ratios = {
+            'sessions': sessions / profile.max_sessions,
+            'event_loop_lag': lag / profile.max_lag,
+            'rss': rss / profile.max_rss_mb,
+            'cpu': cpu / profile.max_cpu,
+        }
+        limited_by = max(ratios, key=ratios.get)
+        self.last = LoadSample(load=round(ratios[limited_by], 3), limited_by=limited_by, sessions=sessions,
+                               event_loop_lag=round(lag, 4), rss_mb=round(rss, 1), cpu=round(cpu, 3))
+        self._last_time = now
+        return self.last
+
+    def load_fnc(self, worker: Any = None) -> float:
+        """`WorkerOptions.load_fnc`: load reported to the server, 0 to 1."""
+        if worker is not None:
+            self._worker = worker
+        return min(self.sample().load, 1.0)
+
+    def decide(self, load: float) -> str:
+        """accept, defer or reject for a given load."""
+        if load < self.profile.accept_below:
+            return "accept"
+        if load >= self.profile.reject_above:
+            return "reject"
+        return "defer"
+
+    async def request_fnc(self, request: Any):
+        """`WorkerOptions.request_fnc`: accept, defer or reject a job offer."""
+        sample = self.sample(force=True)
+        decision = self.decide(sample.load)
+        waited = 0.0
+        if decision == "defer":
+            self._deferred += 1
+            while decision == "defer" and waited < self.profile.max_defer:
+                await asyncio.sleep(self.profile.defer_interval)
+                waited += self.profile.defer_interval
+                sample = self.sample(force=True)
+                decision = self.decide(sample.load)
+            if decision == "defer":
+                decision = "reject"
+
+        job_id = getattr(getattr(request, "job", None), "id", None)
+        if decision == "accept":
+            # Count the job before it shows up in active_jobs, so a burst
+            # of offers cannot all be accepted against the same reading
+            self._reservations.append(time.monotonic())
+            self._accepted += 1
+            await request.accept()
+        else:
+            self._rejected += 1
+            await request.reject()
+        if self.logger:
+            log = self.logger.info if decision == "accept" else self.logger.warning
+            log(f"Job {'accepted' if decision == 'accept' else 'rejected'}", job_id=job_id,
+                deferred_seconds=waited, **asdict(sample))
+        return decision
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Admission counters and the latest load sample."""
+        return {
+            'accepted': self._accepted,
+            'deferred': self._deferred,
+            'rejected': self._rejected,
+            'reserved': len(self._reservations),
+            **(asdict(self.last) if self.last else {})
+        }
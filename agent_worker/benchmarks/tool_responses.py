@@ -0,0 +1,216 @@
+"""
+Tool response cost: rebuilt per call versus pre-built lookup.
+
+"rebuilt" is how the tools built their responses before `tools.catalog`:
+the whole catalogue dict literal and the formatted message on every call.
+"lookup" is what the tools do now, including the cached key resolution.
+Tool latency adds to every model function-call round trip. Only the
+response construction is timed here; livekit's own wrapping is the same
+for both. The uncached cost of resolving loosely written names through
+`CatalogueIndex` is reported separately.
+
+Usage:
+    python agent_worker/benchmarks/tool_responses.py --calls 200000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.catalog import (
+    ANXIETY_ASSESSMENT_RESPONSE,
+    BREATHING_INDEX,
+    SLEEP_ASSESSMENT_RESPONSE,
+    breathing_response,
+    grounding_response,
+    meditation_response,
+)
+
+
+# The previous implementations, kept as the baseline
+
+def rebuilt_breathing_exercise(exercise_type: str = "box_breathing"):
+    """Guide the user through a breathing exercise"""
+    exercises = {
+        "box_breathing": {
+            "name": "Box Breathing (4-4-4-4)",
+            "instructions": "Inhale for 4 counts, hold for 4 counts, exhale for 4 counts, hold for 4 counts. Repeat this cycle.",
+            "benefits": "Calms the nervous system, reduces stress and anxiety, improves focus",
+        },
+        "4_7_8": {
+            "name": "4-7-8 Breathing",
+            "instructions": "Inhale for 4 counts, hold for 7 counts, exhale for 8 counts. Repeat 4 times.",
+            "benefits": "Promotes relaxation, helps with sleep, reduces anxiety",
+        },
+        "diaphragmatic": {
+            "name": "Diaphragmatic Breathing",
+            "instructions": "Place one hand on your chest and one on your belly. Breathe deeply so your belly rises more than your chest.",
+            "benefits": "Improves oxygen intake, reduces stress, strengthens diaphragm",
+        },
+    }
+
+    exercise = exercises.get(exercise_type, exercises["box_breathing"])
+
+    return {
+        "exercise_name": exercise["name"],
+        "instructions": exercise["instructions"],
+        "benefits": exercise["benefits"],
+        "message": f"Let's practice {exercise['name']}. {exercise['instructions']} This technique helps with {exercise['benefits']}.",
+    }
+
+
+def rebuilt_grounding_technique(technique: str = "5_4_3_2_1"):
+    """Guide the user through a grounding technique"""
+    techniques = {
+        "5_4_3_2_1": {
+            "name": "5-4-3-2-1 Grounding",
+            "instructions": "Name 5 things you can see, 4 things you can touch, 3 things you can hear, 2 things you can smell, and 1 thing you can taste.",
+            "benefits": "Brings awareness to the present moment, reduces anxiety and panic",
+        },
+        "body_scan": {
+            "name": "Body Scan",
+            "instructions": "Slowly scan your body from head to toe, noticing any sensations, tension, or relaxation in each part.",
+            "benefits": "Increases body awareness, promotes relaxation, reduces stress",
+        },
+        "mindful_walking": {
+            "name": "Mindful Walking",
+            "instructions": "Walk slowly and deliberately, paying attention to each step, the feeling of your feet touching the ground.",
+            "benefits": "Connects mind and body, reduces anxiety, improves focus",
+        },
+    }
+
+    technique_info = techniques.get(technique, techniques["5_4_3_2_1"])
+
+    return {
+        "technique_name": technique_info["name"],
+        "instructions": technique_info["instructions"],
+        "benefits": technique_info["benefits"],
+        "message": f"Let's practice {technique_info['name']}. {technique_info['instructions']} This helps with {technique_info['benefits']}.",
+    }
+
+
+def rebuilt_meditation_guide(meditation_type: str = "mindfulness", duration: str = "5 minutes"):
+    """Guide the user through a meditation session"""
+    meditations = {
+        "mindfulness": {
+            "name": "Mindfulness Meditation",
+            "instructions": "Focus on your breath. When your mind wanders, gently bring it back to your breath without judgment.",
+            "benefits": "Reduces stress, improves focus, increases self-awareness",
+        },
+        "loving_kindness": {
+            "name": "Loving-Kindness Meditation",
+            "instructions": "Send wishes of peace, happiness, and well-being to yourself, loved ones, and all beings.",
+            "benefits": "Increases compassion, reduces negative emotions, improves relationships",
+        },
+        "body_scan": {
+            "name": "Body Scan Meditation",
+            "instructions": "Systematically focus attention on different parts of your body, releasing tension as you go.",
+            "benefits": "Reduces physical tension, improves body awareness, promotes relaxation",
+        },
+    }
+
+    meditation = meditations.get(meditation_type, meditations["mindfulness"])
+
+    return {
+        "meditation_name": meditation["name"],
+        "duration": duration,
+        "instructions": meditation["instructions"],
+        "benefits": meditation["benefits"],
+        "message": f"Let's practice {meditation['name']} for {duration}. {meditation['instructions']} This meditation helps with {meditation['benefits']}.",
+    }
+
+
+def rebuilt_sleep_assessment():
+    """Conduct a brief sleep assessment to understand the user's sleep patterns"""
+    return {
+        "assessment_questions": [
+            "What time do you usually go to bed?",
+            "What time do you usually wake up?",
+            "How long does it typically take you to fall asleep?",
+            "How many times do you wake up during the night?",
+            "How would you rate your sleep quality (1-10)?",
+            "What factors do you think affect your sleep?",
+            "Do you use any devices (phone, TV) before bed?",
+            "What's your typical evening routine?",
+        ],
+        "message": "I'd like to understand your sleep patterns better. Let's go through some questions to help me provide personalized sleep guidance.",
+    }
+
+
+def rebuilt_anxiety_assessment():
+    """Conduct a brief anxiety assessment to understand the user's anxiety patterns"""
+    return {
+        "assessment_questions": [
+            "How would you describe your anxiety (physical sensations, thoughts, behaviors)?",
+            "What situations or triggers tend to cause anxiety for you?",
+            "How often do you experience anxiety (daily, weekly, occasionally)?",
+            "How does anxiety affect your daily life and activities?",
+            "What coping strategies have you tried in the past?",
+            "What would you like to achieve in managing your anxiety?",
+            "Do you have any specific fears or worries that are particularly challenging?",
+        ],
+        "message": "I'd like to understand your experience with anxiety better. Let's explore your patterns so I can provide the most helpful support.",
+    }
+
+
+def lookup_calls():
+    """The current tool bodies, by tool name."""
+    return {
+        "breathing_exercise": lambda: breathing_response("4_7_8"),
+        "grounding_technique": lambda: grounding_response("body_scan"),
+        "meditation_guide": lambda: meditation_response("loving_kindness", "10 minutes"),
+        "sleep_assessment": lambda: SLEEP_ASSESSMENT_RESPONSE,
+        "anxiety_assessment": lambda: ANXIETY_ASSESSMENT_RESPONSE,
+    }
+
+
+def rebuilt_calls():
+    """The previous tool bodies, by tool name."""
+    return {
+        "breathing_exercise": lambda: rebuilt_breathing_exercise("4_7_8"),
+        "grounding_technique": lambda: rebuilt_grounding_technique("body_scan"),
+        "meditation_guide": lambda: rebuilt_meditation_guide("loving_kindness", "10 minutes"),
+        "sleep_assessment": rebuilt_sleep_assessment,
+        "anxiety_assessment": rebuilt_anxiety_assessment,
+    }
+
+
+def without_match(response: dict) -> dict:
+    """A tool response without the key resolution fields."""
+    return {key: value for key, value in response.items() if key not in ("match_confidence", "available_options")}
+
+
+def _time(call, calls: int) -> float:
+    """Mean ns per call."""
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        call()
+    return (time.perf_counter_ns() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tool response cost: rebuilt per call versus pre-built lookup.")
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+
+    lookups = lookup_calls()
+    print(f"{'tool':<22}{'rebuilt ns':>12}{'lookup ns':>12}{'speedup':>10}")
+    for name, rebuilt in rebuilt_calls().items():
+        lookup = lookups[name]
+        assert without_match(lookup()) == rebuilt()
+        before, after = _time(rebuilt, args.calls), _time(lookup, args.calls)
+        print(f"{name:<22}{before:>12.0f}{after:>12.0f}{before / after:>9.1f}x")
+
+    print(f"\n{'uncached resolution':<26}{'ns':>8}  match")
+    for query in ("4_7_8", "Box breathing", "box breathing exercise", "belly", "diaphragm breathing",
+                  "something else"):
+        match = BREATHING_INDEX.resolve(query)
+        elapsed = _time(lambda: BREATHING_INDEX.resolve(query), max(1, args.calls // 10))
+        print(f"{query!r:<26}{elapsed:>8.0f}  {match.key} ({match.method}, {match.confidence})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Tool result size per result mode: full, structured-only and message-only.
+
+The realtime model reads every tool result after the call, so result
+tokens add to each tool round trip. Every catalogue response (all
+exercises, techniques, meditations at their pre-built durations, and
+both assessments) is counted in each mode and totalled per tool.
+Tokens are counted with tiktoken (o200k_base) when it is installed, and
+estimated like `turn_metrics.estimate_tokens` otherwise.
+
+Usage:
+    python agent_worker/benchmarks/tool_results.py
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.catalog import (
+    ANXIETY_ASSESSMENT_RESPONSES,
+    BREATHING_EXERCISES,
+    GROUNDING_TECHNIQUES,
+    MEDITATION_DURATIONS,
+    MEDITATIONS,
+    RESULT_MODES,
+    SLEEP_ASSESSMENT_RESPONSES,
+    breathing_response,
+    grounding_response,
+    meditation_response,
+)
+from turn_metrics import estimate_tokens
+
+
+def tool_results(mode: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Every pre-built response of each catalogue tool in a result mode."""
+    return {
+        "breathing_exercise": [breathing_response(key, mode) for key in BREATHING_EXERCISES],
+        "grounding_technique": [grounding_response(key, mode) for key in GROUNDING_TECHNIQUES],
+        "meditation_guide": [meditation_response(key, duration, mode)
+                             for key in MEDITATIONS for duration in MEDITATION_DURATIONS],
+        "sleep_assessment": [SLEEP_ASSESSMENT_RESPONSES[mode]],
+        "anxiety_assessment": [ANXIETY_ASSESSMENT_RESPONSES[mode]],
+    }
+
+
+def token_counter() -> Callable[[Any], int]:
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("o200k_base")
+        return lambda result: len(encoding.encode(json.dumps(result, separators=(",", ":"))))
+    except ImportError:
+        return estimate_tokens
+
+
+def measure_tokens(count: Callable[[Any], int] = None) -> Dict[str, Dict[str, float]]:
+    """Mean result tokens per tool, per mode."""
+    count = count or token_counter()
+    results: Dict[str, Dict[str, float]] = {}
+    for mode in RESULT_MODES:
+        for tool, responses in tool_results(mode).items():
+            results.setdefault(tool, {})[mode] = sum(count(response) for response in responses) / len(responses)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tool result tokens per result mode.")
+    parser.parse_args()
+
+    print(f"{'tool':<22}" + "".join(f"{mode:>18}" for mode in RESULT_MODES) + "   (mean tokens per result)")
+    results = measure_tokens()
+    for tool, row in results.items():
+        print(f"{tool:<22}" + "".join(f"{row[mode]:>18.0f}" for mode in RESULT_MODES))
+    totals = {mode: sum(row[mode] for row in results.values()) for mode in RESULT_MODES}
+    print(f"{'all tools':<22}" + "".join(
+        f"{totals[mode]:>11.0f} ({totals[mode] / totals['full'] - 1:+.0%})" for mode in RESULT_MODES))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Tool schema size per role: every tool versus the role's manifest subset.
+
+For each role, the function-tool schemas sent to the model are built for
+all seven tools and for the role's subset in `tools.manifest`, and their
+tokens are counted. The AVAILABLE TOOLS section of the system prompt is
+counted too. Tokens are counted with tiktoken (o200k_base) when it is
+installed, and estimated at 4 characters per token otherwise.
+
+Schemas come from livekit-agents when it is installed. Otherwise they are
+derived from the tool definitions in `tools/tools.py` (name, docstring,
+typed parameters with defaults), in the same OpenAI function format.
+
+With `--live`, tool selection is also timed against the OpenAI Chat
+Completions API (needs `openai` and `OPENAI_API_KEY`). Each role's
+request is sent `--requests` times with all tools and with the subset,
+and the median time to the model's tool call is reported.
+
+Usage:
+    python agent_worker/benchmarks/tool_schemas.py
+    python agent_worker/benchmarks/tool_schemas.py --live --requests 10 --model gpt-4o-mini
+"""
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.manifest import ALL_TOOLS, ROLE_TOOLS, tool_names, tool_prompt_section
+
+TOOLS_SOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools", "tools.py")
+
+_JSON_TYPES = {"str": "string", "int": "integer", "float": "number", "bool": "boolean"}
+
+# A user message per role that should lead to one of its tools
+ROLE_REQUESTS = {
+    "therapist": "I'm feeling overwhelmed right now, can you help me calm down?",
+    "meditation": "Can you guide me through a short loving-kindness meditation?",
+    "sleep": "I can't fall asleep at night. Can you assess my sleep?",
+    "anxiety": "My anxiety has been really bad this week, can we figure out what triggers it?",
+}
+
+
+def source_tool_schemas(path: str = TOOLS_SOURCE) -> Dict[str, Dict[str, Any]]:
+    """OpenAI function schemas derived from the `@function_tool` definitions in a module's source."""
+    with open(path) as f:
+        module = ast.parse(f.read())
+    schemas = {}
+    for node in module.body:
+        if not isinstance(node, ast.AsyncFunctionDef):
+            continue
+        if not any(getattr(decorator, "id", None) == "function_tool" for decorator in node.decorator_list):
+            continue
+        args = node.args.args[1:]  # skip the RunContext
+        defaults = [None] * (len(args) - len(node.args.defaults)) + list(node.args.defaults)
+        properties, required = {}, []
+        for arg, default in zip(args, defaults):
+            annotation = getattr(arg.annotation, "id", "str")
+            properties[arg.arg] = {"type": _JSON_TYPES.get(annotation, "string")}
+            if default is None:
+                required.append(arg.arg)
+            else:
+                properties[arg.arg]["default"] = ast.literal_eval(default)
+        schemas[node.name] = {
+            "type": "function",
+            "function": {
+                "name": node.name,
+                "description": ast.get_docstring(node) or "",
+                "parameters": {"type": "object", "properties": properties, "required": required},
+            },
+        }
+    return schemas
+
+
+def livekit_tool_schemas() -> Dict[str, Dict[str, Any]]:
+    """Schemas as livekit-agents builds them for the tools in `tools.tools`."""
+    from livekit.agents.llm.utils import build_legacy_openai_schema
+    from tools import tools
+
+    return {name: {"type": "function", "function": build_legacy_openai_schema(getattr(tools, name))}
+            for name in ALL_TOOLS}
+
+
+def tool_schemas() -> Dict[str, Dict[str, Any]]:
+    try:
+        return livekit_tool_schemas()
+    except ImportError:
+        return source_tool_schemas()
+
+
+def token_counter() -> Callable[[str], int]:
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("o200k_base")
+        return lambda text: len(encoding.encode(text))
+    except ImportError:
+        return lambda text: (len(text) + 3) // 4
+
+
+def schema_tokens(schemas: Dict[str, Dict[str, Any]], names, count: Callable[[str], int]) -> int:
+    """Tokens of the tool list as sent with a request."""
+    return count(json.dumps([schemas[name] for name in names], separators=(",", ":")))
+
+
+def measure_tokens(count: Callable[[str], int] = None) -> Dict[str, Dict[str, int]]:
+    """Per role: schema and prompt-section tokens for every tool and for the subset."""
+    count = count or token_counter()
+    schemas = tool_schemas()
+    results = {}
+    for role in ROLE_TOOLS:
+        results[role] = {
+            'tools_all': len(ALL_TOOLS),
+            'tools_subset': len(tool_names(role)),
+            'schema_all': schema_tokens(schemas, ALL_TOOLS, count),
+            'schema_subset': schema_tokens(schemas, tool_names(role), count),
+            'prompt_all': count(tool_prompt_section(role, subsets=False)),
+            'prompt_subset': count(tool_prompt_section(role)),
+        }
+    return results
+
+
+def measure_selection_latency(model: str, requests: int) -> Dict[str, Dict[str, float]]:
+    """Median seconds until the model returns its tool call, per role, with all tools and the subset."""
+    from openai import OpenAI
+
+    client = OpenAI()
+    schemas = tool_schemas()
+    results = {}
+    for role, message in ROLE_REQUESTS.items():
+        results[role] = {}
+        for label, names in (("all", ALL_TOOLS), ("subset", tool_names(role))):
+            samples: List[float] = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "system", "content": f"You are a {role} specialist."},
+                              {"role": "user", "content": message}],
+                    tools=[schemas[name] for name in names],
+                    tool_choice="required",
+                    max_tokens=64,
+                )
+                samples.append(time.perf_counter() - start)
+            results[role][label] = statistics.median(samples)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tool schema size per role: every tool versus the role's subset.")
+    parser.add_argument("--live", action="store_true", help="also time tool selection against the OpenAI API")
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--model", default="gpt-4o-mini")
+    args = parser.parse_args()
+
+    print(f"{'role':<12}{'tools':>8}{'schema tokens':>20}{'prompt tokens':>18}")
+    for role, row in measure_tokens().items():
+        saved = 1 - row['schema_subset'] / row['schema_all']
+        print(f"{role:<12}{row['tools_all']:>3} -> {row['tools_subset']:<2}"
+              f"{row['schema_all']:>8} -> {row['schema_subset']:<5} (-{saved:.0%})"
+              f"{row['prompt_all']:>7} -> {row['prompt_subset']}")
+
+    if args.live:
+        print(f"\n{'role':<12}{'all tools':>12}{'subset':>12}  (median seconds to tool call, {args.model})")
+        for role, row in measure_selection_latency(args.model, args.requests).items():
+            print(f"{role:<12}{row['all']:>12.3f}{row['subset']:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Voice turn tracking cost per turn.
+
+`TurnLatencyTracker` runs on every `AgentSession` event, so its cost is
+added to each turn. A full turn's events are replayed: the user speaks
+and stops, the first token arrives, the agent speaks and stops listening.
+The mean time per turn is reported, including the histogram updates and
+the `voice_turn` event.
+
+Usage:
+    python agent_worker/benchmarks/turn_tracking.py --turns 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from turn_metrics import TurnLatencyTracker, reset_latency_histograms
+
+
+class _Session:
+    """Accepts the tracker's listeners; events are replayed by calling the tracker directly."""
+
+    def on(self, event, callback):
+        pass
+
+
+def time_turns(turns: int) -> float:
+    """Mean ns per tracked turn."""
+    tracker = TurnLatencyTracker("therapist", session_summary=False).attach(_Session())
+    speaking, listening = SimpleNamespace(new_state="speaking"), SimpleNamespace(new_state="listening")
+    metrics = SimpleNamespace(metrics=SimpleNamespace(ttft=0.3))
+    start = time.perf_counter_ns()
+    for _ in range(turns):
+        tracker.on_user_state_changed(speaking)
+        tracker.on_user_state_changed(listening)
+        tracker.on_metrics_collected(metrics)
+        tracker.on_agent_state_changed(speaking)
+        tracker.on_agent_state_changed(listening)
+    elapsed = (time.perf_counter_ns() - start) / turns
+    reset_latency_histograms()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Voice turn tracking cost per turn.")
+    parser.add_argument("--turns", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{time_turns(args.turns) / 1000:.1f} µs per tracked turn ({args.turns} turns)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Incremental ingestion of incoming text streams.
+
+`reader.read_all()` returns only after the last chunk of a message has
+arrived, so long pasted messages delayed everything behind them.
+`ingest_text_stream` consumes the reader chunk by chunk instead:
+
+- chunks are UTF-8 encoded into one buffer, pre-sized from the stream's
+  announced size when it is known, and grown by doubling otherwise
+- messages over `max_bytes` are truncated. The rest of the stream is
+  still drained so that the sender is not left blocked.
+- completion is detected when the announced size is reached or the
+  stream ends. A stream that goes quiet for `idle_timeout` seconds ends
+  the message with what has arrived.
+- incremental processors see every chunk as it arrives, so their work
+  is done by the time the last chunk lands. `SafetyScanner` and
+  `LanguageDetector` are included.
+
+`IngestionResult` reports the time to the first chunk, the ingestion
+time (first to last chunk) and how long processing took after the last
+chunk.
+"""
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+
+DEFAULT_MAX_BYTES = 64 * 1024
+_INITIAL_CAPACITY = 4096
+
+
+class ChunkProcessor:
+    """Pre-processing that runs on each chunk while a message is arriving."""
+
+    name = "processor"
+
+    def feed(self, chunk: str, elapsed: float):
+        """Process one chunk; `elapsed` is seconds since ingestion started."""
+
+    def finish(self) -> Dict[str, Any]:
+        """Result once the message is complete."""
+        return {}
+
+
+class SafetyScanner(ChunkProcessor):
+    """
+    Flags crisis language as soon as it arrives.
+
+    Matching happens across chunk boundaries: the tail of each chunk,
+    one character shorter than the longest phrase, is kept and scanned
+    together with the next chunk.
+    """
+
+    name = "safety"
+
+    PHRASES = {
+        "self_harm": ("suicide", "suicidal", "kill myself", "end my life", "hurt myself", "self-harm",
+                      "self harm", "cutting myself", "overdose"),
+        "harm_to_others": ("hurt someone", "kill someone", "kill him", "kill her"),
+    }
+
+    def __init__(self, phrases: Optional[Dict[str, tuple]] = None):
+        phrases = phrases or self.PHRASES
+        self._categories = {phrase: category for category, items in phrases.items() for phrase in items}
+        self._pattern = re.compile("|".join(re.escape(phrase) for phrase in
+                                            sorted(self._categories, key=len, reverse=True)))
+        self._overlap = max(len(phrase) for phrase in self._categories) - 1
+        self._tail = ""
+        self.matches: Dict[str, str] = {}  # phrase -> category
+        self.first_flagged: Optional[float] = None
+
+    def feed(self, chunk: str, elapsed: float):
+        window = self._tail + chunk.lower()
+        for match in self._pattern.finditer(window):
+            phrase = match.group(0)
+            if phrase not in self.matches:
+                self.matches[phrase] = self._categories[phrase]
+                if self.first_flagged is None:
+                    self.first_flagged = elapsed
+        self._tail = window[-self._overlap:]
+
+    def finish(self) -> Dict[str, Any]:
+        return {
+            'flagged': bool(self.matches),
+            'categories': sorted(set(self.matches.values())),
+            'flagged_at': self.first_flagged
+        }
+
+
+class LanguageDetector(ChunkProcessor):
+    """
+    Guesses the message language from common function words.
+
+    Decides as soon as one language leads with at least `min_hits` words;
+    chunks after the decision are skipped.
+    """
+
+    name = "language"
+
+    STOPWORDS = {
+        "en": frozenset("the and is are was i you my me to of in it that not have this with for".split()),
+        "es": frozenset("el la los las que es y en de no mi me por con para una un muy pero".split()),
+        "fr": frozenset("le la les est et je tu ne pas de des une un mon ma pour avec que".split()),
+        "de": frozenset("der die das und ist ich nicht du mein mit ein eine zu auf für sehr aber".split()),
+        "pt": frozenset("o a os as que é e não eu de em um uma meu minha para com muito mas".split()),
+    }
+    _WORDS = re.compile(r"[^\W\d_]+")
+
+    def __init__(self, min_hits: int = 5, margin: int = 2):
+        self.min_hits = min_hits
+        self.margin = margin
+        self._counts = {language: 0 for language in self.STOPWORDS}
+        self._partial = ""
+        self.language: Optional[str] = None
+        self.decided_at: Optional[float] = None
+
+    def feed(self, chunk: str, elapsed: float):
+        if self.language is not None:
+            return
+        text = self._partial + chunk.lower()
+        # The last word may continue in the next chunk
+        words = self._WORDS.findall(text)
+        if words and text[-1:].isalpha():
+            self._partial = words.pop()
+        else:
+            self._partial = ""
+        for word in words:
+            for language, stopwords in self.STOPWORDS.items():
+                if word in stopwords:
+                    self._counts[language] += 1
+        self._decide(elapsed)
+
+    def _decide(self, elapsed: float):
+        ranked = sorted(self._counts.items(), key=lambda item: item[1], reverse=True)
+        (best, hits), (_, runner_up) = ranked[0], ranked[1]
+        if hits >= self.min_hits and hits - runner_up >= self.margin:
+            self.language = best
+            self.decided_at = elapsed
+
+    def finish(self) -> Dict[str, Any]:
+        if self.language is None:
+            # Short messages: take the leader, if any, without the margin
+            for language, stopwords in self.STOPWORDS.items():
+                if self._partial in stopwords:
+                    self._counts[language] += 1
+            ranked = sorted(self._counts.items(), key=lambda item: item[1], reverse=True)
+            if ranked[0][1] > ranked[1][1]:
+                self.language = ranked[0][0]
+        return {'language': self.language, 'decided_at': self.decided_at}
+
+
+@dataclass
+class IngestionResult:
+    """A fully ingested message with its timings (seconds from the start of ingestion)."""
+    text: str
+    bytes: int
+    chunks: int
+    expected_bytes: Optional[int]
+    truncated: bool
+    timed_out: bool
+    first_chunk_latency: Optional[float]
+    ingestion_time: float  # first chunk to last chunk
+    processing_lag: float  # last chunk to processors finished
+    total_time: float
+    results: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Flat fields for log records and telemetry events."""
+        return {
+            'message_bytes': self.bytes,
+            'chunks': self.chunks,
+            'truncated': self.truncated,
+            'ingest_first_chunk_ms': round(self.first_chunk_latency * 1000, 3)
+            if self.first_chunk_latency is not None else None,
+            'ingest_ms': round(self.ingestion_time * 1000, 3),
+            'ingest_processing_lag_ms': round(self.processing_lag * 1000, 3),
+        }
+
+
+def _expected_size(reader: Any) -> Optional[int]:
+    """Size announced in the stream header, if any."""
+    info = getattr(reader, "info", None)
+    for name in ("size", "total_length", "total_size"):
+        size = getattr(info, name, None)
+        if isinstance(size, int) and size > 0:
+            return size
+    return None
+
+
+async def ingest_text_stream(reader: AsyncIterator[str], processors: Optional[List[ChunkProcessor]] = None,
+                             max_bytes: int = DEFAULT_MAX_BYTES,
+                             idle_timeout: Optional[float] = 30.0) -> IngestionResult:
+    """Read a text stream chunk by chunk, processing each chunk as it arrives."""
+    processors = processors or []
+    started = time.perf_counter()
+    expected = _expected_size(reader)
+    buffer = bytearray(min(expected, max_bytes) if expected else min(_INITIAL_CAPACITY, max_bytes))
+    length = 0
+    chunks = 0
+    truncated = timed_out = False
+    first_chunk = last_chunk = None
+
+    iterator = reader.__aiter__()
+    while True:
+        try:
+            if idle_timeout is None:
+                chunk = await iterator.__anext__()
+            else:
+                chunk = await asyncio.wait_for(iterator.__anext__(), idle_timeout)
+        except StopAsyncIteration:
+            break
+        except asyncio.TimeoutError:
+            timed_out = True
+            break
+
+        last_chunk = time.perf_counter()
+        elapsed = last_chunk - started
+        if first_chunk is None:
+            first_chunk = elapsed
+        chunks += 1
+        if truncated:
+            continue
+
+        data = chunk.encode("utf-8")
+        if length + len(data) > max_bytes:
+            # Cut on a character boundary and keep draining the stream
+            data = data[:max_bytes - length].decode("utf-8", "ignore").encode("utf-8")
+            chunk = data.decode("utf-8")
+            truncated = True
+        end = length + len(data)
+        if end > len(buffer):
+            buffer.extend(bytes(max(end, min(2 * len(buffer), max_bytes)) - len(buffer)))
+        buffer[length:end] = data
+        length = end
+
+        for processor in processors:
+            processor.feed(chunk, elapsed)
+        if expected is not None and length >= expected:
+            break
+
+    finished = time.perf_counter()
+    results = {processor.name: processor.finish() for processor in processors}
+    done = time.perf_counter()
+    return IngestionResult(
+        text=buffer[:length].decode("utf-8"),
+        bytes=length,
+        chunks=chunks,
+        expected_bytes=expected,
+        truncated=truncated,
+        timed_out=timed_out,
+        first_chunk_latency=first_chunk,
+        ingestion_time=(last_chunk - started - first_chunk) if first_chunk is not None else 0.0,
+        processing_lag=done - (last_chunk if last_chunk is not None else finished),
+        total_time=done - started,
+        results=results
+    )
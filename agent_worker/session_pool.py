@@ -0,0 +1,257 @@
+"""
+Warm pool of pre-connected sessions.
+
+`SessionPool` keeps sessions ready ahead of demand and hands one out per
+`acquire()`, so a caller skips whatever the factory does: connecting and
+completing a handshake, for a factory that opens a connection. Sessions
+are single-use: the caller keeps its session, and the pool creates a
+replacement in the background.
+
+The worker does not use it. Its model session is an `AgentSession`,
+which opens the realtime connection in `session.start()`; constructing
+one opens nothing, so a pool of them would save no handshake time.
+
+Sizing follows Little's law. To keep a session ready for every arrival,
+the pool needs about `arrival_rate x replacement_time` sessions, where
+`arrival_rate` is measured over the last `rate_window` seconds and
+`replacement_time` is a moving average of how long creating a session
+takes, plus one maintenance interval for retries after a failed refill. The target is scaled by `headroom` and clamped to
+`[min_size, max_size]`.
+
+A maintenance task, which runs every `maintenance_interval` seconds:
+
+- closes idle sessions older than `max_idle`, and sessions beyond the
+  target that have sat unused for `idle_grace` seconds
+- health-checks idle sessions and drops the ones that fail
+- refills the pool to the target
+
+The factory, health check and close functions are injected, so the pool
+can be tested against a local fake server
+(`testing.fake_realtime.FakeRealtimeServer`).
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+
+@dataclass
+class PooledSession:
+    """An initialized session waiting in the pool."""
+    session: Any
+    created: float
+    last_checked: float
+
+
+def _percentile(samples: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of unsorted samples."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class SessionPool:
+    """Warm pool of sessions sized from the recent arrival rate."""
+
+    def __init__(self, factory: Callable[[], Awaitable[Any]],
+                 health_check: Optional[Callable[[Any], Awaitable[bool]]] = None,
+                 close: Optional[Callable[[Any], Awaitable[None]]] = None,
+                 min_size: int = 1, max_size: int = 8, headroom: float = 1.5,
+                 rate_window: float = 300.0, max_idle: float = 600.0, idle_grace: float = 60.0,
+                 health_interval: float = 30.0, maintenance_interval: float = 5.0,
+                 logger=None):
+        self.factory = factory
+        self.health_check = health_check
+        self.close_session = close
+        self.min_size = min_size
+        self.max_size = max_size
+        self.headroom = headroom
+        self.rate_window = rate_window
+        self.max_idle = max_idle
+        self.idle_grace = idle_grace
+        self.health_interval = health_interval
+        self.maintenance_interval = maintenance_interval
+        self.logger = logger
+
+        self._idle: Deque[PooledSession] = deque()
+        self._creating = 0
+        self._arrivals: Deque[float] = deque()
+        self._create_time: Optional[float] = None  # moving average, seconds
+        self._acquire_latencies: Deque[float] = deque(maxlen=512)
+        self._maintenance: Optional[asyncio.Task] = None
+        self._refills: set = set()
+        self._closed = False
+        self.stats = {'acquired': 0, 'hits': 0, 'misses': 0, 'created': 0, 'create_failures': 0,
+                      'evicted_idle': 0, 'evicted_unhealthy': 0}
+
+    def start(self) -> 'SessionPool':
+        """Start maintenance on the running loop and fill to the minimum size."""
+        if self._maintenance is None:
+            self._maintenance = asyncio.get_running_loop().create_task(self._maintain())
+        return self
+
+    async def acquire(self) -> Any:
+        """
+        Take a session for a room.
+
+        Returns a pooled session when one is ready, otherwise creates one
+        on demand. Either way the pool is refilled in the background.
+        """
+        start = time.monotonic()
+        self._arrivals.append(start)
+        self.stats['acquired'] += 1
+        session = None
+        while self._idle:
+            pooled = self._idle.popleft()
+            if start - pooled.created >= self.max_idle:
+                await self._discard(pooled.session, 'evicted_idle')
+                continue
+            session = pooled.session
+            break
+
+        hit = session is not None
+        if hit:
+            self.stats['hits'] += 1
+        else:
+            self.stats['misses'] += 1
+            session = await self._create()
+
+        latency = time.monotonic() - start
+        self._acquire_latencies.append(latency)
+        if self.logger is not None:
+            self.logger.info("Session acquired", pool_hit=hit,
+                             acquire_latency_ms=round(latency * 1000, 3), pool_idle=len(self._idle))
+        self._schedule_refill()
+        return session
+
+    async def _create(self) -> Any:
+        """Create one session and update the creation time average."""
+        start = time.monotonic()
+        try:
+            session = await self.factory()
+        except Exception:
+            self.stats['create_failures'] += 1
+            raise
+        elapsed = time.monotonic() - start
+        self._create_time = elapsed if self._create_time is None else 0.8 * self._create_time + 0.2 * elapsed
+        self.stats['created'] += 1
+        return session
+
+    async def _discard(self, session: Any, reason: str):
+        """Close a session that leaves the pool without being handed out."""
+        self.stats[reason] += 1
+        if self.close_session is not None:
+            try:
+                await self.close_session(session)
+            except Exception as e:
+                if self.logger is not None:
+                    self.logger.warning("Failed to close pooled session", error=str(e))
+
+    def arrival_rate(self, now: Optional[float] = None) -> float:
+        """Arrivals per second over the rate window."""
+        if now is None:
+            now = time.monotonic()
+        arrivals = self._arrivals
+        while arrivals and now - arrivals[0] > self.rate_window:
+            arrivals.popleft()
+        return len(arrivals) / self.rate_window
+
+    def target_size(self, now: Optional[float] = None) -> int:
+        """Sessions to keep ready: arrival rate x replacement time, with headroom."""
+        replacement = (self._create_time or 0.0) + self.maintenance_interval
+        target = math.ceil(self.arrival_rate(now) * replacement * self.headroom)
+        return max(self.min_size, min(self.max_size, target))
+
+    def _schedule_refill(self):
+        """Refill in the background without delaying the caller."""
+        if self._closed:
+            return
+        task = asyncio.get_running_loop().create_task(self._refill())
+        self._refills.add(task)
+        task.add_done_callback(self._refills.discard)
+
+    async def _refill(self):
+        """Create sessions concurrently until the pool reaches its target."""
+        missing = self.target_size() - len(self._idle) - self._creating
+        if missing <= 0:
+            return
+        self._creating += missing
+        try:
+            results = await asyncio.gather(*(self._create() for _ in range(missing)), return_exceptions=True)
+        finally:
+            self._creating -= missing
+        now = time.monotonic()
+        for result in results:
+            if isinstance(result, BaseException):
+                if self.logger is not None:
+                    self.logger.warning("Failed to pre-initialize session", error=str(result))
+            elif self._closed:
+                await self._discard(result, 'evicted_idle')
+            else:
+                self._idle.append(PooledSession(result, now, now))
+
+    async def _maintain(self):
+        """Evict, health-check and refill every maintenance interval."""
+        while not self._closed:
+            try:
+                await self.maintain()
+            except Exception as e:
+                if self.logger is not None:
+                    self.logger.warning("Session pool maintenance failed", error=str(e))
+            await asyncio.sleep(self.maintenance_interval)
+
+    async def maintain(self, now: Optional[float] = None):
+        """Run one maintenance pass."""
+        if now is None:
+            now = time.monotonic()
+        target = self.target_size(now)
+        kept: Deque[PooledSession] = deque()
+        for pooled in self._idle:
+            age = now - pooled.created
+            if age >= self.max_idle or (len(kept) >= target and age >= self.idle_grace):
+                await self._discard(pooled.session, 'evicted_idle')
+            elif self.health_check is not None and now - pooled.last_checked >= self.health_interval:
+                try:
+                    healthy = await self.health_check(pooled.session)
+                except Exception:
+                    healthy = False
+                if healthy:
+                    pooled.last_checked = now
+                    kept.append(pooled)
+                else:
+                    await self._discard(pooled.session, 'evicted_unhealthy')
+            else:
+                kept.append(pooled)
+        self._idle = kept
+        await self._refill()
+
+    async def close(self):
+        """Stop maintenance and close every idle session."""
+        self._closed = True
+        if self._maintenance is not None:
+            self._maintenance.cancel()
+            await asyncio.gather(self._maintenance, return_exceptions=True)
+        if self._refills:
+            await asyncio.gather(*self._refills, return_exceptions=True)
+        while self._idle:
+            await self._discard(self._idle.popleft().session, 'evicted_idle')
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get hit rate, acquire latency and sizing metrics."""
+        stats = self.stats
+        latencies = list(self._acquire_latencies)
+        return {
+            **stats,
+            'hit_rate': stats['hits'] / stats['acquired'] if stats['acquired'] else None,
+            'acquire_latency_p50': _percentile(latencies, 0.5),
+            'acquire_latency_p99': _percentile(latencies, 0.99),
+            'idle': len(self._idle),
+            'creating': self._creating,
+            'target_size': self.target_size(),
+            'arrival_rate': self.arrival_rate(),
+            'create_time': self._create_time
+        }
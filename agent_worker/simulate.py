@@ -0,0 +1,280 @@
+"""
+In-process load generator for the worker.
+
+Runs N concurrent sessions through `worker.entrypoint` in one process.
+LiveKit is replaced by `testing.FakeJobContext` and `testing.FakeRoom`,
+and OpenAI by `testing.FakeRealtimeModel`, which has configurable
+handshake, first-token latency and token rate. Each session is a room
+whose participant sends `--turns` messages. The participant waits for
+each reply and then `--think-time` seconds before the next message.
+Session arrivals are spread over `--ramp` seconds.
+
+The report gives:
+
+- startup: from job start until the text handler is registered
+- turn latency: from sending a message to the first reply token, and to
+  the complete reply (p50/p99)
+- memory per session: peak RSS growth over the run divided by the number
+  of sessions
+- job process baseline: RSS of a fresh interpreter after importing the
+  job's modules (`worker` by default), measured in a subprocess
+- event-loop lag: how late a 10 ms timer fires (p50/p99/max)
+
+Every session runs in this one process, on one event loop, with one
+logger. LiveKit runs each job in its own child process. So the in-process
+growth per session is not what a job costs. A job costs about the process
+baseline plus that growth, and that sum is what bounds how many jobs a
+node can hold. Latency and lag show how the code under test behaves
+with N sessions sharing a loop. They are not a production capacity
+figure. The report names the entrypoint its numbers come from. The
+default is `worker.entrypoint`, with the model session factory and agent
+construction pointed at the fake model (livekit-agents must be
+installed).
+
+Usage:
+    python agent_worker/simulate.py --sessions 50 --turns 5 --ramp 10
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission import process_tree_rss_mb
+from testing import FakeJobContext, FakeModelConfig, FakeRealtimeModel, FakeRoom
+
+
+@dataclass
+class SimulationConfig:
+    """Shape of the simulated load."""
+    sessions: int = 10
+    turns: int = 3
+    think_time: float = 1.0
+    ramp: float = 0.0
+    role: str = "therapist"
+    message: str = "I have been having trouble sleeping lately and I feel anxious at night."
+    chunk_size: int = 64
+    connect_delay: float = 0.05
+    process_modules: Tuple[str, ...] = ("worker",)  # imported by a job process, for its baseline
+    model: FakeModelConfig = field(default_factory=FakeModelConfig)
+
+
+@dataclass
+class SimulationReport:
+    """Results of one simulation run (times in seconds)."""
+    entrypoint: str
+    sessions: int
+    failed: int
+    turns: int
+    duration: float
+    startup: Dict[str, Optional[float]]
+    first_token: Dict[str, Optional[float]]
+    complete: Dict[str, Optional[float]]
+    event_loop_lag: Dict[str, Optional[float]]
+    rss_baseline_mb: float
+    rss_peak_mb: float
+    job_process_baseline_mb: Optional[float] = None
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def memory_per_session_mb(self) -> float:
+        """In-process RSS growth per session; excludes the per-job process cost."""
+        return (self.rss_peak_mb - self.rss_baseline_mb) / self.sessions if self.sessions else 0.0
+
+    @property
+    def memory_per_job_mb(self) -> Optional[float]:
+        """Estimated RSS of one job process: its baseline plus one session's growth."""
+        if self.job_process_baseline_mb is None:
+            return None
+        return self.job_process_baseline_mb + self.memory_per_session_mb
+
+    def format(self) -> str:
+        def ms(stats: Dict[str, Optional[float]]) -> str:
+            return "  ".join(f"{name} {value * 1000:8.1f} ms" if value is not None else f"{name}      n/a"
+                             for name, value in stats.items())
+
+        per_job = (f"{self.memory_per_job_mb:.1f} MB (process baseline {self.job_process_baseline_mb:.1f} MB "
+                   f"+ session)" if self.memory_per_job_mb is not None else "n/a (process baseline not measured)")
+        lines = [
+            f"entrypoint: {self.entrypoint}",
+            "  all sessions share one process and event loop; production runs one process per job",
+            f"sessions: {self.sessions - self.failed}/{self.sessions} ok, {self.turns} turns "
+            f"in {self.duration:.1f} s",
+            f"startup:            {ms(self.startup)}",
+            f"first token:        {ms(self.first_token)}",
+            f"complete reply:     {ms(self.complete)}",
+            f"event-loop lag:     {ms(self.event_loop_lag)}",
+            f"memory per session: {self.memory_per_session_mb:.2f} MB in-process "
+            f"(RSS {self.rss_baseline_mb:.0f} -> {self.rss_peak_mb:.0f} MB)",
+            f"memory per job:     {per_job}",
+        ]
+        lines += [f"error: {error}" for error in self.errors[:5]]
+        return "\n".join(lines)
+
+
+def _stats(samples: List[float]) -> Dict[str, Optional[float]]:
+    """Nearest-rank p50/p99 and max."""
+    if not samples:
+        return {'p50': None, 'p99': None, 'max': None}
+    ordered = sorted(samples)
+    return {
+        'p50': ordered[min(len(ordered) - 1, int(len(ordered) * 0.5))],
+        'p99': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+        'max': ordered[-1],
+    }
+
+
+def job_process_baseline_mb(modules: Tuple[str, ...]) -> Optional[float]:
+    """RSS of a fresh interpreter after importing a job process's modules; None if they fail to import."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    code = (f"import sys; sys.path[:0] = {[here, os.path.dirname(here)]!r}\n"
+            + "".join(f"import {module}\n" for module in modules)
+            + "from admission import process_tree_rss_mb\nprint(process_tree_rss_mb())")
+    try:
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=120)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    rss = float(result.stdout.strip().splitlines()[-1])
+    return rss or None
+
+
+def worker_entrypoint(model: FakeRealtimeModel) -> Callable[[Any], Awaitable[None]]:
+    """`worker.entrypoint`, with its model sessions and agents backed by the fake model."""
+    import worker
+
+    worker._create_model_session = model.create_session
+    worker.create_agent = lambda instructions, role_type, user_name="User": SimpleNamespace(
+        instructions=instructions, role=role_type)
+    return worker.entrypoint
+
+
+class _Sampler:
+    """Samples event-loop lag and RSS while the simulation runs."""
+
+    def __init__(self, interval: float = 0.01, rss_every: int = 10):
+        self.interval = interval
+        self.rss_every = rss_every
+        self.lags: List[float] = []
+        self.peak_rss = process_tree_rss_mb(os.getpid())
+
+    async def run(self):
+        ticks = 0
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - expected))
+            ticks += 1
+            if ticks % self.rss_every == 0:
+                self.peak_rss = max(self.peak_rss, process_tree_rss_mb(os.getpid()))
+
+
+async def _run_session(index: int, config: SimulationConfig, model: FakeRealtimeModel,
+                       entrypoint: Callable[[Any], Awaitable[None]], results: Dict[str, List[float]]):
+    """One room: start the job, hold a conversation, shut down."""
+    room = FakeRoom(f"sim-{config.role}-{index:04d}",
+                    {"therapist_role": config.role, "user_name": f"User {index}"})
+    ctx = FakeJobContext(room, connect_delay=config.connect_delay)
+    await asyncio.sleep(config.ramp * index / max(config.sessions, 1))
+    started = time.perf_counter()
+    await entrypoint(ctx)
+    if room.handler_registered is None:
+        raise RuntimeError(f"{room.name}: no text stream handler registered")
+    results['startup'].append(room.handler_registered - started)
+
+    session = next(session for session in model.sessions if session.room is room)
+    identity = f"user-{index}"
+    try:
+        for turn in range(config.turns):
+            if turn:
+                await asyncio.sleep(config.think_time)
+            sent = time.perf_counter()
+            before = len(session.replies)
+            room.send_text(identity, config.message, chunk_size=config.chunk_size)
+            await session.wait_for_replies(before + 1)
+            reply = session.replies[before]
+            results['first_token'].append(reply.first_token - sent)
+            results['complete'].append(reply.finished - sent)
+    finally:
+        room.disconnect_participant(identity)
+        await ctx.shutdown()
+
+
+async def run_simulation(config: SimulationConfig,
+                         entrypoint: Optional[Callable[[Any], Awaitable[None]]] = None,
+                         model: Optional[FakeRealtimeModel] = None) -> SimulationReport:
+    """
+    Drive `config.sessions` concurrent sessions through an entrypoint.
+
+    The default is `worker.entrypoint`. A custom entrypoint is reported
+    under its own name.
+    """
+    model = model or FakeRealtimeModel(config.model)
+    if entrypoint is None:
+        entrypoint = worker_entrypoint(model)
+        name = "worker.entrypoint (fake model and agent)"
+    else:
+        name = f"{getattr(entrypoint, '__qualname__', repr(entrypoint))} (test entrypoint)"
+    process_baseline = job_process_baseline_mb(config.process_modules)
+    results: Dict[str, List[float]] = {'startup': [], 'first_token': [], 'complete': []}
+    sampler = _Sampler()
+    baseline = sampler.peak_rss
+    probe = asyncio.ensure_future(sampler.run())
+    start = time.perf_counter()
+    try:
+        outcomes = await asyncio.gather(
+            *(_run_session(i, config, model, entrypoint, results) for i in range(config.sessions)),
+            return_exceptions=True
+        )
+    finally:
+        probe.cancel()
+    errors = [f"{type(outcome).__name__}: {outcome}" for outcome in outcomes if isinstance(outcome, BaseException)]
+    return SimulationReport(
+        entrypoint=name,
+        sessions=config.sessions,
+        failed=len(errors),
+        turns=len(results['complete']),
+        duration=time.perf_counter() - start,
+        startup=_stats(results['startup']),
+        first_token=_stats(results['first_token']),
+        complete=_stats(results['complete']),
+        event_loop_lag=_stats(sampler.lags),
+        rss_baseline_mb=baseline,
+        rss_peak_mb=max(sampler.peak_rss, process_tree_rss_mb(os.getpid())),
+        job_process_baseline_mb=process_baseline,
+        errors=errors
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--think-time", type=float, default=1.0)
+    parser.add_argument("--ramp", type=float, default=0.0, help="seconds over which sessions arrive")
+    parser.add_argument("--role", default="therapist")
+    parser.add_argument("--handshake-delay", type=float, default=0.3)
+    parser.add_argument("--first-token-latency", type=float, default=0.4)
+    parser.add_argument("--tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--reply-tokens", type=int, default=40)
+    args = parser.parse_args()
+
+    config = SimulationConfig(
+        sessions=args.sessions, turns=args.turns, think_time=args.think_time, ramp=args.ramp, role=args.role,
+        model=FakeModelConfig(handshake_delay=args.handshake_delay, first_token_latency=args.first_token_latency,
+                              tokens_per_second=args.tokens_per_second, reply_tokens=args.reply_tokens)
+    )
+    print(asyncio.run(run_simulation(config)).format())
+
+
+if __name__ == "__main__":
+    main()
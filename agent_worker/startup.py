@@ -0,0 +1,174 @@
+"""
+Concurrent session startup for the worker entrypoint.
+
+Startup steps such as connecting to the room, rendering the prompt and
+building the model session do not depend on each other, but they used to
+run one after another. `StartupPipeline` runs each stage as soon as the
+stages it declares in `after` have finished, so independent stages
+overlap.
+
+A stage function receives the results of its dependencies as keyword
+arguments named after those stages, so its dependencies are visible
+in its signature:
+
+    pipeline = StartupPipeline(logger, room=ctx.room.name)
+    pipeline.add("connect", ctx.connect)
+    pipeline.add("prompt", lambda: render_prompt(role))
+    pipeline.add("session", build_session)
+    pipeline.add("start", lambda session, prompt: start(session, prompt), after=("session", "prompt"))
+    pipeline.add("ready", register_handlers, after=("start", "connect"))
+    results = await pipeline.run()
+
+Each stage runs inside a logger span, so the overlap shows up in exported
+traces. Once every stage has finished, `run` logs time-to-ready for the
+room with each stage's start offset and duration. It also writes a
+`startup` telemetry event.
+"""
+
+import asyncio
+import inspect
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+@dataclass
+class StartupStage:
+    """A named startup step and the stages it waits for."""
+    name: str
+    fn: Callable[..., Any]
+    after: Tuple[str, ...] = ()
+    started: Optional[float] = None  # seconds since the pipeline started
+    duration: Optional[float] = None
+
+
+@dataclass
+class StartupReport:
+    """Timings of one pipeline run."""
+    time_to_ready: float
+    stages: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+    @property
+    def sequential_time(self) -> float:
+        """What the stages would have taken one after another."""
+        return sum(stage['duration'] for stage in self.stages.values())
+
+
+class StartupPipeline:
+    """Runs startup stages concurrently, respecting declared dependencies."""
+
+    def __init__(self, logger=None, started: Optional[float] = None, **fields):
+        self.logger = logger
+        self.fields = fields
+        self.started = started
+        self.stages: Dict[str, StartupStage] = {}
+        self.report: Optional[StartupReport] = None
+
+    def add(self, name: str, fn: Callable[..., Any], after: Tuple[str, ...] = ()) -> 'StartupPipeline':
+        """Add a stage; `fn` may be sync or async and gets its dependencies' results by name."""
+        if name in self.stages:
+            raise ValueError(f"Duplicate startup stage: {name}")
+        self.stages[name] = StartupStage(name, fn, tuple(after))
+        return self
+
+    def _check(self):
+        """Reject unknown dependencies and cycles before anything runs."""
+        for stage in self.stages.values():
+            for dependency in stage.after:
+                if dependency not in self.stages:
+                    raise ValueError(f"Startup stage {stage.name} depends on unknown stage {dependency}")
+        visiting, done = set(), set()
+
+        def visit(name: str):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Startup stages form a cycle through {name}")
+            visiting.add(name)
+            for dependency in self.stages[name].after:
+                visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Run every stage and return their results by name.
+
+        If a stage fails, the stages still running are cancelled and the
+        exception propagates.
+        """
+        self._check()
+        if self.started is None:
+            self.started = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+        for name in self.stages:
+            self._schedule(name, tasks)
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        self.report = StartupReport(
+            time_to_ready=time.perf_counter() - self.started,
+            stages={stage.name: {'started': stage.started, 'duration': stage.duration}
+                    for stage in self.stages.values()}
+        )
+        self._log_report()
+        return {name: task.result() for name, task in tasks.items()}
+
+    def _schedule(self, name: str, tasks: Dict[str, asyncio.Task]) -> asyncio.Task:
+        """Create the task for a stage (and, first, for its dependencies)."""
+        task = tasks.get(name)
+        if task is None:
+            dependencies = {dependency: self._schedule(dependency, tasks)
+                            for dependency in self.stages[name].after}
+            task = asyncio.ensure_future(self._run_stage(self.stages[name], dependencies))
+            tasks[name] = task
+        return task
+
+    async def _run_stage(self, stage: StartupStage, dependencies: Dict[str, asyncio.Task]) -> Any:
+        """Wait for a stage's dependencies, then run and time it."""
+        if dependencies:
+            await asyncio.gather(*dependencies.values())
+        kwargs = {name: task.result() for name, task in dependencies.items()}
+
+        start = time.perf_counter()
+        stage.started = start - self.started
+        if self.logger is not None:
+            with self.logger.span(f"startup.{stage.name}", **self.fields):
+                result = await self._call(stage.fn, kwargs)
+        else:
+            result = await self._call(stage.fn, kwargs)
+        stage.duration = time.perf_counter() - start
+        return result
+
+    @staticmethod
+    async def _call(fn: Callable[..., Any], kwargs: Dict[str, Any]) -> Any:
+        """Call a sync or async stage function."""
+        result = fn(**kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    def _log_report(self):
+        """Log time-to-ready and per-stage timings for this room."""
+        if self.logger is None:
+            return
+        report = self.report
+        timings = {f"{name}_ms": round(stage['duration'] * 1000, 2) for name, stage in report.stages.items()}
+        self.logger.info("Session ready",
+                         time_to_ready_ms=round(report.time_to_ready * 1000, 2),
+                         sequential_ms=round(report.sequential_time * 1000, 2),
+                         stages={name: {key: round(value * 1000, 2) for key, value in stage.items()}
+                                 for name, stage in report.stages.items()},
+                         **self.fields)
+        self.logger.event("startup",
+                          time_to_ready_ms=round(report.time_to_ready * 1000, 2),
+                          **timings, **self.fields)
@@ -0,0 +1,210 @@
+"""
+Streaming text-reply pipeline.
+
+Previously, a text turn waited for the whole generated reply, then sent
+all of the text, and only then started speech. `StreamingReply` consumes
+the reply as a stream of tokens and runs three things concurrently:
+
+- generation: tokens are read as the model produces them
+- text: tokens are forwarded to the text channel as they arrive. While a
+  send is in flight, newly arrived tokens are coalesced into the next
+  send, so a slow channel gets fewer, larger messages rather than a
+  growing backlog.
+- speech: `SentenceSegmenter` cuts the token stream into sentences, and
+  each complete sentence is spoken in order. Speech starts on the first
+  sentence, not after the whole reply.
+
+Each reply records time-to-first-token, time-to-first-audio (when the
+first `speak` call is issued) and the total time, all measured from the
+start of the request.
+"""
+
+import asyncio
+import inspect
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+# Words that end with a period without ending a sentence
+ABBREVIATIONS = frozenset({
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "approx", "min", "max",
+})
+
+# Sentence-ending punctuation, optional closing quotes or brackets, then whitespace
+_SENTENCE_END = re.compile(r"[.!?…]+[\"'”’)\]]*\s+")
+_CLAUSE_END = re.compile(r"[,;:—]\s+")
+
+
+class SentenceSegmenter:
+    """Splits a token stream into speakable sentences."""
+
+    def __init__(self, min_chars: int = 2, max_chars: int = 240):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+        self._scanned = 0
+
+    def feed(self, token: str) -> List[str]:
+        """Add a token; returns the sentences it completed."""
+        self._buffer += token
+        sentences = []
+        while True:
+            match = _SENTENCE_END.search(self._buffer, self._scanned)
+            if match is None:
+                break
+            end = match.end()
+            candidate = self._buffer[:end].strip()
+            last_word = candidate.rstrip(".!?…\"'”’)]").rsplit(None, 1)[-1:] or [""]
+            if (candidate.endswith(".") and last_word[0].lower() in ABBREVIATIONS) or len(candidate) < self.min_chars:
+                self._scanned = end
+                continue
+            sentences.append(candidate)
+            self._buffer = self._buffer[end:]
+            self._scanned = 0
+
+        # A long run without sentence punctuation is spoken up to its last clause break
+        if len(self._buffer) > self.max_chars:
+            breaks = list(_CLAUSE_END.finditer(self._buffer))
+            end = breaks[-1].end() if breaks else self._buffer.rfind(" ") + 1
+            if end > 0:
+                sentences.append(self._buffer[:end].strip())
+                self._buffer = self._buffer[end:]
+                self._scanned = 0
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """Return whatever text remains once the stream has ended."""
+        remainder = self._buffer.strip()
+        self._buffer = ""
+        self._scanned = 0
+        return remainder or None
+
+
+@dataclass
+class ReplyMetrics:
+    """Timings and sizes of one streamed reply (seconds from the request)."""
+    text: str = ""
+    time_to_first_token: Optional[float] = None
+    time_to_first_audio: Optional[float] = None
+    generation_time: Optional[float] = None
+    total_time: Optional[float] = None
+    tokens: int = 0
+    text_sends: int = 0
+    sentences: List[str] = field(default_factory=list)
+
+    def log_fields(self) -> Dict[str, Any]:
+        """Size and timing fields logged for each answered turn."""
+        return {
+            'response_length': len(self.text),
+            'time_to_first_token': self.time_to_first_token,
+            'time_to_first_audio': self.time_to_first_audio,
+            'total_time': self.total_time,
+        }
+
+
+async def reply_tokens(session: Any, instructions: str) -> AsyncIterator[str]:
+    """
+    Tokens of a generated reply.
+
+    Streams when `generate_reply` returns an async iterator; a reply that
+    is only available as a whole is yielded as a single chunk.
+    """
+    result = session.generate_reply(instructions=instructions)
+    if hasattr(result, "__aiter__"):
+        async for chunk in result:
+            yield str(chunk)
+        return
+    if inspect.isawaitable(result):
+        result = await result
+    if hasattr(result, "__aiter__"):
+        async for chunk in result:
+            yield str(chunk)
+    elif result:
+        yield str(result)
+
+
+class StreamingReply:
+    """Forwards a token stream to text and speech concurrently."""
+
+    def __init__(self, send_text: Callable[[str], Awaitable[Any]], speak: Callable[[str], Awaitable[Any]],
+                 segmenter: Optional[SentenceSegmenter] = None):
+        self.send_text = send_text
+        self.speak = speak
+        self.segmenter = segmenter or SentenceSegmenter()
+        self.metrics = ReplyMetrics()
+
+    async def run(self, tokens: AsyncIterator[str], started: Optional[float] = None) -> ReplyMetrics:
+        """Stream a reply; returns its metrics once all text is sent and all speech issued."""
+        if started is None:
+            started = time.perf_counter()
+        metrics = self.metrics
+        text_queue: asyncio.Queue = asyncio.Queue()
+        speech_queue: asyncio.Queue = asyncio.Queue()
+        consumers = [asyncio.ensure_future(self._send_text_loop(text_queue)),
+                     asyncio.ensure_future(self._speak_loop(speech_queue, started))]
+        parts = []
+        try:
+            async for token in tokens:
+                if not token:
+                    continue
+                if metrics.time_to_first_token is None:
+                    metrics.time_to_first_token = time.perf_counter() - started
+                metrics.tokens += 1
+                parts.append(token)
+                text_queue.put_nowait(token)
+                for sentence in self.segmenter.feed(token):
+                    speech_queue.put_nowait(sentence)
+                # Let the consumers pick up work between tokens of a fast stream
+                await asyncio.sleep(0)
+                self._raise_consumer_errors(consumers)
+
+            metrics.generation_time = time.perf_counter() - started
+            remainder = self.segmenter.flush()
+            if remainder:
+                speech_queue.put_nowait(remainder)
+            text_queue.put_nowait(None)
+            speech_queue.put_nowait(None)
+            await asyncio.gather(*consumers)
+        except BaseException:
+            for consumer in consumers:
+                consumer.cancel()
+            await asyncio.gather(*consumers, return_exceptions=True)
+            raise
+
+        metrics.text = "".join(parts)
+        metrics.total_time = time.perf_counter() - started
+        return metrics
+
+    @staticmethod
+    def _raise_consumer_errors(consumers: List[asyncio.Future]):
+        """Stop generating as soon as sending text or speech has failed."""
+        for consumer in consumers:
+            if consumer.done() and consumer.exception() is not None:
+                raise consumer.exception()
+
+    async def _send_text_loop(self, queue: asyncio.Queue):
+        """Send tokens as they arrive, coalescing those that queued up meanwhile."""
+        done = False
+        while not done:
+            chunks = [await queue.get()]
+            while not queue.empty():
+                chunks.append(queue.get_nowait())
+            if chunks[-1] is None:
+                chunks.pop()
+                done = True
+            if chunks:
+                await self.send_text("".join(chunks))
+                self.metrics.text_sends += 1
+
+    async def _speak_loop(self, queue: asyncio.Queue, started: float):
+        """Speak sentences in order as they complete."""
+        while True:
+            sentence = await queue.get()
+            if sentence is None:
+                return
+            if self.metrics.time_to_first_audio is None:
+                self.metrics.time_to_first_audio = time.perf_counter() - started
+            self.metrics.sentences.append(sentence)
+            await self.speak(sentence)
@@ -0,0 +1,742 @@
+"""
+Tests for the worker's session infrastructure (no LiveKit connection needed).
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from types import ModuleType, SimpleNamespace
+
+# The worker modules import each other as top-level modules and use the
+# shared logger from the repository root
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission import LoadCalculator, NodeProfile, node_profile, process_tree_rss_mb
+from benchmarks.tool_responses import lookup_calls, rebuilt_calls, without_match
+from ingestion import ChunkProcessor, LanguageDetector, SafetyScanner, ingest_text_stream
+from session_pool import SessionPool
+from simulate import SimulationConfig, run_simulation
+from startup import StartupPipeline
+from streaming import SentenceSegmenter, StreamingReply, reply_tokens
+from testing import FakeModelConfig, FakeRealtimeModel, FakeRealtimeServer, FakeRealtimeClient
+from tools.catalog import BREATHING_EXERCISES, MEDITATIONS, breathing_response, grounding_response, meditation_response
+from turn_metrics import TurnLatencyTracker, latency_histograms, reset_latency_histograms, timed_tool
+from turn_queue import TurnQueue
+from utils.py_logger import Logger, LogConfig, LogLevel
+from utils.py_logger.binary import BinaryEventReader
+from utils.py_logger.config import HandlerConfig
+
+
+def _make_logger(name: str, filename: str) -> Logger:
+    """Logger writing JSON lines to a file."""
+    return Logger(name, LogConfig(json_format=True, handlers=[
+        HandlerConfig(type="file", level=LogLevel.DEBUG, formatter="json", config={"filename": filename})
+    ]))
+
+
+@contextmanager
+def _worker_with_fake_livekit():
+    """
+    Import `worker` against stub livekit, livekit plugin and dotenv modules.
+
+    Runs in a temporary directory, where the production logging config
+    writes its files. Afterwards the modules, loggers and the level
+    control and adaptive level threads the worker started are removed.
+    """
+    import utils.py_logger.logger as logger_module
+
+    class Agent:
+        def __init__(self, instructions: str = "", tools=()):
+            self.instructions, self.tools = instructions, list(tools)
+
+        async def update_instructions(self, instructions):
+            self.instructions = instructions
+
+        async def update_tools(self, tools):
+            self.tools = list(tools)
+
+    def function_tool(fn=None, **options):
+        return fn if fn is not None else (lambda fn: fn)
+
+    agents = ModuleType("livekit.agents")
+    agents.__dict__.update(
+        AgentSession=lambda **options: SimpleNamespace(**options), Agent=Agent,
+        RoomInputOptions=lambda **options: SimpleNamespace(**options), function_tool=function_tool,
+        RunContext=object, JobContext=object, JobProcess=object,
+        WorkerOptions=lambda **options: SimpleNamespace(**options), cli=SimpleNamespace(run_app=None))
+    plugins = ModuleType("livekit.plugins")
+    plugins.openai = SimpleNamespace(realtime=SimpleNamespace(RealtimeModel=lambda **options: options))
+    plugins.noise_cancellation = SimpleNamespace(BVC=lambda: None)
+    livekit = ModuleType("livekit")
+    livekit.agents, livekit.plugins = agents, plugins
+    dotenv = ModuleType("dotenv")
+    dotenv.load_dotenv = lambda *args, **kwargs: None
+
+    modules = set(sys.modules)
+    loggers, global_logger = dict(logger_module._loggers), logger_module._global_logger
+    cwd = os.getcwd()
+    tmp = tempfile.TemporaryDirectory()
+    os.chdir(tmp.name)
+    sys.modules.update({"livekit": livekit, "livekit.agents": agents, "livekit.plugins": plugins,
+                        "dotenv": dotenv})
+    try:
+        yield tmp.name
+    finally:
+        from utils.py_logger import adaptive, control
+        for module in (adaptive, control):
+            if module._controller is not None:
+                module._controller.stop()
+                module._controller = None
+        for name, logger in logger_module._loggers.items():
+            if name not in loggers:
+                for handler in logger._logger.handlers[:]:
+                    handler.close()
+                    logger._logger.removeHandler(handler)
+        logger_module._loggers.clear()
+        logger_module._loggers.update(loggers)
+        logger_module._global_logger = global_logger
+        for name in set(sys.modules) - modules:
+            del sys.modules[name]
+        os.chdir(cwd)
+        tmp.cleanup()
+
+
+def _read_entries(logger: Logger, filename: str):
+    """Close the logger's handlers and parse its file."""
+    for handler in logger._logger.handlers:
+        handler.close()
+    with open(filename) as f:
+        return [json.loads(json.loads(line)["message"]) for line in f]
+
+
+def test_startup_pipeline_overlaps_independent_stages():
+    """Independent stages run concurrently; dependents get their dependencies' results."""
+    order = []
+
+    async def connect():
+        await asyncio.sleep(0.1)
+        order.append("connect")
+
+    async def build_session():
+        await asyncio.sleep(0.05)
+        order.append("session")
+        return "session"
+
+    async def start(session, prompt):
+        assert (session, prompt) == ("session", "prompt for sleep")
+        await asyncio.sleep(0.05)
+        order.append("start")
+        return "started"
+
+    def register(start, connect):
+        order.append("register")
+        return start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "startup.log")
+        logger = _make_logger("test_startup", filename)
+        pipeline = (StartupPipeline(logger, room="room-1")
+                    .add("connect", connect)
+                    .add("prompt", lambda: "prompt for sleep")
+                    .add("session", build_session)
+                    .add("start", start, after=("session", "prompt"))
+                    .add("register", register, after=("start", "connect")))
+        results = asyncio.run(pipeline.run())
+        entries = _read_entries(logger, filename)
+
+    assert results["register"] == "started"
+    assert order.index("register") == len(order) - 1
+    report = pipeline.report
+    connect = report.stages["connect"]
+    assert report.stages["session"]["started"] < connect["started"] + connect["duration"]
+    assert report.time_to_ready < report.sequential_time
+    assert report.stages["start"]["started"] >= 0.05
+    [ready] = [entry for entry in entries if entry["message"] == "Session ready"]
+    assert ready["extra"]["room"] == "room-1" and ready["extra"]["time_to_ready_ms"] >= 100
+    assert set(ready["extra"]["stages"]) == {"connect", "prompt", "session", "start", "register"}
+
+
+def test_startup_pipeline_rejects_bad_graphs_and_cancels_on_failure():
+    """Cycles and unknown stages fail before running; a failing stage cancels the rest."""
+    for stages in ([("a", ("b",)), ("b", ("a",))], [("a", ("missing",))]):
+        pipeline = StartupPipeline()
+        for name, after in stages:
+            pipeline.add(name, lambda **kwargs: None, after=after)
+        try:
+            asyncio.run(pipeline.run())
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def fail():
+        raise ConnectionError("room connect failed")
+
+    pipeline = StartupPipeline().add("connect", fail).add("session", slow)
+    start = time.perf_counter()
+    try:
+        asyncio.run(pipeline.run())
+        assert False, "expected ConnectionError"
+    except ConnectionError:
+        pass
+    assert cancelled and time.perf_counter() - start < 1
+
+
+def test_session_pool_serves_warm_sessions_from_fake_realtime_server():
+    """Pooled sessions skip the handshake; unhealthy and idle sessions are evicted."""
+
+    async def scenario():
+        server = await FakeRealtimeServer(handshake_delay=0.05).start()
+        pool = SessionPool(
+            factory=lambda: FakeRealtimeClient(server.host, server.port).connect(),
+            health_check=lambda client: client.ping(),
+            close=lambda client: client.close(),
+            min_size=2, max_size=4, health_interval=0, idle_grace=0.2, maintenance_interval=0.05
+        ).start()
+        try:
+            while pool.get_metrics()["idle"] < 2:
+                await asyncio.sleep(0.01)
+            warm_ids = {f"sess_{i}" for i in range(1, server.handshakes + 1)}
+
+            # Served from sessions whose handshake finished before the acquire
+            sessions = [await pool.acquire() for _ in range(2)]
+            assert {session.session_id for session in sessions} <= warm_ids
+            assert pool.get_metrics()["hits"] == 2
+
+            # A burst larger than the pool falls back to on-demand creation
+            sessions += [await pool.acquire() for _ in range(3)]
+            burst = pool.get_metrics()
+            assert burst["misses"] >= 1 and 0 < burst["hit_rate"] < 1
+            assert burst["target_size"] >= 2 and burst["arrival_rate"] > 0
+
+            # Upstream drops every connection: health checks replace the idle sessions
+            while pool.get_metrics()["idle"] < 2:
+                await asyncio.sleep(0.01)
+            handshakes = server.handshakes
+            server.drop_connections()
+            await pool.maintain()
+            while pool.get_metrics()["idle"] < 2:
+                await asyncio.sleep(0.01)
+            assert pool.get_metrics()["evicted_unhealthy"] >= 2 and server.handshakes > handshakes
+            assert await (await pool.acquire()).ping()
+
+            # Idle sessions beyond the target are closed after the grace period
+            pool.min_size = 1
+            await asyncio.sleep(0.3)
+            await pool.maintain()
+            assert pool.get_metrics()["idle"] == 1 and pool.get_metrics()["evicted_idle"] == 1
+        finally:
+            await pool.close()
+            for session in sessions:
+                await session.close()
+            await server.stop()
+        assert pool.get_metrics()["idle"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_sentence_segmenter_splits_on_sentence_boundaries():
+    """Sentences complete on terminal punctuation, not on abbreviations or decimals."""
+    segmenter = SentenceSegmenter(max_chars=60)
+    sentences = []
+    for token in ["Hello", " Alex. ", "Dr. Lee", " suggests 4.5 hours", "! Shall", " we begin? ", "Breathe"]:
+        sentences += segmenter.feed(token)
+    assert sentences == ["Hello Alex.", "Dr. Lee suggests 4.5 hours!", "Shall we begin?"]
+    assert segmenter.flush() == "Breathe"
+
+    long_clause = "Notice your breath as it moves in, and notice it as it moves out, and let the thoughts pass"
+    assert segmenter.feed(long_clause) == ["Notice your breath as it moves in, and notice it as it moves out,"]
+    assert segmenter.flush() == "and let the thoughts pass"
+
+
+def test_streaming_reply_overlaps_generation_text_and_speech():
+    """Text is forwarded and speech starts before generation finishes."""
+    tokens = ["Let's", " try", " a breathing", " exercise. ", "Breathe", " in for", " four", " counts. ",
+              "Then", " slowly", " out."]
+    events = []
+
+    class FakeSession:
+        async def generate_reply(self, instructions):
+            await asyncio.sleep(0.02)
+            for token in tokens:
+                events.append(("token", token))
+                yield token
+                await asyncio.sleep(0.01)
+
+        async def send_text(self, chunk):
+            events.append(("text", chunk))
+            await asyncio.sleep(0.015)
+
+        async def speak(self, sentence):
+            events.append(("speak", sentence))
+            await asyncio.sleep(0.03)
+
+    session = FakeSession()
+    reply = StreamingReply(send_text=session.send_text, speak=session.speak)
+    metrics = asyncio.run(reply.run(reply_tokens(session, "I can't sleep")))
+
+    assert metrics.text == "".join(tokens)
+    assert "".join(chunk for kind, chunk in events if kind == "text") == metrics.text
+    assert metrics.sentences == ["Let's try a breathing exercise.", "Breathe in for four counts.", "Then slowly out."]
+    last_token = max(i for i, (kind, _) in enumerate(events) if kind == "token")
+    first_text = events.index(("text", "Let's"))
+    first_speak = events.index(("speak", metrics.sentences[0]))
+    assert first_text < first_speak < last_token
+    assert 1 < metrics.text_sends <= len(tokens)
+    assert 0.02 <= metrics.time_to_first_token < metrics.time_to_first_audio < metrics.generation_time
+    assert metrics.generation_time <= metrics.total_time
+
+    # The logged timings survive the production logger's redaction
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "reply.log")
+        logger = _make_logger("test_streaming_reply", filename)
+        logger.info("Sent reply to user", text_sends=metrics.text_sends, **metrics.log_fields())
+        extra = _read_entries(logger, filename)[0]["extra"]
+    assert extra["time_to_first_token"] == metrics.time_to_first_token
+    assert extra["time_to_first_audio"] == metrics.time_to_first_audio
+    assert extra["response_length"] == len(metrics.text)
+
+    # A reply that is only available whole still goes through both channels
+    class WholeReplySession(FakeSession):
+        async def generate_reply(self, instructions):
+            return "Take a moment. You are safe."
+
+    events.clear()
+    whole = WholeReplySession()
+    metrics = asyncio.run(StreamingReply(whole.send_text, whole.speak).run(reply_tokens(whole, "hi")))
+    assert metrics.tokens == 1 and metrics.sentences == ["Take a moment.", "You are safe."]
+
+
+class _ChunkedReader:
+    """Text stream reader delivering chunks with a delay before each one."""
+
+    def __init__(self, chunks, delays=0.02, size=None):
+        self.chunks = chunks
+        self.delays = delays if isinstance(delays, list) else [delays] * len(chunks)
+        self.info = type("Info", (), {"size": size})()
+
+    async def __aiter__(self):
+        for chunk, delay in zip(self.chunks, self.delays):
+            await asyncio.sleep(delay)
+            yield chunk
+
+
+def test_text_stream_is_processed_while_chunks_arrive():
+    """Safety and language checks finish before the last chunk; limits and stalls end the message."""
+    chunks = ["I have not slept in days and ", "I feel like I want to end my", " life, is that normal? ",
+              "It is the same every night and I am tired. ", "Thank you for listening."]
+    text = "".join(chunks)
+    reader = _ChunkedReader(chunks, size=len(text.encode()))
+
+    class Arrivals(ChunkProcessor):
+        name = "arrivals"
+
+        def __init__(self):
+            self.elapsed = []
+
+        def feed(self, chunk, elapsed):
+            self.elapsed.append(elapsed)
+
+    arrivals = Arrivals()
+    processors = [SafetyScanner(), LanguageDetector(), arrivals]
+    result = asyncio.run(ingest_text_stream(reader, processors=processors))
+
+    assert result.text == text and result.chunks == len(chunks) and not result.truncated
+    safety, language = result.results["safety"], result.results["language"]
+    assert safety["flagged"] and safety["categories"] == ["self_harm"]
+    assert language["language"] == "en"
+    # Both were decided on chunks before the last one: the phrase completes in the third chunk
+    assert safety["flagged_at"] == arrivals.elapsed[2]
+    assert language["decided_at"] in arrivals.elapsed[:-1]
+    assert result.metrics()["ingest_ms"] >= 60
+
+    # Over the limit: cut on a character boundary, the stream is still drained
+    reader = _ChunkedReader(["ñ" * 10, "ñ" * 10, "tail"], delays=0)
+    result = asyncio.run(ingest_text_stream(reader, max_bytes=25))
+    assert result.truncated and result.text == "ñ" * 12 and result.chunks == 3
+
+    # A stalled stream ends the message with what has arrived
+    reader = _ChunkedReader(["Hola, ", "no puedo dormir"], delays=[0, 1])
+    result = asyncio.run(ingest_text_stream(reader, idle_timeout=0.1))
+    assert result.timed_out and result.text == "Hola, "
+
+
+def test_turn_queue_coalesces_supersedes_and_caps_concurrency():
+    """Bursts become one turn, newer input cancels a stale generation, and close drains."""
+    answered, running, peak = [], [0], [0]
+
+    async def handler(turn):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        try:
+            await asyncio.sleep(0.1)
+            answered.append((turn.participant, turn.messages, turn.attempt))
+        finally:
+            running[0] -= 1
+
+    async def scenario():
+        queue = TurnQueue(handler, max_concurrency=2, coalesce_window=0.05)
+
+        # A burst from one participant is answered as a single turn
+        for text in ["hi", "I can't sleep", "again"]:
+            queue.submit("alice", text)
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)
+        assert queue.active == 1 and queue.queue_depth == 0
+
+        # New input mid-generation cancels it; both are answered together
+        queue.submit("alice", "it's been a week")
+        await asyncio.sleep(0.3)
+        assert answered == [("alice", ["hi", "I can't sleep", "again", "it's been a week"], 2)]
+
+        # Three participants, at most two turns at once
+        for name in ("bob", "carol", "dave"):
+            queue.submit(name, "hello")
+        await asyncio.sleep(0.08)
+        assert queue.active == 2 and queue.get_metrics()["participants"] == 3
+
+        # A departed participant's queued turn is dropped; close drains the rest
+        queue.cancel_participant("dave")
+        await queue.close(drain_timeout=1)
+        assert queue.submit("erin", "late") is False
+        return queue.get_metrics()
+
+    metrics = asyncio.run(scenario())
+    assert peak[0] == 2
+    assert sorted(name for name, _, _ in answered[1:]) == ["bob", "carol"]
+    assert metrics["submitted"] == 7 and metrics["completed"] == 3
+    assert metrics["coalesced"] == 3 and metrics["coalescing_rate"] == round(3 / 7, 3)
+    assert metrics["superseded"] == 1 and metrics["cancelled"] == 1
+    assert metrics["queue_depth"] == 0 and metrics["active"] == 0 and metrics["participants"] == 0
+
+
+def test_load_calculator_accepts_defers_and_rejects_jobs():
+    """The scarcest resource sets the load; offers are accepted, deferred or rejected on it."""
+
+    class FakeRequest:
+        def __init__(self):
+            self.decision = None
+
+        async def accept(self):
+            self.decision = "accept"
+
+        async def reject(self):
+            self.decision = "reject"
+
+    running, cpu = [0], [0.1]
+    profile = NodeProfile(max_sessions=4, max_rss_mb=1000, defer_interval=0.02, max_defer=0.1)
+    calculator = LoadCalculator(profile, active_sessions=lambda: running[0], cpu=lambda: cpu[0],
+                                rss_mb=lambda: 300.0, min_interval=0)
+
+    async def offer():
+        request = FakeRequest()
+        assert await calculator.request_fnc(request) == request.decision
+        return request.decision
+
+    async def scenario():
+        # Accepted jobs are reserved until they start, so a burst stops at the limit
+        decisions = [await offer() for _ in range(5)]
+        assert decisions == ["accept"] * 3 + ["reject"] * 2
+        assert calculator.sample().limited_by == "sessions"
+
+        # Accepted jobs that start release their reservations instead of counting twice
+        running[0] = 3
+        assert calculator.sample().sessions == 3 and calculator.get_metrics()["reserved"] == 0
+
+        # Between the thresholds an offer waits for load to fall
+        pending = asyncio.ensure_future(offer())
+        await asyncio.sleep(0.03)
+        running[0] = 1
+        assert await pending == "accept"
+        assert calculator.sample().sessions == 2
+        running[0] = 3
+        assert await offer() == "reject"
+
+        # CPU saturation rejects even with free session slots
+        running[0], cpu[0] = 0, 0.85
+        assert await offer() == "reject" and calculator.last.limited_by == "cpu"
+        assert calculator.load_fnc() == 1.0
+
+    asyncio.run(scenario())
+    metrics = calculator.get_metrics()
+    assert (metrics["accepted"], metrics["deferred"], metrics["rejected"]) == (4, 4, 4)
+
+    assert node_profile("small").max_sessions < node_profile("large").max_sessions
+    os.environ["WORKER_MAX_SESSIONS"] = "7"
+    try:
+        assert node_profile("small").max_sessions == 7
+    finally:
+        del os.environ["WORKER_MAX_SESSIONS"]
+    if os.path.exists("/proc/stat"):
+        assert process_tree_rss_mb() > 1
+
+
+def test_simulation_runs_the_worker_entrypoint_by_default():
+    """The default run drives worker.entrypoint; the fake session's events feed its turn tracker."""
+    config = SimulationConfig(
+        sessions=3, turns=2, think_time=0.01, connect_delay=0.01, process_modules=("turn_queue",),
+        model=FakeModelConfig(handshake_delay=0.01, start_delay=0.01, first_token_latency=0.02,
+                              tokens_per_second=1000, reply_tokens=8, jitter=0))
+    with _worker_with_fake_livekit() as tmp:
+        report = asyncio.run(run_simulation(config))
+        with open(os.path.join(tmp, "logs", "ai_therapist.log")) as f:
+            entries = [json.loads(json.loads(line)["message"]) for line in f]
+
+    assert report.failed == 0 and report.turns == 6, report.errors
+    assert report.entrypoint.startswith("worker.entrypoint")
+    summaries = [entry["extra"] for entry in entries if entry["message"] == "Voice turn latency summary"]
+    assert len(summaries) == 3 and all(summary["turns"] == 2 for summary in summaries)
+    assert all(summary["stages"]["first_token"]["count"] == 2 for summary in summaries)
+
+
+def test_simulation_drives_concurrent_sessions_through_the_worker_entrypoint():
+    """Fake rooms and a fake model carry many sessions through worker.entrypoint; the report has latency, lag and memory."""
+    model = FakeRealtimeModel(FakeModelConfig(handshake_delay=0.02, start_delay=0.02, first_token_latency=0.05,
+                                              tokens_per_second=500, reply_tokens=12, jitter=0))
+    config = SimulationConfig(sessions=20, turns=2, think_time=0.01, ramp=0.05, connect_delay=0.02,
+                              process_modules=("turn_queue", "streaming", "ingestion"))
+    with _worker_with_fake_livekit():
+        report = asyncio.run(run_simulation(config, model=model))
+
+    assert report.failed == 0 and report.turns == 40, report.errors
+    assert 0.04 <= report.startup["p50"] <= report.startup["p99"]
+    assert 0.05 <= report.first_token["p50"] < report.complete["p50"] <= report.complete["p99"]
+    assert report.event_loop_lag["p99"] is not None and report.rss_peak_mb >= report.rss_baseline_mb
+    assert all(len(session.spoken) >= 2 for session in model.sessions if session.room is not None)
+    assert report.entrypoint.startswith("worker.entrypoint")
+    if os.path.exists("/proc/self/statm"):
+        assert report.job_process_baseline_mb > 1
+        assert report.memory_per_job_mb > report.memory_per_session_mb
+    assert "first token" in report.format() and "one process per job" in report.format()
+
+
+def test_turn_latency_tracker_times_voice_turns_from_session_events():
+    """Speech end, first token, first audio, tools and barge-ins are timed per turn and per role."""
+
+    class FakeAgentSession:
+        def __init__(self):
+            self.listeners = {}
+
+        def on(self, event, callback):
+            self.listeners.setdefault(event, []).append(callback)
+
+        def emit(self, event, **fields):
+            for callback in self.listeners.get(event, []):
+                callback(SimpleNamespace(**fields))
+
+    @timed_tool
+    async def breathing_exercise(context, exercise_type="box_breathing"):
+        """Guide the user through a breathing exercise"""
+        await asyncio.sleep(0.02)
+        return {"exercise": exercise_type}
+
+    reset_latency_histograms()
+    tmp = tempfile.TemporaryDirectory()
+    log_file, event_file = os.path.join(tmp.name, "turns.log"), os.path.join(tmp.name, "turns.bin")
+    # The production logger redacts; timings must come through as numbers
+    logger = Logger("test_turn_latency", LogConfig(json_format=True, handlers=[
+        HandlerConfig(type="file", level=LogLevel.DEBUG, formatter="json", config={"filename": log_file}),
+        HandlerConfig(type="binary", config={"filename": event_file}),
+    ]))
+    session = FakeAgentSession()
+    tracker = TurnLatencyTracker("sleep", logger=logger).attach(session)
+    assert TurnLatencyTracker.for_session(session) is tracker
+    assert breathing_exercise.__doc__ == "Guide the user through a breathing exercise"
+
+    async def turn(with_tool=False, barge_in=False):
+        session.emit("user_state_changed", old_state="listening", new_state="speaking")
+        session.emit("user_state_changed", old_state="speaking", new_state="listening")
+        session.emit("agent_state_changed", old_state="listening", new_state="thinking")
+        session.emit("metrics_collected", metrics=SimpleNamespace(ttft=0.35))
+        if with_tool:
+            await breathing_exercise(SimpleNamespace(session=session), exercise_type="4_7_8")
+        await asyncio.sleep(0.01)
+        session.emit("agent_state_changed", old_state="thinking", new_state="speaking")
+        if barge_in:
+            session.emit("user_state_changed", old_state="listening", new_state="speaking")
+        session.emit("agent_state_changed", old_state="speaking", new_state="listening")
+
+    asyncio.run(turn())
+    asyncio.run(turn(with_tool=True, barge_in=True))
+    summary = tracker.summary()
+    assert (summary["turns"], summary["barge_ins"], summary["tool_calls"]) == (2, 1, 1)
+    stages = summary["stages"]
+    assert stages["first_audio"]["count"] == 2 and stages["first_audio"]["max"] >= 0.03
+    assert stages["first_token"]["p50"] >= 0.35 and stages["tool.breathing_exercise"]["max"] >= 0.02
+    assert latency_histograms("sleep")["sleep/turn"]["count"] == 2
+
+    tracker.close()
+    summary = _read_entries(logger, log_file)[-1]["extra"]
+    assert summary["stages"]["first_token"]["p50"] == stages["first_token"]["p50"] >= 0.35
+    with BinaryEventReader(event_file) as reader:
+        turns = [fields for _, name, _, _, fields in reader.events() if name == "voice_turn"]
+    tmp.cleanup()
+    assert [turn["first_token"] for turn in turns] == [0.35, 0.35]
+    assert turns[1]["barge_ins"] == 1 and turns[1]["first_audio"] >= 0.01
+    reset_latency_histograms()
+
+
+def test_prebuilt_tool_responses_match_the_previous_tool_output():
+    """Catalogue lookups return what the tools used to build on every call."""
+    rebuilt, lookups = rebuilt_calls(), lookup_calls()
+    for name in rebuilt:
+        assert without_match(lookups[name]()) == rebuilt[name](), name
+
+    from benchmarks.tool_responses import rebuilt_breathing_exercise, rebuilt_meditation_guide
+    for exercise_type in list(BREATHING_EXERCISES) + ["unknown"]:
+        assert without_match(breathing_response(exercise_type)) == rebuilt_breathing_exercise(exercise_type)
+    for meditation_type in list(MEDITATIONS) + ["unknown"]:
+        for duration in ("5 minutes", "7 minutes"):
+            assert (without_match(meditation_response(meditation_type, duration))
+                    == rebuilt_meditation_guide(meditation_type, duration))
+    # Pre-built responses are shared, not rebuilt
+    assert breathing_response("4_7_8") is breathing_response("4_7_8")
+    assert meditation_response("body_scan", "7 minutes") is meditation_response("body_scan", "7 minutes")
+    try:
+        BREATHING_EXERCISES["4_7_8"]["name"] = "changed"
+        assert False, "expected TypeError"
+    except TypeError:
+        pass
+
+
+def test_tool_keys_resolve_loosely_written_names_with_confidence():
+    """Names, aliases and near misses resolve to the intended entry in one call."""
+    cases = [
+        (breathing_response, "Box breathing", "Box Breathing (4-4-4-4)", 1.0),
+        (breathing_response, "4-7-8", "4-7-8 Breathing", 1.0),
+        (breathing_response, "belly breathing", "Diaphragmatic Breathing", 1.0),
+        (grounding_response, "5 4 3 2 1", "5-4-3-2-1 Grounding", 1.0),
+        (grounding_response, "walking", "Mindful Walking", 1.0),
+        (lambda name: meditation_response(name, "10 minutes"), "Loving kindness", "Loving-Kindness Meditation", 1.0),
+    ]
+    for respond, query, name, confidence in cases:
+        response = respond(query)
+        assert name in response["message"] and response["match_confidence"] == confidence, query
+        assert "available_options" not in response
+
+    fuzzy = breathing_response("diaphragm breathing")
+    assert fuzzy["exercise_name"] == "Diaphragmatic Breathing" and 0.5 <= fuzzy["match_confidence"] < 1
+    assert breathing_response("box breathing exercise")["exercise_name"] == "Box Breathing (4-4-4-4)"
+
+    # Nothing (or several entries equally) matches: default entry, confidence 0, and the options
+    for query in ("juggling", "breathing", ""):
+        response = breathing_response(query)
+        assert response["match_confidence"] == 0.0 and response["exercise_name"] == "Box Breathing (4-4-4-4)"
+        assert response["available_options"] == ["box_breathing", "4_7_8", "diaphragmatic"]
+
+
+def test_role_tool_subsets_shrink_the_tool_schema():
+    """Each role registers its own tools plus role switching, from a cached manifest."""
+    from benchmarks.tool_schemas import measure_tokens
+    from tools.manifest import ALL_TOOLS, COMMON_TOOLS, ROLE_TOOLS, tool_names, tool_prompt_section
+
+    assert set(ROLE_TOOLS) == {"therapist", "meditation", "sleep", "anxiety"}
+    for role, names in ROLE_TOOLS.items():
+        assert set(names) <= set(ALL_TOOLS) and set(COMMON_TOOLS) <= set(names), role
+        section = tool_prompt_section(role)
+        assert [line.split(":")[0][2:] for line in section.splitlines()] == list(names)
+        assert tool_prompt_section(role) is section
+        assert tool_names(role, subsets=False) == ALL_TOOLS
+    assert tool_names("unknown") == ALL_TOOLS
+
+    for role, row in measure_tokens(lambda text: len(text)).items():
+        assert row['schema_subset'] < row['schema_all'] and row['prompt_subset'] < row['prompt_all'], role
+
+
+def test_role_switch_registers_the_new_roles_tools():
+    """Switching from therapist to sleep gives the agent sleep_assessment and the sleep instructions."""
+    import tools.manifest as manifest
+
+    class FakeAgent:
+        def __init__(self, role):
+            self.instructions = f"{role} prompt"
+            self.tools = list(manifest.tool_names(role))
+
+        async def update_instructions(self, instructions):
+            self.instructions = instructions
+
+        async def update_tools(self, tools):
+            self.tools = tools
+
+    agent = FakeAgent("therapist")
+    assert "sleep_assessment" not in agent.tools
+    # Tool names stand in for the function_tool objects, which need livekit-agents
+    tools_for_role, manifest.tools_for_role = manifest.tools_for_role, manifest.tool_names
+    try:
+        asyncio.run(manifest.switch_role(agent, "sleep", "sleep prompt"))
+        assert agent.tools == list(manifest.ROLE_TOOLS["sleep"]) and agent.instructions == "sleep prompt"
+        asyncio.run(manifest.switch_role(agent, "anxiety", subsets=False))
+        assert agent.tools == list(manifest.ALL_TOOLS) and agent.instructions == "sleep prompt"
+    finally:
+        manifest.tools_for_role = tools_for_role
+
+def test_tool_result_modes_drop_repeated_content():
+    """structured-only drops the message, message-only drops the fields it repeats; both cost fewer tokens."""
+    from benchmarks.tool_results import measure_tokens
+    from tools.catalog import SLEEP_ASSESSMENT_RESPONSES, compact_result, result_mode
+    from turn_metrics import estimate_tokens
+
+    full = breathing_response("4-7-8", "full")
+    structured = breathing_response("4-7-8", "structured-only")
+    message = breathing_response("4-7-8", "message-only")
+    assert "message" not in structured and structured["instructions"] == full["instructions"]
+    assert set(message) == {"message", "match_confidence"} and message["message"] == full["message"]
+    assert breathing_response("4-7-8", "structured-only") is structured
+
+    # Fields the message does not repeat are kept
+    assert SLEEP_ASSESSMENT_RESPONSES["message-only"]["assessment_questions"]
+    assert "available_options" in grounding_response("juggling", "message-only")
+    role = compact_result({"success": True, "role_type": "sleep", "role_description": "Sleep specialist",
+                           "message": "Role set to sleep."}, "message-only")
+    assert role == {"success": True, "role_type": "sleep", "message": "Role set to sleep."}
+
+    assert result_mode() == "full" and result_mode("Message-Only") == "message-only"
+    try:
+        result_mode("terse")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+    for tool, row in measure_tokens(estimate_tokens).items():
+        assert row["structured-only"] < row["full"] and row["message-only"] <= row["full"], tool
+
+    # Tool result tokens are accounted per session
+    @timed_tool
+    async def breathing_exercise(context, exercise_type="box_breathing"):
+        return breathing_response(exercise_type, "message-only")
+
+    class FakeAgentSession:
+        def on(self, event, callback):
+            pass
+
+    session = FakeAgentSession()
+    tracker = TurnLatencyTracker("therapist").attach(session)
+    asyncio.run(breathing_exercise(SimpleNamespace(session=session)))
+    assert tracker.summary()["tool_result_tokens"] == estimate_tokens(breathing_response("box_breathing", "message-only"))
+    reset_latency_histograms()
+
+
+def run_all_tests():
+    """Run all tests."""
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
+    print(f"Tests passed: {len(tests)}/{len(tests)}")
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,18 @@
+"""
+Local fakes for exercising the worker without LiveKit or OpenAI.
+"""
+
+from .fake_livekit import FakeJobContext, FakeRoom, FakeTextStreamReader
+from .fake_model import FakeModelConfig, FakeModelSession, FakeRealtimeModel
+from .fake_realtime import FakeRealtimeServer, FakeRealtimeClient
+
+__all__ = [
+    'FakeJobContext',
+    'FakeRoom',
+    'FakeTextStreamReader',
+    'FakeModelConfig',
+    'FakeModelSession',
+    'FakeRealtimeModel',
+    'FakeRealtimeServer',
+    'FakeRealtimeClient'
+]
@@ -0,0 +1,101 @@
+"""
+In-process stand-ins for the LiveKit job and room objects the worker uses.
+
+`FakeJobContext` and `FakeRoom` implement only what `worker.entrypoint`
+touches: the room name and metadata, `connect()`, text stream handler
+registration, room events and shutdown callbacks. `FakeRoom.send_text`
+injects a message as a chunked text stream from a participant, so a
+whole job can be driven without a LiveKit server.
+"""
+
+import asyncio
+import inspect
+import itertools
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+
+class FakeTextStreamReader:
+    """Text stream delivering a message in chunks, like `rtc.TextStreamReader`."""
+
+    def __init__(self, text: str, chunk_size: int = 64, chunk_interval: float = 0.0):
+        self.text = text
+        self.chunk_size = chunk_size
+        self.chunk_interval = chunk_interval
+        self.info = SimpleNamespace(size=len(text.encode("utf-8")))
+
+    async def __aiter__(self):
+        for start in range(0, len(self.text), self.chunk_size):
+            if self.chunk_interval:
+                await asyncio.sleep(self.chunk_interval)
+            yield self.text[start:start + self.chunk_size]
+
+    async def read_all(self) -> str:
+        return "".join([chunk async for chunk in self])
+
+
+class FakeRoom:
+    """Room with metadata, text stream handlers and room events."""
+
+    def __init__(self, name: str, metadata: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.metadata = metadata or {}
+        self.connected = False
+        self.handler_registered: Optional[float] = None  # perf_counter time
+        self._text_handlers: Dict[str, Callable] = {}
+        self._listeners: Dict[str, List[Callable]] = {}
+
+    def register_text_stream_handler(self, topic: str, handler: Callable):
+        self._text_handlers[topic] = handler
+        self.handler_registered = time.perf_counter()
+
+    def on(self, event: str, callback: Optional[Callable] = None):
+        """Register a room event listener (also usable as a decorator)."""
+        if callback is None:
+            return lambda fn: self.on(event, fn)
+        self._listeners.setdefault(event, []).append(callback)
+        return callback
+
+    def emit(self, event: str, *args):
+        for callback in self._listeners.get(event, []):
+            callback(*args)
+
+    def send_text(self, participant_identity: str, text: str, topic: str = "my-topic",
+                  chunk_size: int = 64, chunk_interval: float = 0.0):
+        """Deliver a message from a participant to the registered handler."""
+        handler = self._text_handlers.get(topic)
+        if handler is None:
+            raise RuntimeError(f"No text stream handler registered for topic {topic!r}")
+        handler(FakeTextStreamReader(text, chunk_size, chunk_interval), participant_identity)
+
+    def disconnect_participant(self, participant_identity: str):
+        self.emit("participant_disconnected", SimpleNamespace(identity=participant_identity))
+
+
+class FakeJobContext:
+    """Job context for one room, with a configurable connect delay."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, room: FakeRoom, connect_delay: float = 0.05):
+        self.room = room
+        self.connect_delay = connect_delay
+        self.job = SimpleNamespace(id=f"job-{next(self._ids)}")
+        # The job process; `userdata` carries what prewarm set up
+        self.proc = SimpleNamespace(userdata={})
+        self._shutdown_callbacks: List[Callable] = []
+
+    async def connect(self):
+        await asyncio.sleep(self.connect_delay)
+        self.room.connected = True
+
+    def add_shutdown_callback(self, callback: Callable):
+        self._shutdown_callbacks.append(callback)
+
+    async def shutdown(self):
+        """Run the shutdown callbacks, awaiting those that return coroutines."""
+        for callback in self._shutdown_callbacks:
+            result = callback()
+            if inspect.isawaitable(result):
+                await result
@@ -0,0 +1,162 @@
+"""
+In-process stand-in for a realtime model session.
+
+`FakeRealtimeModel.create_session` returns a `FakeModelSession` at once,
+like constructing an `AgentSession`. As with the realtime model, the
+connection handshake happens in `start`. The session implements the
+calls the worker makes: `start`, `generate_reply` (a token stream with
+time-to-first-token latency and a token rate), `send_text` and `speak`.
+Each reply is timed, so a load generator can report turn latency.
+
+Like `AgentSession`, the session emits `user_state_changed`,
+`agent_state_changed` and `metrics_collected`, so listeners such as
+`TurnLatencyTracker` see a turn per reply: the user stops speaking when a
+reply is requested, the first token reports its latency as `ttft`, the
+agent speaks from its first `speak` call and listens again once the
+reply is generated and nothing is being spoken.
+"""
+
+import asyncio
+import itertools
+import random
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class FakeModelConfig:
+    """Latency profile of the fake model (seconds)."""
+    handshake_delay: float = 0.3  # connecting, in start()
+    start_delay: float = 0.05
+    first_token_latency: float = 0.4
+    tokens_per_second: float = 40.0
+    reply_tokens: int = 40
+    speak_time: float = 0.0  # time for a speak() call to return
+    jitter: float = 0.1  # +/- fraction applied to each delay
+
+
+@dataclass
+class ReplyTiming:
+    """perf_counter timestamps of one reply."""
+    requested: float
+    first_token: Optional[float] = None
+    finished: Optional[float] = None
+
+
+_REPLY_WORDS = ("Let's take a slow breath together. Notice where you feel tension, "
+                "and let it soften as you breathe out. You are doing well.").split()
+
+
+class FakeModelSession:
+    """Model session producing paced token streams."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, config: FakeModelConfig, rng: random.Random):
+        self.config = config
+        self.session_id = f"fake_sess_{next(self._ids)}"
+        self.started = False
+        self.room: Any = None
+        self.replies: List[ReplyTiming] = []
+        self.text_sent: List[str] = []
+        self.spoken: List[str] = []
+        self._rng = rng
+        self._reply_done = asyncio.Condition()
+        self._listeners: Dict[str, List[Callable]] = {}
+        self._agent_speaking = False
+        self._generating = 0
+        self._speaking = 0
+
+    def on(self, event: str, callback: Optional[Callable] = None):
+        """Register a session event listener (also usable as a decorator)."""
+        if callback is None:
+            return lambda fn: self.on(event, fn)
+        self._listeners.setdefault(event, []).append(callback)
+        return callback
+
+    def emit(self, event: str, **fields: Any):
+        for callback in self._listeners.get(event, []):
+            callback(SimpleNamespace(**fields))
+
+    def _set_agent_state(self, state: str):
+        speaking = state == "speaking"
+        if speaking != self._agent_speaking:
+            self._agent_speaking = speaking
+            self.emit("agent_state_changed", new_state=state)
+
+    def _delay(self, seconds: float) -> float:
+        jitter = self.config.jitter
+        return max(0.0, seconds * (1 + self._rng.uniform(-jitter, jitter)))
+
+    async def start(self, room: Any = None, **kwargs: Any):
+        await asyncio.sleep(self._delay(self.config.handshake_delay + self.config.start_delay))
+        self.room = room
+        self.started = True
+
+    async def generate_reply(self, instructions: str = ""):
+        timing = ReplyTiming(requested=time.perf_counter())
+        self.replies.append(timing)
+        self.emit("user_state_changed", new_state="speaking")
+        self.emit("user_state_changed", new_state="listening")
+        self._generating += 1
+        try:
+            await asyncio.sleep(self._delay(self.config.first_token_latency))
+            interval = 1.0 / self.config.tokens_per_second
+            for i in range(self.config.reply_tokens):
+                if i:
+                    await asyncio.sleep(self._delay(interval))
+                if timing.first_token is None:
+                    timing.first_token = time.perf_counter()
+                    self.emit("metrics_collected",
+                              metrics=SimpleNamespace(ttft=timing.first_token - timing.requested))
+                word = _REPLY_WORDS[i % len(_REPLY_WORDS)]
+                yield word if i == 0 else " " + word
+            timing.finished = time.perf_counter()
+        finally:
+            self._generating -= 1
+            if not self._speaking:
+                self._set_agent_state("listening")
+            async with self._reply_done:
+                self._reply_done.notify_all()
+
+    async def send_text(self, text: str):
+        self.text_sent.append(text)
+
+    async def speak(self, text: str):
+        self.spoken.append(text)
+        self._set_agent_state("speaking")
+        self._speaking += 1
+        try:
+            if self.config.speak_time:
+                await asyncio.sleep(self._delay(self.config.speak_time))
+        finally:
+            self._speaking -= 1
+        if not self._speaking and not self._generating:
+            self._set_agent_state("listening")
+
+    async def wait_for_replies(self, count: int, timeout: float = 30.0):
+        """Wait until `count` replies have been fully generated."""
+        async def finished():
+            async with self._reply_done:
+                await self._reply_done.wait_for(
+                    lambda: sum(1 for reply in self.replies if reply.finished) >= count)
+        await asyncio.wait_for(finished(), timeout)
+
+    async def aclose(self):
+        self.started = False
+
+
+class FakeRealtimeModel:
+    """Creates `FakeModelSession`s."""
+
+    def __init__(self, config: Optional[FakeModelConfig] = None, seed: int = 0):
+        self.config = config or FakeModelConfig()
+        self.sessions: List[FakeModelSession] = []
+        self._rng = random.Random(seed)
+
+    async def create_session(self) -> FakeModelSession:
+        session = FakeModelSession(self.config, self._rng)
+        self.sessions.append(session)
+        return session
@@ -0,0 +1,139 @@
+"""
+Local stand-in for a realtime model endpoint.
+
+`FakeRealtimeServer` speaks a small JSON-lines protocol over TCP that
+mirrors the realtime session lifecycle closely enough to exercise
+connection handling:
+
+    client -> {"type": "session.update", "session": {"voice": "coral"}}
+    server -> {"type": "session.created", "session": {"id": "sess_1", "voice": "coral"}}
+    client -> {"type": "ping"}
+    server -> {"type": "pong"}
+
+The handshake delay is configurable, so connection latency is real but
+controllable. `drop_connections()` simulates a flapping upstream, and
+`reject_handshakes` makes new handshakes fail.
+"""
+
+import asyncio
+import itertools
+import json
+from typing import Optional, Set
+
+
+class FakeRealtimeServer:
+    """Asyncio TCP server imitating a realtime session endpoint."""
+
+    def __init__(self, handshake_delay: float = 0.05, host: str = "127.0.0.1"):
+        self.handshake_delay = handshake_delay
+        self.host = host
+        self.port: Optional[int] = None
+        self.reject_handshakes = False
+        self.handshakes = 0
+        self._ids = itertools.count(1)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+
+    async def start(self) -> 'FakeRealtimeServer':
+        """Listen on an ephemeral port."""
+        self._server = await asyncio.start_server(self._handle, self.host, 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        """Close the listener and every connection."""
+        self.drop_connections()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def drop_connections(self):
+        """Close every open client connection."""
+        for writer in list(self._writers):
+            writer.close()
+        self._writers.clear()
+
+    @property
+    def connections(self) -> int:
+        """Open client connections."""
+        return len(self._writers)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one client connection."""
+        self._writers.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if message["type"] == "session.update":
+                    await asyncio.sleep(self.handshake_delay)
+                    if self.reject_handshakes:
+                        reply = {"type": "error", "error": {"message": "service unavailable"}}
+                    else:
+                        self.handshakes += 1
+                        reply = {"type": "session.created",
+                                 "session": {"id": f"sess_{next(self._ids)}", **message.get("session", {})}}
+                elif message["type"] == "ping":
+                    reply = {"type": "pong"}
+                else:
+                    reply = {"type": "error", "error": {"message": f"unknown type {message['type']}"}}
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+
+class FakeRealtimeClient:
+    """Client session for `FakeRealtimeServer`, shaped like a pooled model session."""
+
+    def __init__(self, host: str, port: int, voice: str = "coral"):
+        self.host = host
+        self.port = port
+        self.voice = voice
+        self.session_id: Optional[str] = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def connect(self) -> 'FakeRealtimeClient':
+        """Connect and complete the session handshake."""
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        reply = await self._request({"type": "session.update", "session": {"voice": self.voice}})
+        if reply.get("type") != "session.created":
+            await self.close()
+            raise ConnectionError(f"Handshake failed: {reply}")
+        self.session_id = reply["session"]["id"]
+        return self
+
+    async def _request(self, message: dict) -> dict:
+        """Send one message and read the reply."""
+        self._writer.write(json.dumps(message).encode() + b"\n")
+        await self._writer.drain()
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed")
+        return json.loads(line)
+
+    async def ping(self, timeout: float = 1.0) -> bool:
+        """Health check: True if the connection answers a ping in time."""
+        if self._writer is None or self._writer.is_closing():
+            return False
+        try:
+            reply = await asyncio.wait_for(self._request({"type": "ping"}), timeout)
+        except (ConnectionError, asyncio.TimeoutError, OSError):
+            return False
+        return reply.get("type") == "pong"
+
+    async def close(self):
+        """Close the connection."""
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+            self._writer = None
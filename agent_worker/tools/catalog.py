@@ -0,0 +1,323 @@
+"""
+Static content of the therapy tools, built once at import.
+
+The catalogues are read-only tables (`MappingProxyType`). Every response
+a tool can return is pre-built from them at import, with its `message`
+already formatted, so a tool call is a dictionary lookup.
+
+The model often writes names loosely ("Box breathing", "4-7-8"). Each
+catalogue has a `CatalogueIndex` that resolves those to a key. It matches
+normalized keys, names and aliases exactly, and falls back to trigram
+similarity. Responses carry `match_confidence`. A request that matches
+nothing gets the default entry with confidence 0 and `available_options`,
+so the model can correct itself from the same result. Resolved responses
+are cached per argument.
+
+Most responses carry their content twice: as structured fields
+(`instructions`, `benefits`, ...) and again in the formatted `message`.
+The realtime model reads the whole result after every tool call, so the
+result mode (`TOOL_RESULT_MODE`) picks what it gets:
+
+- `full`: structured fields and message (the default)
+- `structured-only`: structured fields, no message
+- `message-only`: the message plus the fields it does not repeat
+  (options, questions, confidence, role keys)
+
+Responses are pre-built and cached per mode.
+
+`meditation_guide` takes a free-form duration. Responses are pre-built
+for the common durations; others are formatted on first use and cached.
+
+Responses are shared between calls and must not be mutated.
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, List, Mapping, Tuple
+
+
+def _freeze(table: Dict[str, Dict[str, Any]]) -> Mapping[str, Mapping[str, Any]]:
+    return MappingProxyType({key: MappingProxyType(entry) for key, entry in table.items()})
+
+
+BREATHING_EXERCISES = _freeze({
+    "box_breathing": {
+        "name": "Box Breathing (4-4-4-4)",
+        "aliases": ("box", "square breathing", "4-4-4-4", "four square"),
+        "instructions": "Inhale for 4 counts, hold for 4 counts, exhale for 4 counts, hold for 4 counts. Repeat this cycle.",
+        "benefits": "Calms the nervous system, reduces stress and anxiety, improves focus",
+    },
+    "4_7_8": {
+        "name": "4-7-8 Breathing",
+        "aliases": ("478", "relaxing breath", "four seven eight"),
+        "instructions": "Inhale for 4 counts, hold for 7 counts, exhale for 8 counts. Repeat 4 times.",
+        "benefits": "Promotes relaxation, helps with sleep, reduces anxiety",
+    },
+    "diaphragmatic": {
+        "name": "Diaphragmatic Breathing",
+        "aliases": ("belly breathing", "deep breathing", "abdominal breathing"),
+        "instructions": "Place one hand on your chest and one on your belly. Breathe deeply so your belly rises more than your chest.",
+        "benefits": "Improves oxygen intake, reduces stress, strengthens diaphragm",
+    },
+})
+
+GROUNDING_TECHNIQUES = _freeze({
+    "5_4_3_2_1": {
+        "name": "5-4-3-2-1 Grounding",
+        "aliases": ("54321", "five senses", "5 senses", "senses"),
+        "instructions": "Name 5 things you can see, 4 things you can touch, 3 things you can hear, 2 things you can smell, and 1 thing you can taste.",
+        "benefits": "Brings awareness to the present moment, reduces anxiety and panic",
+    },
+    "body_scan": {
+        "name": "Body Scan",
+        "aliases": ("scan", "body awareness"),
+        "instructions": "Slowly scan your body from head to toe, noticing any sensations, tension, or relaxation in each part.",
+        "benefits": "Increases body awareness, promotes relaxation, reduces stress",
+    },
+    "mindful_walking": {
+        "name": "Mindful Walking",
+        "aliases": ("walking", "walking meditation", "mindful walk"),
+        "instructions": "Walk slowly and deliberately, paying attention to each step, the feeling of your feet touching the ground.",
+        "benefits": "Connects mind and body, reduces anxiety, improves focus",
+    },
+})
+
+MEDITATIONS = _freeze({
+    "mindfulness": {
+        "name": "Mindfulness Meditation",
+        "aliases": ("mindful", "breath awareness", "breath meditation"),
+        "instructions": "Focus on your breath. When your mind wanders, gently bring it back to your breath without judgment.",
+        "benefits": "Reduces stress, improves focus, increases self-awareness",
+    },
+    "loving_kindness": {
+        "name": "Loving-Kindness Meditation",
+        "aliases": ("metta", "compassion", "kindness"),
+        "instructions": "Send wishes of peace, happiness, and well-being to yourself, loved ones, and all beings.",
+        "benefits": "Increases compassion, reduces negative emotions, improves relationships",
+    },
+    "body_scan": {
+        "name": "Body Scan Meditation",
+        "aliases": ("scan", "body scan"),
+        "instructions": "Systematically focus attention on different parts of your body, releasing tension as you go.",
+        "benefits": "Reduces physical tension, improves body awareness, promotes relaxation",
+    },
+})
+
+SLEEP_ASSESSMENT_QUESTIONS = (
+    "What time do you usually go to bed?",
+    "What time do you usually wake up?",
+    "How long does it typically take you to fall asleep?",
+    "How many times do you wake up during the night?",
+    "How would you rate your sleep quality (1-10)?",
+    "What factors do you think affect your sleep?",
+    "Do you use any devices (phone, TV) before bed?",
+    "What's your typical evening routine?",
+)
+
+ANXIETY_ASSESSMENT_QUESTIONS = (
+    "How would you describe your anxiety (physical sensations, thoughts, behaviors)?",
+    "What situations or triggers tend to cause anxiety for you?",
+    "How often do you experience anxiety (daily, weekly, occasionally)?",
+    "How does anxiety affect your daily life and activities?",
+    "What coping strategies have you tried in the past?",
+    "What would you like to achieve in managing your anxiety?",
+    "Do you have any specific fears or worries that are particularly challenging?",
+)
+
+DEFAULT_BREATHING_EXERCISE = "box_breathing"
+DEFAULT_GROUNDING_TECHNIQUE = "5_4_3_2_1"
+DEFAULT_MEDITATION = "mindfulness"
+DEFAULT_MEDITATION_DURATION = "5 minutes"
+MEDITATION_DURATIONS = ("5 minutes", "10 minutes", "15 minutes", "20 minutes")
+
+
+def _breathing(exercise: Mapping[str, str]) -> Dict[str, Any]:
+    return {
+        "exercise_name": exercise["name"],
+        "instructions": exercise["instructions"],
+        "benefits": exercise["benefits"],
+        "message": f"Let's practice {exercise['name']}. {exercise['instructions']} This technique helps with {exercise['benefits']}.",
+    }
+
+
+def _grounding(technique: Mapping[str, str]) -> Dict[str, Any]:
+    return {
+        "technique_name": technique["name"],
+        "instructions": technique["instructions"],
+        "benefits": technique["benefits"],
+        "message": f"Let's practice {technique['name']}. {technique['instructions']} This helps with {technique['benefits']}.",
+    }
+
+
+def _meditation(meditation: Mapping[str, str], duration: str) -> Dict[str, Any]:
+    return {
+        "meditation_name": meditation["name"],
+        "duration": duration,
+        "instructions": meditation["instructions"],
+        "benefits": meditation["benefits"],
+        "message": f"Let's practice {meditation['name']} for {duration}. {meditation['instructions']} This meditation helps with {meditation['benefits']}.",
+    }
+
+
+BREATHING_RESPONSES = MappingProxyType({key: _breathing(entry) for key, entry in BREATHING_EXERCISES.items()})
+GROUNDING_RESPONSES = MappingProxyType({key: _grounding(entry) for key, entry in GROUNDING_TECHNIQUES.items()})
+MEDITATION_RESPONSES = MappingProxyType({(key, duration): _meditation(entry, duration)
+                                         for key, entry in MEDITATIONS.items() for duration in MEDITATION_DURATIONS})
+
+RESULT_MODES = ("full", "structured-only", "message-only")
+
+# Fields whose content the message repeats
+_MESSAGE_FIELDS = frozenset({"exercise_name", "technique_name", "meditation_name", "duration",
+                             "instructions", "benefits", "role_description"})
+
+
+def result_mode(mode: str = None) -> str:
+    """The tool result mode, from `TOOL_RESULT_MODE` unless given."""
+    mode = (mode or os.getenv("TOOL_RESULT_MODE", "full")).lower()
+    if mode not in RESULT_MODES:
+        raise ValueError(f"Unknown tool result mode: {mode} (expected one of {', '.join(RESULT_MODES)})")
+    return mode
+
+
+def compact_result(response: Dict[str, Any], mode: str) -> Dict[str, Any]:
+    """A tool response reduced to what the result mode sends to the model."""
+    if mode == "structured-only":
+        return {key: value for key, value in response.items() if key != "message"}
+    if mode == "message-only":
+        return {key: value for key, value in response.items() if key not in _MESSAGE_FIELDS}
+    return response
+
+
+SLEEP_ASSESSMENT_RESPONSE = {
+    "assessment_questions": list(SLEEP_ASSESSMENT_QUESTIONS),
+    "message": "I'd like to understand your sleep patterns better. Let's go through some questions to help me provide personalized sleep guidance.",
+}
+
+ANXIETY_ASSESSMENT_RESPONSE = {
+    "assessment_questions": list(ANXIETY_ASSESSMENT_QUESTIONS),
+    "message": "I'd like to understand your experience with anxiety better. Let's explore your patterns so I can provide the most helpful support.",
+}
+
+SLEEP_ASSESSMENT_RESPONSES = MappingProxyType({mode: compact_result(SLEEP_ASSESSMENT_RESPONSE, mode)
+                                               for mode in RESULT_MODES})
+ANXIETY_ASSESSMENT_RESPONSES = MappingProxyType({mode: compact_result(ANXIETY_ASSESSMENT_RESPONSE, mode)
+                                                for mode in RESULT_MODES})
+
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_PARENTHESIZED = re.compile(r"\(.*?\)")
+
+
+def normalize_key(value: str) -> str:
+    """Lowercase letters and digits only: "Box breathing", "box_breathing" and "BOX-BREATHING" are equal."""
+    return _NON_ALNUM.sub("", str(value).lower())
+
+
+def _trigrams(term: str) -> FrozenSet[str]:
+    padded = f"^{term}$"
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+@dataclass(frozen=True)
+class Match:
+    """A resolved catalogue key and how it was found (exact, alias, fuzzy or default)."""
+    key: str
+    confidence: float
+    method: str
+
+
+class CatalogueIndex:
+    """
+    Resolves loosely written names to a catalogue key.
+
+    Keys, names (with and without their parenthesized part) and aliases
+    are indexed in normalized form; a normalized query that equals one of
+    them resolves with confidence 1.0. Otherwise the most similar indexed
+    term wins. Similarity is the Dice coefficient of their trigrams, or
+    at least 0.5 plus half the covered fraction when the query is a
+    fragment of the term. Below `min_confidence`, or when two entries
+    are about equally similar, the default entry is returned with
+    confidence 0.
+    """
+
+    def __init__(self, table: Mapping[str, Mapping[str, Any]], default: str, min_confidence: float = 0.5):
+        self.keys = tuple(table)
+        self.default = default
+        self.min_confidence = min_confidence
+        self._terms: Dict[str, Tuple[str, str]] = {}  # normalized term -> (key, method)
+        for key, entry in table.items():
+            for term in (key, entry["name"], _PARENTHESIZED.sub("", entry["name"])):
+                self._terms.setdefault(normalize_key(term), (key, "exact"))
+        for key, entry in table.items():
+            for alias in entry.get("aliases", ()):
+                self._terms.setdefault(normalize_key(alias), (key, "alias"))
+        self._grams = {term: _trigrams(term) for term in self._terms}
+        self._postings: Dict[str, List[str]] = {}
+        for term, grams in self._grams.items():
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(term)
+
+    def resolve(self, query: str) -> Match:
+        term = normalize_key(query or "")
+        hit = self._terms.get(term)
+        if hit is not None:
+            return Match(hit[0], 1.0, hit[1])
+        if term:
+            grams = _trigrams(term)
+            shared: Dict[str, int] = {}
+            for gram in grams:
+                for candidate in self._postings.get(gram, ()):
+                    shared[candidate] = shared.get(candidate, 0) + 1
+            scores: Dict[str, float] = {}  # key -> best similarity of its terms
+            for candidate, count in shared.items():
+                dice = 2 * count / (len(grams) + len(self._grams[candidate]))
+                if len(term) >= 4 and term in candidate:
+                    # A fragment of a longer name ("belly" for "belly breathing")
+                    dice = max(dice, 0.5 + 0.5 * len(term) / len(candidate))
+                key = self._terms[candidate][0]
+                if dice > scores.get(key, 0.0):
+                    scores[key] = dice
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            # An ambiguous query ("breathing") matches nothing in particular
+            if ranked and ranked[0][1] >= self.min_confidence and (
+                    len(ranked) == 1 or ranked[0][1] - ranked[1][1] > 0.05):
+                return Match(ranked[0][0], round(ranked[0][1], 2), "fuzzy")
+        return Match(self.default, 0.0, "default")
+
+
+BREATHING_INDEX = CatalogueIndex(BREATHING_EXERCISES, DEFAULT_BREATHING_EXERCISE)
+GROUNDING_INDEX = CatalogueIndex(GROUNDING_TECHNIQUES, DEFAULT_GROUNDING_TECHNIQUE)
+MEDITATION_INDEX = CatalogueIndex(MEDITATIONS, DEFAULT_MEDITATION)
+
+
+def _resolved(response: Dict[str, Any], match: Match, index: CatalogueIndex, mode: str) -> Dict[str, Any]:
+    """A response with its match confidence; unmatched requests also list the valid options."""
+    resolved = {**compact_result(response, mode), "match_confidence": match.confidence}
+    if match.method == "default":
+        resolved["available_options"] = list(index.keys)
+    return resolved
+
+
+@lru_cache(maxsize=1024)
+def breathing_response(exercise_type: str, mode: str = "full") -> Dict[str, Any]:
+    match = BREATHING_INDEX.resolve(exercise_type)
+    return _resolved(BREATHING_RESPONSES[match.key], match, BREATHING_INDEX, mode)
+
+
+@lru_cache(maxsize=1024)
+def grounding_response(technique: str, mode: str = "full") -> Dict[str, Any]:
+    match = GROUNDING_INDEX.resolve(technique)
+    return _resolved(GROUNDING_RESPONSES[match.key], match, GROUNDING_INDEX, mode)
+
+
+@lru_cache(maxsize=1024)
+def meditation_response(meditation_type: str, duration: str = DEFAULT_MEDITATION_DURATION,
+                        mode: str = "full") -> Dict[str, Any]:
+    match = MEDITATION_INDEX.resolve(meditation_type)
+    response = MEDITATION_RESPONSES.get((match.key, duration))
+    if response is None:
+        response = _meditation(MEDITATIONS[match.key], duration)
+    return _resolved(response, match, MEDITATION_INDEX, mode)
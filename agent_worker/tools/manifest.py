@@ -0,0 +1,85 @@
+"""
+Per-role tool manifest.
+
+Every session used to register all seven tools, so every role sent the
+full tool schema to the model and chose among all seven on every turn.
+`ROLE_TOOLS` lists the tools each role needs. Every role keeps the
+role-switching tools, so a user can still ask for another kind of
+therapist. A successful `set_therapist_role` calls `switch_role`, which
+gives the running agent the new role's tools and instructions.
+
+`tools_for_role` and `tool_prompt_section` are built once per role and
+cached. `tools_for_role` gives the tool objects passed to `Agent`, and
+`tool_prompt_section` gives the matching AVAILABLE TOOLS lines of the
+system prompt. Set `ROLE_TOOL_SUBSETS=0` to register every tool for
+every role again.
+"""
+
+import os
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Optional, Tuple
+
+ALL_TOOLS = (
+    "get_available_roles",
+    "set_therapist_role",
+    "breathing_exercise",
+    "grounding_technique",
+    "meditation_guide",
+    "sleep_assessment",
+    "anxiety_assessment",
+)
+
+COMMON_TOOLS = ("get_available_roles", "set_therapist_role")
+
+ROLE_TOOLS = MappingProxyType({
+    "therapist": COMMON_TOOLS + ("breathing_exercise", "grounding_technique"),
+    "meditation": COMMON_TOOLS + ("meditation_guide", "breathing_exercise"),
+    "sleep": COMMON_TOOLS + ("sleep_assessment", "breathing_exercise", "meditation_guide"),
+    "anxiety": COMMON_TOOLS + ("anxiety_assessment", "breathing_exercise", "grounding_technique"),
+})
+
+# One-line summaries for the system prompt
+TOOL_SUMMARIES = MappingProxyType({
+    "get_available_roles": "Show user the different therapist roles available",
+    "set_therapist_role": "Change your role based on user preference",
+    "breathing_exercise": "Guide through breathing techniques",
+    "grounding_technique": "Guide through grounding exercises",
+    "meditation_guide": "Guide through meditation sessions",
+    "sleep_assessment": "Conduct sleep assessment",
+    "anxiety_assessment": "Conduct anxiety assessment",
+})
+
+
+def subsets_enabled() -> bool:
+    return os.getenv("ROLE_TOOL_SUBSETS", "1") not in ("0", "false", "no")
+
+
+def tool_names(role_type: str, subsets: bool = True) -> Tuple[str, ...]:
+    """Names of the tools registered for a role; unknown roles get every tool."""
+    if not subsets:
+        return ALL_TOOLS
+    return ROLE_TOOLS.get(role_type, ALL_TOOLS)
+
+
+@lru_cache(maxsize=None)
+def tools_for_role(role_type: str, subsets: bool = True) -> Tuple[Any, ...]:
+    """The `function_tool` objects for a role."""
+    from . import tools
+    return tuple(getattr(tools, name) for name in tool_names(role_type, subsets))
+
+
+@lru_cache(maxsize=None)
+def tool_prompt_section(role_type: str, subsets: bool = True) -> str:
+    """AVAILABLE TOOLS lines of the system prompt for a role."""
+    return "\n".join(f"- {name}: {TOOL_SUMMARIES[name]}" for name in tool_names(role_type, subsets))
+
+
+async def switch_role(agent: Any, role_type: str, instructions: Optional[str] = None,
+                      subsets: Optional[bool] = None):
+    """Replace a running agent's tools (and instructions) with those of another role."""
+    if subsets is None:
+        subsets = subsets_enabled()
+    if instructions is not None:
+        await agent.update_instructions(instructions)
+    await agent.update_tools(list(tools_for_role(role_type, subsets)))
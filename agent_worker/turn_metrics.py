@@ -0,0 +1,262 @@
+"""
+Per-turn latency of voice sessions.
+
+`TurnLatencyTracker` listens to `AgentSession` events and times each
+voice turn from the end of the user's speech:
+
+- `first_token`: the model's time to first token, as reported in
+  `metrics_collected`
+- `first_audio`: end of user speech until the agent starts speaking,
+  which is when its first audio frame is published
+- `turn`: end of user speech until the agent is listening again
+- `tool.<name>`: duration of each tool call, recorded by the `timed_tool`
+  wrapper, which also estimates the tokens of the tool's result
+- barge-ins: the user starting to speak while the agent is speaking
+
+Every timing goes into a process-wide `LatencyHistogram`, keyed by
+therapist role and stage. Each finished turn is logged as a `voice_turn`
+binary event. `close()` can log a per-session summary when the room
+closes. The handlers only take timestamps and set fields, and a
+histogram update is a bisect over fixed bucket bounds. That keeps the
+overhead at a few microseconds per turn, so the tracker stays on for
+every session.
+"""
+
+import bisect
+import functools
+import json
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# Bucket upper bounds: 1 ms to ~76 s, 25% apart
+_BOUNDS = [0.001 * 1.25 ** i for i in range(51)]
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (seconds)."""
+
+    def __init__(self):
+        self.counts = [0] * (len(_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value: float):
+        self.counts[bisect.bisect_left(_BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given fraction of samples."""
+        if not self.count:
+            return None
+        rank = max(1, int(self.count * fraction + 0.5))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(_BOUNDS[index], self.max) if index < len(_BOUNDS) else self.max
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 4) if self.count else None,
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99),
+            'max': round(self.max, 4) if self.count else None,
+        }
+
+
+# (therapist_role, stage) -> histogram, for every session in the process
+_histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+
+
+def record_latency(role: str, stage: str, seconds: float):
+    """Add one sample to the process-wide histogram for a role and stage."""
+    histogram = _histograms.get((role, stage))
+    if histogram is None:
+        histogram = _histograms[(role, stage)] = LatencyHistogram()
+    histogram.record(seconds)
+
+
+def latency_histograms(role: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Summaries of the process-wide histograms, as `{"role/stage": summary}`."""
+    return {f"{key[0]}/{key[1]}": histogram.summary()
+            for key, histogram in sorted(_histograms.items()) if role is None or key[0] == role}
+
+
+def reset_latency_histograms():
+    _histograms.clear()
+
+
+def estimate_tokens(result: Any) -> int:
+    """Approximate model tokens of a tool result: its compact JSON at 4 characters per token."""
+    text = result if isinstance(result, str) else json.dumps(result, separators=(",", ":"), default=str)
+    return (len(text) + 3) // 4
+
+
+@dataclass
+class TurnTiming:
+    """Timestamps (perf_counter) and results of one voice turn."""
+    index: int
+    speech_ended: float
+    first_token: Optional[float] = None  # model TTFT, seconds
+    first_audio: Optional[float] = None
+    finished: Optional[float] = None
+    barge_ins: int = 0
+    # name, start (seconds after speech ended), duration, ok, result tokens
+    tools: List[Tuple[str, float, float, bool, int]] = field(default_factory=list)
+
+
+class TurnLatencyTracker:
+    """Times the voice turns of one session from its `AgentSession` events."""
+
+    _by_session: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+    def __init__(self, therapist_role: str, logger=None, session_summary: bool = True):
+        self.role = therapist_role
+        self.logger = logger
+        self.session_summary = session_summary
+        self.turns = 0
+        self.barge_ins = 0
+        self.tool_calls = 0
+        self.tool_result_tokens = 0
+        self.current: Optional[TurnTiming] = None
+        self._user_speaking = False
+        self._agent_speaking = False
+        self._session_histograms: Dict[str, LatencyHistogram] = {}
+
+    def attach(self, session: Any) -> 'TurnLatencyTracker':
+        """Subscribe to a session's events; `for_session` finds the tracker from tools."""
+        session.on("user_state_changed", self.on_user_state_changed)
+        session.on("agent_state_changed", self.on_agent_state_changed)
+        session.on("metrics_collected", self.on_metrics_collected)
+        self._by_session[session] = self
+        return self
+
+    @classmethod
+    def for_session(cls, session: Any) -> Optional['TurnLatencyTracker']:
+        try:
+            return cls._by_session.get(session)
+        except TypeError:
+            return None
+
+    def on_user_state_changed(self, event: Any):
+        state = getattr(event, "new_state", None)
+        now = time.perf_counter()
+        if state == "speaking":
+            self._user_speaking = True
+            if self._agent_speaking and self.current is not None:
+                self.current.barge_ins += 1
+                self.barge_ins += 1
+        elif self._user_speaking:
+            # Speech ended: a new turn starts. An unanswered turn is replaced.
+            self._user_speaking = False
+            self.turns += 1
+            self.current = TurnTiming(self.turns, now)
+
+    def on_agent_state_changed(self, event: Any):
+        state = getattr(event, "new_state", None)
+        now = time.perf_counter()
+        if state == "speaking":
+            self._agent_speaking = True
+            if self.current is not None and self.current.first_audio is None:
+                self.current.first_audio = now
+        else:
+            self._agent_speaking = False
+            # Thinking between two utterances (e.g. around a tool call) is part of the turn
+            if state in ("listening", "idle") and self.current is not None and self.current.first_audio is not None:
+                self.current.finished = now
+                self._finish(self.current)
+                self.current = None
+
+    def on_metrics_collected(self, event: Any):
+        ttft = getattr(getattr(event, "metrics", None), "ttft", None)
+        if self.current is not None and self.current.first_token is None and ttft is not None and ttft >= 0:
+            self.current.first_token = ttft
+
+    def tool_finished(self, name: str, started: float, ended: float, ok: bool, result_tokens: int = 0):
+        """Called by `timed_tool` when a tool call returns or raises."""
+        self.tool_calls += 1
+        self.tool_result_tokens += result_tokens
+        self._record(f"tool.{name}", ended - started)
+        if self.current is not None:
+            self.current.tools.append((name, round(started - self.current.speech_ended, 4),
+                                       round(ended - started, 4), ok, result_tokens))
+
+    def _record(self, stage: str, seconds: float):
+        record_latency(self.role, stage, seconds)
+        if self.session_summary:
+            histogram = self._session_histograms.get(stage)
+            if histogram is None:
+                histogram = self._session_histograms[stage] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def _finish(self, turn: TurnTiming):
+        """Record a completed turn."""
+        first_audio = turn.first_audio - turn.speech_ended
+        total = turn.finished - turn.speech_ended
+        self._record("first_audio", first_audio)
+        self._record("turn", total)
+        if turn.first_token is not None:
+            self._record("first_token", turn.first_token)
+        if self.logger:
+            self.logger.event("voice_turn", therapist_role=self.role, turn=turn.index,
+                              first_token=turn.first_token, first_audio=round(first_audio, 4),
+                              turn_time=round(total, 4), barge_ins=turn.barge_ins,
+                              tools=turn.tools,
+                              tool_time=round(sum(tool[2] for tool in turn.tools), 4),
+                              tool_tokens=sum(tool[4] for tool in turn.tools))
+
+    def summary(self) -> Dict[str, Any]:
+        """This session's turn counts and per-stage latency summaries."""
+        return {
+            'therapist_role': self.role,
+            'turns': self.turns,
+            'barge_ins': self.barge_ins,
+            'tool_calls': self.tool_calls,
+            'tool_result_tokens': self.tool_result_tokens,
+            'stages': {stage: histogram.summary()
+                       for stage, histogram in sorted(self._session_histograms.items())}
+        }
+
+    def close(self) -> Dict[str, Any]:
+        """Log the session summary (when enabled) and return it."""
+        summary = self.summary()
+        if self.logger and self.session_summary:
+            self.logger.info("Voice turn latency summary", **summary)
+        return summary
+
+
+def timed_tool(fn: Callable) -> Callable:
+    """
+    Time a tool call into the calling session's tracker.
+
+    Goes between `@function_tool` and the tool function; the tool's
+    signature and docstring are preserved for schema generation.
+    """
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(context, *args, **kwargs):
+        tracker = TurnLatencyTracker.for_session(getattr(context, "session", None))
+        started = time.perf_counter()
+        result = None
+        ok = False
+        try:
+            result = await fn(context, *args, **kwargs)
+            ok = True
+            return result
+        finally:
+            if tracker is not None:
+                ended = time.perf_counter()
+                tracker.tool_finished(name, started, ended, ok, estimate_tokens(result) if ok else 0)
+
+    return wrapper
@@ -0,0 +1,245 @@
+"""
+Per-participant queue of text turns.
+
+Every text message used to start its own untracked reply task. A user who
+sent several messages quickly got several concurrent generations. The
+tasks could also be garbage-collected mid-flight or outlive the room.
+`TurnQueue` is the single owner of those tasks for a room:
+
+- each participant has one worker. Their turns run in order, one at a
+  time, and at most `max_concurrency` turns run at once across the room.
+- messages that arrive within `coalesce_window` seconds of each other are
+  merged into one turn. Waiting is capped at `max_coalesce_delay` seconds
+  after the first message.
+- a message that arrives while the participant's turn is generating
+  supersedes it. The generation is cancelled, and its messages are merged
+  with the new one into the next turn.
+- at most `max_pending` messages wait per participant. Beyond that the
+  oldest is dropped.
+- `cancel_participant` drops everything for a participant who has left,
+  and `close` drains the room's turns for a while, then cancels the rest.
+
+`track` keeps a reference to other tasks, such as stream ingestion, that
+belong to the room, so they are cancelled with it as well.
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+
+@dataclass
+class Turn:
+    """One or more coalesced messages from a participant, answered together."""
+    participant: str
+    messages: List[str]
+    metadata: List[Dict[str, Any]] = field(default_factory=list)
+    attempt: int = 1  # 1 + the number of times the turn was superseded
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.messages)
+
+
+class _ParticipantQueue:
+    """Pending messages and the worker serving one participant."""
+
+    def __init__(self):
+        self.pending: Deque[Tuple[str, Dict[str, Any], float]] = deque()
+        self.arrived = asyncio.Event()
+        self.worker: Optional[asyncio.Task] = None
+        self.current: Optional[asyncio.Task] = None
+        self.attempt = 1
+        self.last_started = 0.0
+
+
+class TurnQueue:
+    """Serializes, coalesces and bounds the text turns of a room."""
+
+    def __init__(self, handler: Callable[[Turn], Awaitable[Any]], max_concurrency: int = 4,
+                 coalesce_window: float = 0.3, max_coalesce_delay: float = 1.0, max_pending: int = 20,
+                 supersede: bool = True, logger=None):
+        self.handler = handler
+        self.max_concurrency = max_concurrency
+        self.coalesce_window = coalesce_window
+        self.max_coalesce_delay = max_coalesce_delay
+        self.max_pending = max_pending
+        self.supersede = supersede
+        self.logger = logger
+
+        self._participants: Dict[str, _ParticipantQueue] = {}
+        self._tracked: Set[asyncio.Task] = set()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._closed = False
+
+        self._submitted = 0
+        self._turns = 0
+        self._completed = 0
+        self._coalesced = 0
+        self._superseded = 0
+        self._cancelled = 0
+        self._dropped = 0
+        self._errors = 0
+        self._max_depth = 0
+
+    def submit(self, participant: str, text: str, **metadata) -> bool:
+        """Queue a message; returns False if the queue is closed."""
+        if self._closed:
+            return False
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        state = self._participants.get(participant)
+        if state is None:
+            state = self._participants[participant] = _ParticipantQueue()
+
+        self._submitted += 1
+        state.pending.append((text, metadata, time.monotonic()))
+        if len(state.pending) > self.max_pending:
+            state.pending.popleft()
+            self._dropped += 1
+            if self.logger:
+                self.logger.warning("Dropped queued text message", participant_identity=participant,
+                                    max_pending=self.max_pending)
+        self._max_depth = max(self._max_depth, self.queue_depth)
+        state.arrived.set()
+
+        if self.supersede and state.current is not None and not state.current.done():
+            state.current.cancel()
+        if state.worker is None or state.worker.done():
+            state.worker = asyncio.ensure_future(self._serve(participant, state))
+        return True
+
+    def track(self, coro: Awaitable[Any]) -> asyncio.Task:
+        """Run a room-scoped task, holding a reference until it finishes."""
+        task = asyncio.ensure_future(coro)
+        if self._closed:
+            task.cancel()
+            return task
+        self._tracked.add(task)
+        task.add_done_callback(self._tracked.discard)
+        return task
+
+    async def _serve(self, participant: str, state: _ParticipantQueue):
+        """Answer a participant's messages, one coalesced turn at a time."""
+        try:
+            while state.pending:
+                await self._coalesce(state)
+                batch = list(state.pending)
+                state.pending.clear()
+                turn = Turn(participant, [text for text, _, _ in batch],
+                            [metadata for _, metadata, _ in batch], state.attempt)
+                try:
+                    async with self._slots:
+                        self._turns += 1
+                        state.last_started = time.monotonic()
+                        state.current = asyncio.ensure_future(self.handler(turn))
+                        # wait() rather than await, so cancelling the
+                        # generation does not cancel this worker
+                        await asyncio.wait({state.current})
+                except asyncio.CancelledError:
+                    # The participant left or the room closed
+                    if state.current is not None:
+                        state.current.cancel()
+                    self._cancelled += len(batch)
+                    raise
+                current, state.current = state.current, None
+
+                if current.cancelled():
+                    if not state.pending:
+                        self._cancelled += len(batch)
+                        continue
+                    # Superseded by newer input: answer everything together
+                    self._superseded += 1
+                    state.pending.extendleft(reversed(batch))
+                    state.attempt += 1
+                    continue
+                state.attempt = 1
+                self._coalesced += len(turn.messages) - 1
+                if current.exception() is not None:
+                    self._errors += 1
+                    if self.logger:
+                        self.logger.log_exception("Text turn failed", current.exception(),
+                                                  participant_identity=participant)
+                else:
+                    self._completed += 1
+        finally:
+            if self._participants.get(participant) is state and not state.pending:
+                del self._participants[participant]
+
+    async def _coalesce(self, state: _ParticipantQueue):
+        """Wait until the participant has been quiet for the coalescing window."""
+        # Messages re-queued by a superseded turn do not shorten the wait
+        deadline = max(state.pending[0][2], state.last_started) + self.max_coalesce_delay
+        while True:
+            remaining = min(state.pending[-1][2] + self.coalesce_window, deadline) - time.monotonic()
+            if remaining <= 0:
+                return
+            state.arrived.clear()
+            try:
+                await asyncio.wait_for(state.arrived.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
+
+    def cancel_participant(self, participant: str) -> int:
+        """Drop a departed participant's queued messages and cancel their turn."""
+        state = self._participants.pop(participant, None)
+        if state is None:
+            return 0
+        dropped = len(state.pending)
+        state.pending.clear()
+        self._cancelled += dropped
+        for task in (state.current, state.worker):
+            if task is not None and not task.done():
+                task.cancel()
+        return dropped
+
+    async def close(self, drain_timeout: float = 5.0):
+        """Stop accepting messages, let queued turns finish for a while, then cancel the rest."""
+        self._closed = True
+        tasks = [state.worker for state in self._participants.values() if state.worker] + list(self._tracked)
+        if tasks and drain_timeout > 0:
+            await asyncio.wait(tasks, timeout=drain_timeout)
+        for participant in list(self._participants):
+            self.cancel_participant(participant)
+        for task in list(self._tracked):
+            task.cancel()
+        tasks = [task for task in tasks if not task.done()]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @property
+    def queue_depth(self) -> int:
+        """Messages waiting across all participants."""
+        return sum(len(state.pending) for state in self._participants.values())
+
+    @property
+    def active(self) -> int:
+        """Turns currently generating."""
+        return sum(1 for state in self._participants.values()
+                   if state.current is not None and not state.current.done())
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Counters for telemetry.
+
+        `coalesced` counts answered messages merged into another message's
+        turn; `cancelled` counts messages dropped unanswered on departure or
+        close.
+        """
+        return {
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self._max_depth,
+            'active': self.active,
+            'participants': len(self._participants),
+            'submitted': self._submitted,
+            'turns': self._turns,
+            'completed': self._completed,
+            'coalesced': self._coalesced,
+            'coalescing_rate': round(self._coalesced / self._submitted, 3) if self._submitted else 0.0,
+            'superseded': self._superseded,
+            'cancelled': self._cancelled,
+            'dropped': self._dropped,
+            'errors': self._errors,
+        }
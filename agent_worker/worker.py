@@ -12,34 +12,39 @@ from livekit.plugins import (
     openai,
     noise_cancellation,
 )
-from tools.tools import (
-    anxiety_assessment,
-    breathing_exercise,
-    get_available_roles,
-    grounding_technique,
-    set_therapist_role,
-    sleep_assessment,
-    meditation_guide,
-)
+from tools.manifest import subsets_enabled, switch_role, tool_prompt_section, tools_for_role
 import asyncio
 import json
 import sys
+import time
 import uuid
+from typing import Any
 
 # Import the logger
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from utils.py_logger import get_logger, LogContext, get_config
+from utils.py_logger.collector import start_collector
+from utils.py_logger.adaptive import start_adaptive_levels
+from utils.py_logger.control import start_level_control
 
 # Import the new prompt system
 from prompts.factory import PromptFactory
 from prompts.base import PromptType, PromptContext
+from admission import LoadCalculator, node_profile
+from ingestion import LanguageDetector, SafetyScanner, ingest_text_stream
+from startup import StartupPipeline
+from streaming import StreamingReply, reply_tokens
+from turn_metrics import TurnLatencyTracker, latency_histograms
+from turn_queue import Turn, TurnQueue
 
 load_dotenv()
 
 # Get logger with production configuration
 logger = get_logger("ai_therapist_worker", get_config("production"))
+# Component logger for text turns; its level can be raised at runtime on its own
+text_logger = logger.get_child("text_stream")
 
 # Define available roles mapping to prompt types
 AVAILABLE_ROLES = {
@@ -58,6 +63,32 @@ ROLE_TO_PROMPT_TYPE = {
 }
 
 
+async def _create_model_session() -> AgentSession:
+    """
+    Build the room's model session.
+
+    This opens no connection: the realtime websocket is opened by
+    `session.start()`, which livekit-agents gives no way to do ahead of
+    the room. Building the session is cheap, so it is not pooled.
+    """
+    return AgentSession(
+        llm=openai.realtime.RealtimeModel(
+            voice="coral"
+        )
+    )
+
+
+# Longer pasted messages are truncated (the rest of the stream is drained)
+MAX_TEXT_MESSAGE_BYTES = int(os.getenv("MAX_TEXT_MESSAGE_BYTES", str(64 * 1024)))
+
+# Text turns answered at once per room; messages closer together than the
+# window are answered as one turn
+TEXT_TURN_CONCURRENCY = int(os.getenv("TEXT_TURN_CONCURRENCY", "4"))
+TEXT_COALESCE_WINDOW = float(os.getenv("TEXT_COALESCE_WINDOW", "0.3"))
+
+# Log each session's voice turn latency summary when its room closes
+TURN_LATENCY_SUMMARY = os.getenv("TURN_LATENCY_SUMMARY", "1") not in ("0", "false", "no")
+
 def get_system_prompt(role_type: str) -> str:
     """
     Get the system prompt for a given role type using the new prompt system.
@@ -99,37 +130,70 @@ def get_system_prompt(role_type: str) -> str:
         Always encourage seeking professional help for serious mental health concerns."""
 
 
-async def async_handle_text_stream(reader, participant_identity, session):
-    """Handle text stream with logging."""
+async def async_handle_text_stream(reader, participant_identity, turn_queue):
+    """Ingest a text stream and queue it as a turn for the participant."""
     try:
-        text = await reader.read_all()
-        logger.info("Received text message", 
-                   participant_identity=participant_identity,
-                   message_length=len(text))
-
-        # Generate a reply using the LLM
-        with logger.performance_timer("generate_reply", participant_identity=participant_identity):
-            response = await session.generate_reply(instructions=text)
-            logger.info("Generated reply", 
-                       participant_identity=participant_identity,
-                       response_length=len(response))
-
-        # Send the reply as text and as speech
-        await session.send_text(response)
-        await session.speak(response)
-        
-        logger.info("Sent reply to user", 
-                   participant_identity=participant_identity,
-                   response_length=len(response))
+        with text_logger.span("text_ingest", participant_identity=participant_identity):
+            # Chunks are scanned as they arrive instead of after read_all()
+            ingestion = await ingest_text_stream(
+                reader,
+                processors=[SafetyScanner(), LanguageDetector()],
+                max_bytes=MAX_TEXT_MESSAGE_BYTES
+            )
+            text = ingestion.text
+            safety = ingestion.results["safety"]
+            text_logger.info("Received text message", 
+                            participant_identity=participant_identity,
+                            message_length=len(text),
+                            language=ingestion.results["language"]["language"],
+                            safety_flagged=safety["flagged"],
+                            **ingestion.metrics())
+            if safety["flagged"]:
+                text_logger.warning("Crisis language detected in text message",
+                                    participant_identity=participant_identity,
+                                    categories=safety["categories"])
+            if ingestion.truncated:
+                text_logger.warning("Text message truncated",
+                                    participant_identity=participant_identity,
+                                    max_bytes=MAX_TEXT_MESSAGE_BYTES)
+
+        turn_queue.submit(participant_identity, text, **ingestion.metrics())
         
     except Exception as e:
-        logger.log_exception("Failed to handle text stream", e, 
-                           participant_identity=participant_identity)
+        text_logger.log_exception("Failed to handle text stream", e, 
+                                participant_identity=participant_identity)
         raise
 
 
-def handle_text_stream(reader, participant_identity, session):
-    asyncio.create_task(async_handle_text_stream(reader, participant_identity, session))
+async def answer_text_turn(turn: Turn, session):
+    """Stream the reply to a turn of one or more coalesced messages."""
+    participant_identity = turn.participant
+    with text_logger.span("text_turn", participant_identity=participant_identity,
+                          messages=len(turn.messages), attempt=turn.attempt):
+        # Stream the reply: tokens go to the text channel as they arrive
+        # and each complete sentence is spoken while generation continues
+        with text_logger.span("stream_reply", participant_identity=participant_identity):
+            reply = StreamingReply(send_text=session.send_text, speak=session.speak)
+            metrics = await reply.run(reply_tokens(session, turn.text))
+        
+        text_logger.info("Sent reply to user", 
+                        participant_identity=participant_identity,
+                        messages=len(turn.messages),
+                        text_sends=metrics.text_sends,
+                        sentences=len(metrics.sentences),
+                        **metrics.log_fields())
+        # Ingestion timings are those of the turn's latest message
+        text_logger.event("text_turn",
+                          participant_identity=participant_identity,
+                          messages=len(turn.messages),
+                          attempt=turn.attempt,
+                          message_length=len(turn.text),
+                          **metrics.log_fields(),
+                          **turn.metadata[-1])
+
+
+def handle_text_stream(reader, participant_identity, turn_queue):
+    turn_queue.track(async_handle_text_stream(reader, participant_identity, turn_queue))
 
 
 async def get_console_input():
@@ -273,18 +337,7 @@ async def create_console_session(role_type, user_name, system_prompt):
 
         await session.start(
             room=console_ctx,
-            agent=Agent(
-                instructions=system_prompt,
-                tools=[
-                    get_available_roles,
-                    set_therapist_role,
-                    breathing_exercise,
-                    grounding_technique,
-                    meditation_guide,
-                    sleep_assessment,
-                    anxiety_assessment,
-                ],
-            ),
+            agent=create_agent(system_prompt, role_type, user_name),
             room_input_options=RoomInputOptions(
                 noise_cancellation=noise_cancellation.BVC(),
             ),
@@ -314,47 +367,39 @@ async def create_console_session(role_type, user_name, system_prompt):
 
 async def entrypoint(ctx: agents.JobContext):
     """Main entrypoint with comprehensive logging."""
-    logger.info("AI Therapist Worker starting")
-    
-    # Check if we're in console mode (no room metadata)
-    room_metadata = ctx.room.metadata or {}
+    started = time.perf_counter()
+    start_level_control()
+    start_adaptive_levels(logger, loop=asyncio.get_running_loop())
+    with logger.span("entrypoint", room=ctx.room.name):
+        await _run_entrypoint(ctx, started)
+
+
+async def _on_job_shutdown(room_name: str, session_id: str, turn_queue: TurnQueue,
+                           turn_latency: TurnLatencyTracker):
+    """Finish queued text turns, release per-session logging state and export traces if configured."""
+    await turn_queue.close()
+    logger.info("Text turn queue metrics", room=room_name, **turn_queue.get_metrics())
+    turn_latency.close()
+    logger.debug("Voice turn latency histograms", histograms=latency_histograms(turn_latency.role))
+    logger.end_session(session_id)
+    logger.flush_error_summaries()
+
+    trace_dir = os.getenv("TRACE_EXPORT_DIR")
+    if not trace_dir:
+        return
+    try:
+        path = logger.export_traces(os.path.join(trace_dir, f"{room_name}.trace.json"))
+        logger.info("Exported traces", room=room_name, path=path)
+    except Exception as e:
+        logger.log_exception("Failed to export traces", e, room=room_name)
 
-    # If no room metadata, we're in console mode - get user input
-    if not room_metadata:
-        logger.info("Starting in console mode")
-        role_type, user_name = await get_console_input()
-        print(f"\n🤖 AI Therapist Agent starting in console mode...")
-        print(f"Role: {role_type}")
-        print(f"User: {user_name}")
-    else:
-        # Production mode - get from room metadata
-        role_type = room_metadata.get("therapist_role", "therapist")
-        user_name = room_metadata.get("user_name", "User")
-        
-        # Set up logging context for the session
-        session_id = str(uuid.uuid4())
-        context = LogContext(
-            user_id=user_name,
-            room_id=ctx.room.name,
-            therapist_role=role_type,
-            session_id=session_id
-        )
-        logger.set_context(context)
-        
-        logger.info("AI Therapist Agent starting in production mode", 
-                   role=role_type,
-                   user=user_name,
-                   room=ctx.room.name)
-        print(f"🤖 AI Therapist Agent starting...")
-        print(f"Role: {role_type}")
-        print(f"User: {user_name}")
-        print(f"Room: {ctx.room.name}")
 
-    # Get the appropriate system prompt using the new prompt system
-    system_prompt = get_system_prompt(role_type)
+def build_full_prompt(role_type: str, user_name: str) -> str:
+    """Render the role's system prompt with the session's role and user details."""
+    with logger.span("render_prompt", role=role_type):
+        system_prompt = get_system_prompt(role_type)
 
-    # Add role information to the prompt
-    full_prompt = f"""
+    return f"""
 {system_prompt}
 
 CURRENT ROLE: {role_type.upper()}
@@ -364,13 +409,7 @@ USER NAME: {user_name}
 IMPORTANT: You are currently operating as a {role_type} specialist. Stay within your expertise area while being helpful and supportive.
 
 AVAILABLE TOOLS:
-- get_available_roles: Show user the different therapist roles available
-- set_therapist_role: Change your role based on user preference
-- breathing_exercise: Guide through breathing techniques
-- grounding_technique: Guide through grounding exercises
-- meditation_guide: Guide through meditation sessions
-- sleep_assessment: Conduct sleep assessment
-- anxiety_assessment: Conduct anxiety assessment
+{tool_prompt_section(role_type, subsets_enabled())}
 
 STARTUP BEHAVIOR:
 - Welcome the user by name if provided
@@ -379,8 +418,49 @@ STARTUP BEHAVIOR:
 - Use the tools available to help the user effectively
 """
 
-    # Check if we're in console mode
+
+class TherapistAgent(Agent):
+    """Therapist agent whose tools and instructions follow its current role."""
+
+    def __init__(self, instructions: str, role_type: str, user_name: str):
+        super().__init__(
+            instructions=instructions,
+            tools=list(tools_for_role(role_type, subsets_enabled())),
+        )
+        self.role_type = role_type
+        self.user_name = user_name
+
+    async def set_role(self, role_type: str):
+        """Switch to another role; called by `set_therapist_role`."""
+        if role_type == self.role_type:
+            return
+        await switch_role(self, role_type, build_full_prompt(role_type, self.user_name))
+        logger.info("Therapist role switched", from_role=self.role_type, to_role=role_type)
+        self.role_type = role_type
+
+
+def create_agent(instructions: str, role_type: str, user_name: str = "User") -> Agent:
+    """Create the therapist agent with its role's tools."""
+    return TherapistAgent(instructions, role_type, user_name)
+
+
+async def _run_entrypoint(ctx: agents.JobContext, started: float):
+    """Set up the therapist session for a job."""
+    logger.info("AI Therapist Worker starting")
+    
+    # Check if we're in console mode (no room metadata)
+    room_metadata = ctx.room.metadata or {}
+
+    # If no room metadata, we're in console mode - get user input
     if not room_metadata:
+        logger.info("Starting in console mode")
+        role_type, user_name = await get_console_input()
+        print(f"\n🤖 AI Therapist Agent starting in console mode...")
+        print(f"Role: {role_type}")
+        print(f"User: {user_name}")
+
+        full_prompt = build_full_prompt(role_type, user_name)
+
         # Console mode - create a simple console-based session
         logger.info("Starting console-based therapy session", 
                    role=role_type,
@@ -392,62 +472,116 @@ STARTUP BEHAVIOR:
 
         # Start console-based LiveKit session
         await create_console_session(role_type, user_name, full_prompt)
-    else:
-        # Production mode - use LiveKit session
-        try:
-            logger.info("Creating LiveKit session", 
-                       role=role_type,
-                       user=user_name,
-                       room=ctx.room.name)
-            
-            session = AgentSession(
-                llm=openai.realtime.RealtimeModel(
-                    voice="coral"
-                )
-            )
-
-            await session.start(
-                room=ctx.room,
-                agent=Agent(
-                    instructions=full_prompt,
-                    tools=[
-                        get_available_roles,
-                        set_therapist_role,
-                        breathing_exercise,
-                        grounding_technique,
-                        meditation_guide,
-                        sleep_assessment,
-                        anxiety_assessment,
-                    ],
-                ),
-                room_input_options=RoomInputOptions(
-                    noise_cancellation=noise_cancellation.BVC(),
-                ),
-            )
-
-            logger.info("LiveKit session started successfully", 
-                       room=ctx.room.name,
-                       role=role_type)
+        return
 
-            await ctx.connect()
+    # Production mode - get from room metadata
+    role_type = room_metadata.get("therapist_role", "therapist")
+    user_name = room_metadata.get("user_name", "User")
+    
+    # Set up logging context for the session
+    session_id = str(uuid.uuid4())
+    context = LogContext(
+        user_id=user_name,
+        room_id=ctx.room.name,
+        therapist_role=role_type,
+        session_id=session_id
+    )
+    logger.set_context(context)
+    
+    logger.info("AI Therapist Agent starting in production mode", 
+               role=role_type,
+               user=user_name,
+               room=ctx.room.name)
+    print(f"🤖 AI Therapist Agent starting...")
+    print(f"Role: {role_type}")
+    print(f"User: {user_name}")
+    print(f"Room: {ctx.room.name}")
+
+    async def start_session(session: AgentSession, prompt: str) -> AgentSession:
+        # Subscribe before start so the first turn is timed too
+        TurnLatencyTracker(
+            role_type,
+            logger=logger,
+            session_summary=TURN_LATENCY_SUMMARY
+        ).attach(session)
+        await session.start(
+            room=ctx.room,
+            agent=create_agent(prompt, role_type, user_name),
+            room_input_options=RoomInputOptions(
+                noise_cancellation=noise_cancellation.BVC(),
+            ),
+        )
+        logger.info("LiveKit session started successfully", 
+                   room=ctx.room.name,
+                   role=role_type)
+        return session
+
+    def register_handlers(session_start: AgentSession, connect: Any):
+        turn_queue = TurnQueue(
+            lambda turn: answer_text_turn(turn, session_start),
+            max_concurrency=TEXT_TURN_CONCURRENCY,
+            coalesce_window=TEXT_COALESCE_WINDOW,
+            logger=text_logger
+        )
+        ctx.room.register_text_stream_handler(
+            "my-topic",
+            lambda reader, participant_identity: handle_text_stream(
+                reader, participant_identity, turn_queue
+            ),
+        )
+        # Nobody is left to answer: drop the participant's queued turns
+        ctx.room.on(
+            "participant_disconnected",
+            lambda participant: turn_queue.cancel_participant(participant.identity)
+        )
+        ctx.add_shutdown_callback(lambda: _on_job_shutdown(
+            ctx.room.name, session_id, turn_queue, TurnLatencyTracker.for_session(session_start)
+        ))
+        logger.info("Text stream handler registered", room=ctx.room.name)
+
+    # Room connect overlaps prompt rendering and model session setup; the
+    # text handler is registered once both the session and the room are up
+    pipeline = StartupPipeline(logger, started=started, room=ctx.room.name, role=role_type)
+    pipeline.add("connect", ctx.connect)
+    pipeline.add("prompt", lambda: build_full_prompt(role_type, user_name))
+    pipeline.add("session", _create_model_session)
+    pipeline.add("session_start", start_session, after=("session", "prompt"))
+    pipeline.add("handlers", register_handlers, after=("session_start", "connect"))
 
-            ctx.room.register_text_stream_handler(
-                "my-topic",
-                lambda reader, participant_identity: handle_text_stream(
-                    reader, participant_identity, session
-                ),
-            )
-            
-            logger.info("Text stream handler registered", room=ctx.room.name)
-            
-        except Exception as e:
-            logger.log_exception("Failed to start LiveKit session", e, 
-                               role=role_type,
-                               user=user_name,
-                               room=ctx.room.name)
-            raise
+    try:
+        logger.info("Creating LiveKit session", 
+                   role=role_type,
+                   user=user_name,
+                   room=ctx.room.name)
+        await pipeline.run()
+    except Exception as e:
+        logger.log_exception("Failed to start LiveKit session", e, 
+                           role=role_type,
+                           user=user_name,
+                           room=ctx.room.name)
+        raise
 
 
 if __name__ == "__main__":
-    logger.info("Starting AI Therapist Worker application")
-    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint)) 
\ No newline at end of file
+    # Job processes inherit the collector socket path and send their records
+    # to this process, which is the only one writing (and rotating) log files.
+    log_collector = start_collector(get_config("production"))
+    logger.reconfigure(get_config("production"))
+    start_level_control()
+    logger.info("Starting AI Therapist Worker application",
+                log_collector=log_collector.socket_path)
+    try:
+        # Admission limits follow WORKER_NODE_SIZE; the server stops offering
+        # jobs above reject_above, and request_fnc decides the ones it sends
+        admission = LoadCalculator(node_profile(), logger=logger)
+        logger.info("Job admission configured", node_size=os.getenv("WORKER_NODE_SIZE", "medium"),
+                    max_sessions=admission.profile.max_sessions,
+                    max_rss_mb=admission.profile.max_rss_mb)
+        agents.cli.run_app(agents.WorkerOptions(
+            entrypoint_fnc=entrypoint,
+            request_fnc=admission.request_fnc,
+            load_fnc=admission.load_fnc,
+            load_threshold=admission.profile.reject_above,
+        ))
+    finally:
+        log_collector.stop() 
\ No newline at end of file
@@ -5,6 +5,7 @@ Provides structured logging with multiple handlers and formatters.
 
 from .logger import Logger, LogLevel, LogContext, get_logger
 from .config import LogConfig, get_config
+from .tracing import Tracer, Span, get_current_span
 
 __version__ = "1.0.0"
 
@@ -14,5 +15,8 @@ __all__ = [
     'LogContext',
     'LogConfig',
     'get_logger',
-    'get_config'
+    'get_config',
+    'Tracer',
+    'Span',
+    'get_current_span'
 ] 
\ No newline at end of file
@@ -0,0 +1,245 @@
+"""
+Adaptive log verbosity under load.
+
+Log volume rises with load, which is exactly when the process can least
+afford the I/O. `AdaptiveLevelController` watches two load signals:
+
+- event-loop lag: a probe callback is posted to the loop from a watcher
+  thread and the delay until it runs is measured, so a stalled loop is
+  detected while it is still stalled
+- handler queue depth: records waiting in handlers that expose
+  `get_queue_depth()` (shipping and collector handlers)
+
+Load is the larger of lag / `lag_threshold` and depth / `queue_threshold`.
+At 1.0 or above, the process steps to the first coarser level in
+`AdaptiveLevelConfig.levels` (INFO -> WARNING by default). If load stays
+high for `escalate_after` seconds, it steps further. Once load stays
+below `restore_ratio` for `restore_after` seconds, it steps back one
+level at a time.
+
+The coarser level is applied with `logging.disable`. It therefore covers
+every logger in the process, including component loggers with their own
+levels and third-party loggers. Filtered calls are rejected by the
+cheapest check in the stdlib. Telemetry events (`Logger.event`) bypass
+`logging.disable`: they are cheap binary writes, and per-turn data such
+as `voice_turn` matters most while the process is under load. Runtime
+levels set through `control` are left alone and apply again once load
+subsides. Each change is logged as a
+WARNING marker record, which stays visible at every step.
+
+Usage (from the event loop):
+    start_adaptive_levels(loop=asyncio.get_running_loop())
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from .config import AdaptiveLevelConfig
+from .logger import Logger, LogLevel, get_logger
+
+
+class EventLoopLagMonitor:
+    """Measures event-loop scheduling delay from another thread."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self._probe_sent: Optional[float] = None
+
+    def _ack(self, sent: float):
+        """Runs on the loop: record how long the probe waited."""
+        self.lag = time.monotonic() - sent
+        self.max_lag = max(self.max_lag, self.lag)
+        self._probe_sent = None
+
+    def sample(self) -> float:
+        """
+        Current lag in seconds.
+
+        While a probe is outstanding, the time it has waited so far is the
+        lag; otherwise the last completed probe's lag is returned and a new
+        probe is posted.
+        """
+        sent = self._probe_sent
+        now = time.monotonic()
+        if sent is not None:
+            return max(self.lag, now - sent)
+        if self.loop.is_closed():
+            return 0.0
+        self._probe_sent = now
+        try:
+            self.loop.call_soon_threadsafe(self._ack, now)
+        except RuntimeError:
+            self._probe_sent = None
+        return self.lag
+
+
+def handler_queue_depth(logger: Logger) -> int:
+    """Records waiting in the handlers of a logger's root that report a queue depth."""
+    while logger.parent is not None:
+        logger = logger.parent
+    return sum(handler.get_queue_depth() for handler in logger._logger.handlers
+               if hasattr(handler, 'get_queue_depth'))
+
+
+class AdaptiveLevelController:
+    """Steps the process to coarser levels under load and back when it subsides."""
+
+    def __init__(self, logger: Logger, config: AdaptiveLevelConfig,
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.logger = logger
+        self.config = config
+        self.pid = os.getpid()
+        self.lag_monitor = EventLoopLagMonitor(loop) if loop is not None else None
+        self.step = 0  # index into [base] + config.levels
+        self.transitions = 0
+        self.last_load = 0.0
+        self._base_disable = logging.root.manager.disable
+        self._pressure_since: Optional[float] = None
+        self._calm_since: Optional[float] = None
+        self._degraded_seconds = 0.0
+        self._degraded_since: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop):
+        """Measure lag on a (new) event loop."""
+        if self.lag_monitor is None or self.lag_monitor.loop is not loop:
+            self.lag_monitor = EventLoopLagMonitor(loop)
+
+    def start(self) -> 'AdaptiveLevelController':
+        """Start the watcher thread."""
+        self._thread = threading.Thread(target=self._run, name="py_logger-adaptive", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop watching and restore the original level."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.config.check_interval * 4)
+        while self.step > 0:
+            self._change_step(self.step - 1, 0.0, reason="stopped")
+
+    def _run(self):
+        """Sample load every `check_interval` seconds."""
+        while not self._stop.wait(self.config.check_interval):
+            try:
+                lag = self.lag_monitor.sample() if self.lag_monitor is not None else 0.0
+                self.evaluate(lag, handler_queue_depth(self.logger))
+            except Exception as e:
+                print(f"Adaptive level check failed: {e}")
+
+    @property
+    def level(self) -> LogLevel:
+        """Current effective floor level."""
+        return self.config.levels[self.step - 1] if self.step else self.logger.get_level()
+
+    def evaluate(self, lag: float, queue_depth: int, now: Optional[float] = None) -> int:
+        """Apply one load sample; returns the step after it (0 = original level)."""
+        if now is None:
+            now = time.monotonic()
+        config = self.config
+        load = max(lag / config.lag_threshold if config.lag_threshold else 0.0,
+                   queue_depth / config.queue_threshold if config.queue_threshold else 0.0)
+        self.last_load = load
+
+        if load >= 1.0:
+            self._calm_since = None
+            if self.step == 0:
+                self._pressure_since = now
+                self._change_step(1, load, lag=lag, queue_depth=queue_depth)
+            elif (self.step < len(config.levels)
+                  and now - self._pressure_since >= config.escalate_after):
+                self._pressure_since = now
+                self._change_step(self.step + 1, load, lag=lag, queue_depth=queue_depth)
+        elif load < config.restore_ratio and self.step > 0:
+            if self._calm_since is None:
+                self._calm_since = now
+            elif now - self._calm_since >= config.restore_after:
+                self._calm_since = now
+                self._pressure_since = now
+                self._change_step(self.step - 1, load, lag=lag, queue_depth=queue_depth)
+        else:
+            self._calm_since = None
+        return self.step
+
+    def _change_step(self, step: int, load: float, reason: str = "load", **signals):
+        """Switch levels; the WARNING marker is logged while it is still enabled."""
+        previous = self.level
+        degrading = step > self.step
+        if degrading:
+            self._marker(previous, step, load, reason, signals)
+        self.step = step
+        self.transitions += 1
+        now = time.monotonic()
+        if step == 0:
+            logging.disable(self._base_disable)
+            if self._degraded_since is not None:
+                self._degraded_seconds += now - self._degraded_since
+                self._degraded_since = None
+        else:
+            # disable(n) drops records at n and below, keeping config.levels[step - 1]
+            logging.disable(max(self._base_disable, self.config.levels[step - 1].value - 1))
+            if self._degraded_since is None:
+                self._degraded_since = now
+        if not degrading:
+            self._marker(previous, step, load, reason, signals)
+
+    def _marker(self, previous: LogLevel, step: int, load: float, reason: str, signals: Dict[str, Any]):
+        """Log a level change."""
+        level = self.config.levels[step - 1] if step else self.logger.get_level()
+        direction = "lowered" if step > self.step else "restored"
+        self.logger.warning(f"Log verbosity {direction}: {previous.name} -> {level.name}",
+                            adaptive_level=level.name, previous_level=previous.name,
+                            load=round(load, 3), reason=reason, **signals)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get the current level, load and transition counts."""
+        degraded = self._degraded_seconds
+        if self._degraded_since is not None:
+            degraded += time.monotonic() - self._degraded_since
+        return {
+            'level': self.level.name,
+            'degraded': self.step > 0,
+            'load': round(self.last_load, 3),
+            'event_loop_lag': self.lag_monitor.lag if self.lag_monitor else None,
+            'max_event_loop_lag': self.lag_monitor.max_lag if self.lag_monitor else None,
+            'queue_depth': handler_queue_depth(self.logger),
+            'transitions': self.transitions,
+            'degraded_seconds': round(degraded, 3)
+        }
+
+
+_controller: Optional[AdaptiveLevelController] = None
+
+
+def start_adaptive_levels(logger: Optional[Logger] = None,
+                          loop: Optional[asyncio.AbstractEventLoop] = None
+                          ) -> Optional[AdaptiveLevelController]:
+    """
+    Start adaptive levels for this process (once per process).
+
+    Uses the logger's `LogConfig.adaptive`; returns None when it is not
+    configured. Calling again with another loop moves lag measurement
+    to that loop.
+    """
+    global _controller
+
+    if logger is None:
+        logger = get_logger()
+    if _controller is not None and _controller.pid == os.getpid():
+        if loop is not None:
+            _controller.attach_loop(loop)
+        return _controller
+
+    config = logger.config.adaptive
+    if config is None:
+        return None
+    _controller = AdaptiveLevelController(logger, config, loop=loop).start()
+    return _controller
@@ -0,0 +1,398 @@
+"""
+Streaming analytics over JSON log files.
+
+Reads plain or compressed (.gz, .bz2, .xz) logs line by line and
+aggregates `performance_timer` durations per operation and therapist role
+into mergeable quantile sketches, alongside error and session counts per
+time bucket. Memory does not grow with the number of records read.
+
+Usage:
+    python -m utils.py_logger.analytics logs/ai_therapist.log --rotated
+    python -m utils.py_logger.analytics logs/*.log.gz --bucket 300 --export json
+    python -m utils.py_logger.analytics logs/ai_therapist.log --follow --interval 10
+"""
+
+import argparse
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+import math
+import os
+import re
+import sys
+import time
+from typing import Dict, Any, Optional, List, Iterator, Iterable, Tuple
+
+from .logfiles import find_log_files, parse_record, record_field
+
+
+_PERFORMANCE_MESSAGE = re.compile(r"^Performance: (?P<operation>.+) completed in (?P<duration>[0-9.]+)s$")
+
+_ERROR_LEVELS = frozenset(('ERROR', 'CRITICAL'))
+
+
+class QuantileSketch:
+    """
+    Log-bucketed quantile sketch with bounded relative error.
+
+    Values are counted in buckets whose bounds grow geometrically, so any
+    reported quantile is within `relative_accuracy` of the true value. When
+    more than `max_buckets` are in use the lowest buckets are merged.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets: Dict[int, int] = {}
+        self._zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        """Add a non-negative value to the sketch."""
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+        if value <= 0:
+            self._zeros += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self._buckets[key] = self._buckets.get(key, 0) + 1
+        if len(self._buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self):
+        """Merge the two lowest buckets to stay within max_buckets."""
+        lowest, second = sorted(self._buckets)[:2]
+        self._buckets[second] += self._buckets.pop(lowest)
+
+    def merge(self, other: 'QuantileSketch'):
+        """Fold another sketch with the same accuracy into this one."""
+        for key, count in other._buckets.items():
+            self._buckets[key] = self._buckets.get(key, 0) + count
+        self._zeros += other._zeros
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        while len(self._buckets) > self.max_buckets:
+            self._collapse()
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the q-quantile (0 <= q <= 1)."""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self._zeros:
+            return 0.0
+
+        seen = self._zeros
+        for key in sorted(self._buckets):
+            seen += self._buckets[key]
+            if seen > rank:
+                estimate = 2 * self._gamma ** key / (self._gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Arithmetic mean of the added values."""
+        return self.total / self.count if self.count else None
+
+
+class _Bucket:
+    """Aggregates for one time bucket."""
+
+    __slots__ = ('sketches', 'errors', 'records', 'sessions')
+
+    def __init__(self):
+        self.sketches: Dict[Tuple[str, str], QuantileSketch] = {}
+        self.errors = 0
+        self.records = 0
+        self.sessions = set()
+
+
+class LogAnalyzer:
+    """
+    Time-bucketed aggregation of log records.
+
+    Only the most recent `retain_buckets` buckets are kept (older ones are
+    folded into the running totals), which keeps memory constant when
+    following a live log.
+    """
+
+    def __init__(self, bucket_seconds: int = 60, retain_buckets: int = 1440,
+                 relative_accuracy: float = 0.01):
+        self.bucket_seconds = bucket_seconds
+        self.retain_buckets = retain_buckets
+        self.relative_accuracy = relative_accuracy
+        self._buckets: Dict[int, _Bucket] = {}
+        self._totals: Dict[Tuple[str, str], QuantileSketch] = {}
+        self.records = 0
+        self.errors = 0
+        self.unparsed = 0
+
+    def process_line(self, line: str):
+        """Parse and aggregate one log line."""
+        record = parse_record(line)
+        if record is None:
+            self.unparsed += 1
+            return
+        self.process(record)
+
+    def process(self, record: Dict[str, Any]):
+        """Aggregate one parsed record."""
+        self.records += 1
+        when = record['time'] if record['time'] is not None else time.time()
+        start = int(when // self.bucket_seconds) * self.bucket_seconds
+
+        bucket = self._buckets.get(start)
+        if bucket is None:
+            bucket = self._buckets[start] = _Bucket()
+            if len(self._buckets) > self.retain_buckets:
+                del self._buckets[min(self._buckets)]
+        bucket.records += 1
+
+        if record['level'] in _ERROR_LEVELS:
+            bucket.errors += 1
+            self.errors += 1
+
+        session_id = record_field(record, 'session_id')
+        if session_id is not None:
+            bucket.sessions.add(session_id)
+
+        measurement = _extract_duration(record)
+        if measurement is not None:
+            operation, duration = measurement
+            role = record_field(record, 'therapist_role') or '-'
+            key = (operation, role)
+            sketch = bucket.sketches.get(key)
+            if sketch is None:
+                sketch = bucket.sketches[key] = QuantileSketch(self.relative_accuracy)
+            sketch.add(duration)
+            total = self._totals.get(key)
+            if total is None:
+                total = self._totals[key] = QuantileSketch(self.relative_accuracy)
+            total.add(duration)
+
+    def process_lines(self, lines: Iterable[str]):
+        """Aggregate every line from an iterable."""
+        for line in lines:
+            self.process_line(line)
+
+    def bucket_rows(self) -> List[Dict[str, Any]]:
+        """Per-bucket, per-operation rows with latency percentiles."""
+        rows = []
+        for start in sorted(self._buckets):
+            bucket = self._buckets[start]
+            base = {
+                'bucket_start': start,
+                'records': bucket.records,
+                'errors': bucket.errors,
+                'sessions': len(bucket.sessions)
+            }
+            if not bucket.sketches:
+                rows.append(dict(base, operation=None, therapist_role=None,
+                                 count=0, p50=None, p99=None, max=None))
+            for (operation, role), sketch in sorted(bucket.sketches.items()):
+                rows.append(dict(base, **_sketch_row(operation, role, sketch)))
+        return rows
+
+    def summary_rows(self) -> List[Dict[str, Any]]:
+        """Overall per-operation rows across all buckets seen."""
+        return [_sketch_row(operation, role, sketch)
+                for (operation, role), sketch in sorted(self._totals.items())]
+
+
+def _sketch_row(operation: str, role: str, sketch: QuantileSketch) -> Dict[str, Any]:
+    """Summarize a sketch as a report row."""
+    return {
+        'operation': operation,
+        'therapist_role': role,
+        'count': sketch.count,
+        'p50': sketch.quantile(0.5),
+        'p99': sketch.quantile(0.99),
+        'max': sketch.max
+    }
+
+
+def _extract_duration(record: Dict[str, Any]) -> Optional[Tuple[str, float]]:
+    """Get (operation, seconds) from a performance record, if it is one."""
+    extra = record['extra'] if isinstance(record['extra'], dict) else {}
+    duration = extra.get('duration')
+    operation = extra.get('operation')
+    if isinstance(duration, (int, float)) and operation:
+        return str(operation), float(duration)
+
+    message = record['message']
+    if isinstance(message, str) and message.startswith("Performance: "):
+        match = _PERFORMANCE_MESSAGE.match(message)
+        if match:
+            return match.group('operation'), float(match.group('duration'))
+    return None
+
+
+def open_log(path: str) -> io.TextIOBase:
+    """Open a plain or compressed log file for streaming text reads."""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rt', encoding='utf-8', errors='replace')
+    if path.endswith('.xz'):
+        return lzma.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+
+def follow(path: str, poll_interval: float = 0.5, from_start: bool = False) -> Iterator[Optional[str]]:
+    """
+    Tail a log file across rotations.
+
+    Yields complete lines as they are appended, and None whenever no new
+    data arrived during a poll so callers can do periodic work.
+    """
+    f = None
+    inode = None
+    pending = ""
+
+    while True:
+        if f is None:
+            try:
+                f = open(path, 'r', encoding='utf-8', errors='replace')
+            except OSError:
+                from_start = True  # the file did not exist yet, so nothing is old
+                time.sleep(poll_interval)
+                yield None
+                continue
+            inode = os.fstat(f.fileno()).st_ino
+            if not from_start:
+                f.seek(0, os.SEEK_END)
+            from_start = True  # files opened after a rotation are read in full
+
+        chunk = f.read()
+        if chunk:
+            pending += chunk
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                if line:
+                    yield line
+            continue
+
+        try:
+            st = os.stat(path)
+            rotated = st.st_ino != inode or st.st_size < f.tell()
+        except OSError:
+            rotated = True
+        if rotated:
+            # Lines may have been written between the last read and the
+            # rotation: drain the old file before switching
+            pending += f.read()
+            f.close()
+            f = None
+            for line in pending.split("\n"):
+                if line:
+                    yield line
+            pending = ""
+            continue
+
+        time.sleep(poll_interval)
+        yield None
+
+
+def _format_seconds(value: Optional[float]) -> str:
+    """Format a duration for the text report."""
+    return "-" if value is None else f"{value * 1000:.1f}ms"
+
+
+def print_report(analyzer: LogAnalyzer, out=sys.stdout):
+    """Print bucketed and overall tables."""
+    out.write(f"{'bucket (UTC)':<20} {'operation':<24} {'role':<12} {'count':>6} "
+              f"{'p50':>10} {'p99':>10} {'errors':>6} {'sessions':>8}\n")
+    for row in analyzer.bucket_rows():
+        start = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(row['bucket_start']))
+        out.write(f"{start:<20} {row['operation'] or '-':<24} {row['therapist_role'] or '-':<12} "
+                  f"{row['count']:>6} {_format_seconds(row['p50']):>10} {_format_seconds(row['p99']):>10} "
+                  f"{row['errors']:>6} {row['sessions']:>8}\n")
+
+    out.write(f"\nTotals: {analyzer.records} records, {analyzer.errors} errors, "
+              f"{analyzer.unparsed} unparsed lines\n")
+    for row in analyzer.summary_rows():
+        out.write(f"  {row['operation']:<24} {row['therapist_role']:<12} n={row['count']:<6} "
+                  f"p50={_format_seconds(row['p50'])} p99={_format_seconds(row['p99'])} "
+                  f"max={_format_seconds(row['max'])}\n")
+
+
+def export_report(analyzer: LogAnalyzer, fmt: str, out=sys.stdout):
+    """Export bucketed rows as JSON or CSV."""
+    rows = analyzer.bucket_rows()
+    if fmt == "json":
+        json.dump({'buckets': rows, 'summary': analyzer.summary_rows()}, out)
+        out.write("\n")
+    else:
+        writer = csv.DictWriter(out, fieldnames=['bucket_start', 'operation', 'therapist_role', 'count',
+                                                 'p50', 'p99', 'max', 'records', 'errors', 'sessions'])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Latency percentiles and error rates from JSON logs.")
+    parser.add_argument("paths", nargs="+", help="Log files (plain, .gz, .bz2 or .xz)")
+    parser.add_argument("--rotated", action="store_true",
+                        help="Also read rotated backups of each path, oldest first")
+    parser.add_argument("--bucket", type=int, default=60, help="Bucket size in seconds")
+    parser.add_argument("--export", choices=("json", "csv"), help="Export rows instead of printing tables")
+    parser.add_argument("--output", help="Write the report to a file instead of stdout")
+    parser.add_argument("--follow", action="store_true", help="Tail the (single) live log")
+    parser.add_argument("--interval", type=float, default=10.0, help="Report interval in follow mode")
+    parser.add_argument("--retain", type=int, default=1440, help="Number of buckets to keep")
+    args = parser.parse_args(argv)
+
+    analyzer = LogAnalyzer(bucket_seconds=args.bucket, retain_buckets=args.retain)
+
+    def report():
+        out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        try:
+            if args.export:
+                export_report(analyzer, args.export, out)
+            else:
+                print_report(analyzer, out)
+        finally:
+            if args.output:
+                out.close()
+
+    if args.follow:
+        next_report = time.monotonic() + args.interval
+        try:
+            for line in follow(args.paths[0]):
+                if line is not None:
+                    analyzer.process_line(line)
+                if time.monotonic() >= next_report:
+                    report()
+                    next_report = time.monotonic() + args.interval
+        except KeyboardInterrupt:
+            report()
+        return 0
+
+    for path in args.paths:
+        files = find_log_files(path, include_compressed=True) if args.rotated else [path]
+        for filename in files:
+            with open_log(filename) as f:
+                analyzer.process_lines(f)
+    report()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
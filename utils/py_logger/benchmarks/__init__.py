@@ -0,0 +1,6 @@
+"""
+Benchmarks for the logging system.
+
+Run from the repository root, e.g.:
+    python -m utils.py_logger.benchmarks.collector_throughput
+"""
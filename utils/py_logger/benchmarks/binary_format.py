@@ -0,0 +1,105 @@
+"""
+Size and write cost of the binary event format against the JSON path.
+
+Both paths log the same per-turn telemetry under a session context: the
+JSON path is `Logger.info` through a rotating handler with the JSON
+formatter (the production setup), the binary path is `Logger.event`
+through a "binary" handler. Also times reading the binary file back and
+converting it to JSON lines.
+
+Usage:
+    python -m utils.py_logger.benchmarks.binary_format --records 100000
+"""
+
+import argparse
+import io
+import os
+import tempfile
+import time
+
+from ..binary import BinaryEventReader, convert_to_json_lines
+from ..config import HandlerConfig, LogConfig
+from ..logger import Logger, LogLevel
+
+
+OPERATIONS = ("generate_reply", "send_text", "speak", "tool_call")
+TOOLS = ("breathing_exercise", "grounding_technique", "meditation_guide", "sleep_assessment")
+
+
+def _fields(i: int):
+    """Fields of a typical per-turn event."""
+    return {
+        'operation': OPERATIONS[i % 4],
+        'tool_name': TOOLS[i % 4],
+        'participant_identity': f"user-{i % 50}",
+        'turn': i,
+        'duration': 0.25 + (i % 1000) / 1000.0,
+        'response_length': 100 + i % 400,
+        'success': i % 17 != 0,
+    }
+
+
+def _logger(name: str, handler: HandlerConfig) -> Logger:
+    """Logger with a single handler and the production JSON entry format."""
+    return Logger(name, LogConfig(level=LogLevel.INFO, json_format=True, handlers=[handler]))
+
+
+def _time_writes(write, fields, logger: Logger) -> float:
+    """Write every event under a session context; returns mean ns per event."""
+    with logger.context(session_id="9f1c2a7e-5b1d-4a36-8c1e-3d2f6b7a9e10", room_id="therapist-sleep-1a2b3c4d",
+                        user_id="Alex", therapist_role="sleep"):
+        start = time.perf_counter_ns()
+        for i, values in enumerate(fields):
+            write(OPERATIONS[i % 4], values)
+        elapsed = time.perf_counter_ns() - start
+    for handler in logger._logger.handlers:
+        handler.close()
+    return elapsed / len(fields)
+
+
+def run(records: int):
+    """Write `records` events both ways and print the comparison."""
+    fields = [_fields(i) for i in range(records)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "events.log")
+        json_logger = _logger("bench_json", HandlerConfig(
+            type="rotating", formatter="json",
+            config={"filename": json_path, "max_bytes": 1 << 40}
+        ))
+        json_ns = _time_writes(lambda name, values: json_logger.info(name, **values), fields, json_logger)
+
+        binary_path = os.path.join(tmp, "events.bin")
+        binary_logger = _logger("bench_binary", HandlerConfig(type="binary", config={"filename": binary_path}))
+        binary_ns = _time_writes(lambda name, values: binary_logger.event(name, **values), fields, binary_logger)
+
+        json_size = os.path.getsize(json_path)
+        binary_size = os.path.getsize(binary_path)
+
+        start = time.perf_counter_ns()
+        with BinaryEventReader(binary_path) as reader:
+            read = sum(1 for _ in reader.events())
+        read_ns = (time.perf_counter_ns() - start) / read
+
+        start = time.perf_counter_ns()
+        convert_to_json_lines([binary_path], io.StringIO())
+        convert_ns = (time.perf_counter_ns() - start) / records
+
+    print(f"{records} events")
+    print(f"{'':<10} {'bytes/event':>12} {'write ns/event':>15}")
+    print(f"{'json':<10} {json_size / records:>12.1f} {json_ns:>15.0f}")
+    print(f"{'binary':<10} {binary_size / records:>12.1f} {binary_ns:>15.0f}")
+    print(f"binary is {json_size / binary_size:.1f}x smaller and {json_ns / binary_ns:.1f}x faster to write")
+    print(f"binary read: {read_ns:.0f} ns/event; convert to JSON lines: {convert_ns:.0f} ns/event")
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark the binary event format.")
+    parser.add_argument("--records", type=int, default=100000)
+    args = parser.parse_args()
+    run(args.records)
+
+
+if __name__ == "__main__":
+    main()
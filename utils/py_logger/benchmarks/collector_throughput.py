@@ -0,0 +1,117 @@
+"""
+Throughput of the multiprocess log collector.
+
+Starts a collector writing to a rotating file, then runs N producer
+processes that log as fast as they can through `CollectorHandler`.
+Reports end-to-end records/s and checks that no record was lost.
+
+Usage:
+    python -m utils.py_logger.benchmarks.collector_throughput --producers 32 --records 5000
+"""
+
+import argparse
+import glob
+import multiprocessing
+import os
+import tempfile
+import time
+
+from ..config import HandlerConfig, LogConfig
+from ..collector import LogCollector
+from ..handlers import RotatingFileHandler
+from ..logger import Logger, LogLevel
+
+
+def _produce(socket_path: str, spool_dir: str, producer_id: int, records: int, start_event):
+    """Producer process body: log `records` messages through the collector."""
+    config = LogConfig(
+        level=LogLevel.INFO,
+        json_format=True,
+        handlers=[HandlerConfig(
+            type="collector",
+            config={"socket_path": socket_path, "spool_dir": spool_dir}
+        )]
+    )
+    logger = Logger(f"producer-{producer_id}", config)
+    start_event.wait()
+    with logger.context(session_id=f"session-{producer_id}", therapist_role="therapist"):
+        for i in range(records):
+            logger.info("Generated reply", turn=i, response_length=120)
+    for handler in logger._logger.handlers:
+        handler.close()
+
+
+def run(producers: int, records: int) -> dict:
+    """Run the benchmark and return its results."""
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "collector.log")
+        spool_dir = os.path.join(tmp, "spool")
+        writer = RotatingFileHandler(HandlerConfig(
+            type="rotating",
+            formatter="json",
+            config={"filename": filename, "max_bytes": 50 * 1024 * 1024, "backup_count": 20}
+        ))
+        collector = LogCollector([writer], socket_path=os.path.join(tmp, "collector.sock"),
+                                 spool_dir=spool_dir).start()
+
+        ctx = multiprocessing.get_context("spawn")
+        start_event = ctx.Event()
+        processes = [
+            ctx.Process(target=_produce, args=(collector.socket_path, spool_dir, i, records, start_event))
+            for i in range(producers)
+        ]
+        for process in processes:
+            process.start()
+        time.sleep(1.0)  # let every producer import and connect
+
+        expected = producers * records
+        started = time.perf_counter()
+        start_event.set()
+        for process in processes:
+            process.join()
+        produced = time.perf_counter()
+
+        deadline = time.monotonic() + 30
+        while collector.stats['records'] < expected and time.monotonic() < deadline:
+            collector.ingest_orphaned_spools()
+            time.sleep(0.01)
+        finished = time.perf_counter()
+        stats = dict(collector.stats)
+        collector.stop()
+
+        lines = 0
+        for path in glob.glob(filename + "*"):
+            with open(path, 'rb') as f:
+                lines += sum(1 for _ in f)
+
+    elapsed = finished - started
+    return {
+        'producers': producers,
+        'records': expected,
+        'written': lines,
+        'spooled': stats['spooled_records'],
+        'producer_seconds': produced - started,
+        'total_seconds': elapsed,
+        'records_per_second': expected / elapsed,
+        'megabytes_per_second': stats['bytes'] / elapsed / 1e6
+    }
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark the multiprocess log collector.")
+    parser.add_argument("--producers", type=int, default=32)
+    parser.add_argument("--records", type=int, default=5000, help="Records per producer")
+    args = parser.parse_args()
+
+    result = run(args.producers, args.records)
+    print(f"{result['producers']} producers x {args.records} records")
+    print(f"  written:    {result['written']}/{result['records']} "
+          f"({result['spooled']} via spool replay)")
+    print(f"  producers:  {result['producer_seconds']:.2f}s")
+    print(f"  end-to-end: {result['total_seconds']:.2f}s, "
+          f"{result['records_per_second']:,.0f} records/s, {result['megabytes_per_second']:.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Cost of an error storm with and without fingerprint suppression.
+
+Raises the same connection error from a few frames deep, as a flapping
+realtime connection would, and logs every occurrence. "always full" logs
+the formatted traceback each time (the behaviour before fingerprinting);
+"fingerprinted" is `Logger.log_exception`. Both write JSON lines through
+a file handler under a session context.
+
+Usage:
+    python -m utils.py_logger.benchmarks.error_storm --errors 20000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import traceback
+
+from ..config import HandlerConfig, LogConfig
+from ..logger import Logger, LogLevel
+
+
+def _connect(attempt: int):
+    raise ConnectionError(f"Connection to realtime API reset (attempt {attempt})")
+
+
+def _session(attempt: int):
+    _connect(attempt)
+
+
+def _logger(directory: str, name: str) -> Logger:
+    """Logger writing JSON lines to a file."""
+    return Logger(name, LogConfig(
+        level=LogLevel.INFO,
+        json_format=True,
+        handlers=[HandlerConfig(type="file", formatter="json",
+                                config={"filename": os.path.join(directory, f"{name}.log")})]
+    ))
+
+
+def _always_full(logger: Logger, message: str, exc: Exception):
+    """Log the full traceback for every occurrence."""
+    logger.error(f"{message}: {exc}",
+                 exception_type=type(exc).__name__,
+                 traceback="".join(traceback.format_exception(type(exc), exc, exc.__traceback__)))
+
+
+def _storm(logger: Logger, log, errors: int) -> float:
+    """Raise and log `errors` identical failures; returns mean ns per error."""
+    with logger.context(session_id="9f1c2a7e-5b1d-4a36-8c1e-3d2f6b7a9e10", room_id="therapist-sleep-1a2b3c4d"):
+        start = time.perf_counter_ns()
+        for attempt in range(errors):
+            try:
+                _session(attempt)
+            except ConnectionError as e:
+                log("Realtime connection failed", e)
+        elapsed = time.perf_counter_ns() - start
+    for handler in logger._logger.handlers:
+        handler.close()
+    return elapsed / errors
+
+
+def run(errors: int):
+    """Run the storm both ways and print the comparison."""
+    with tempfile.TemporaryDirectory() as directory:
+        full = _logger(directory, "storm_full")
+        full_ns = _storm(full, lambda message, exc: _always_full(full, message, exc), errors)
+        fingerprinted = _logger(directory, "storm_fingerprinted")
+        fingerprinted_ns = _storm(fingerprinted, fingerprinted.log_exception, errors)
+        fingerprinted.flush_error_summaries()
+
+        full_size = os.path.getsize(os.path.join(directory, "storm_full.log"))
+        fingerprinted_size = os.path.getsize(os.path.join(directory, "storm_fingerprinted.log"))
+        with open(os.path.join(directory, "storm_fingerprinted.log")) as f:
+            lines = sum(1 for _ in f)
+
+    print(f"{errors} identical errors")
+    print(f"{'':<15} {'ns/error':>10} {'bytes/error':>12}")
+    print(f"{'always full':<15} {full_ns:>10.0f} {full_size / errors:>12.1f}")
+    print(f"{'fingerprinted':<15} {fingerprinted_ns:>10.0f} {fingerprinted_size / errors:>12.1f}")
+    print(f"fingerprinted wrote {lines} lines, {full_size / fingerprinted_size:.0f}x fewer bytes, "
+          f"{full_ns / fingerprinted_ns:.1f}x faster per error")
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark error storm suppression.")
+    parser.add_argument("--errors", type=int, default=20000)
+    args = parser.parse_args()
+    run(args.errors)
+
+
+if __name__ == "__main__":
+    main()
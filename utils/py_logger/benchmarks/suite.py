@@ -0,0 +1,285 @@
+"""
+Logger and handler throughput suite with saved baselines.
+
+Measures, for every level x formatter x handler combination:
+
+- ns/record: mean wall time of one `Logger.<level>()` call (best of
+  `--repeat` runs), with the production entry format (`json_format=True`)
+  under a session context
+- peak B/record: peak transient memory allocated while emitting one record
+  (tracemalloc), i.e. the garbage each record creates
+- blocks/record: memory blocks still allocated afterwards, per record
+  (should stay ~0; growth means something is retaining records)
+
+The logger level is INFO, so DEBUG rows measure the cost of a filtered
+call. The JSON handler always uses its own JSON formatter.
+
+A contention test runs many asyncio tasks that log concurrently into one
+rotating handler and reports throughput and per-call latency percentiles.
+
+Results can be saved as a baseline under `benchmarks/baselines/` and
+compared against on later runs.
+
+Usage:
+    python -m utils.py_logger.benchmarks.suite --save local
+    python -m utils.py_logger.benchmarks.suite --compare local --threshold 0.25
+    python -m utils.py_logger.benchmarks.suite --filter rotating --records 5000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List, Tuple
+
+from ..config import HandlerConfig, LogConfig
+from ..formatters import (
+    ColorFormatter, JSONFormatter, SecurityFormatter, StandardFormatter, StructuredFormatter
+)
+from ..logger import Logger, LogLevel
+
+
+LEVELS = (LogLevel.DEBUG, LogLevel.INFO, LogLevel.WARNING, LogLevel.ERROR)
+FORMATTERS = {
+    "color": ColorFormatter,
+    "json": JSONFormatter,
+    "security": SecurityFormatter,
+    "standard": StandardFormatter,
+    "structured": StructuredFormatter,
+}
+HANDLERS = ("file", "rotating", "json")
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+# Metrics compared against baselines (all lower-is-better)
+COMPARED_METRICS = ("ns_per_record", "peak_bytes_per_record")
+
+_FIELDS = {"operation": "generate_reply", "duration": 0.734, "response_length": 312, "success": True}
+_CONTEXT = {"session_id": "9f1c2a7e-5b1d-4a36-8c1e-3d2f6b7a9e10", "room_id": "therapist-sleep-1a2b3c4d",
+            "user_id": "Alex", "therapist_role": "sleep"}
+
+
+def _cases() -> List[Tuple[LogLevel, str, str]]:
+    """Every (level, formatter, handler) combination."""
+    cases = []
+    for level in LEVELS:
+        for handler in HANDLERS:
+            formatters = ["json"] if handler == "json" else list(FORMATTERS)
+            cases.extend((level, formatter, handler) for formatter in formatters)
+    return cases
+
+
+def _case_name(level: LogLevel, formatter: str, handler: str) -> str:
+    """Case key used in output and baselines, e.g. "INFO/json/rotating"."""
+    return f"{level.name}/{formatter}/{handler}"
+
+
+def _build_logger(directory: str, name: str, handler_type: str, formatter: str) -> Logger:
+    """Logger with one handler of the given type, writing under `directory`."""
+    config = {"filename": os.path.join(directory, f"{name}.log")}
+    if handler_type == "rotating":
+        config.update(max_bytes=10 * 1024 * 1024, backup_count=5)
+    logger = Logger(name, LogConfig(
+        level=LogLevel.INFO,
+        json_format=True,
+        handlers=[HandlerConfig(type=handler_type, level=LogLevel.DEBUG, config=config)]
+    ))
+    if handler_type != "json":
+        for handler in logger._logger.handlers:
+            handler.setFormatter(FORMATTERS[formatter]())
+    return logger
+
+
+def _close(logger: Logger):
+    """Close a benchmark logger's handlers."""
+    for handler in logger._logger.handlers:
+        handler.close()
+
+
+def measure_case(directory: str, level: LogLevel, formatter: str, handler: str,
+                 records: int, repeat: int, alloc_samples: int) -> Dict[str, float]:
+    """Measure one combination."""
+    name = _case_name(level, formatter, handler).replace("/", "-")
+    logger = _build_logger(directory, name, handler, formatter)
+    log = getattr(logger, level.name.lower())
+    fields = _FIELDS
+
+    with logger.context(**_CONTEXT):
+        for _ in range(min(records, 200)):
+            log("Generated reply", **fields)
+
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter_ns()
+            for _ in range(records):
+                log("Generated reply", **fields)
+            best = min(best, (time.perf_counter_ns() - start) / records)
+
+        tracemalloc.start()
+        try:
+            peak_total = 0
+            for _ in range(alloc_samples):
+                tracemalloc.reset_peak()
+                current = tracemalloc.get_traced_memory()[0]
+                log("Generated reply", **fields)
+                peak_total += tracemalloc.get_traced_memory()[1] - current
+            blocks_before = sys.getallocatedblocks()
+            for _ in range(alloc_samples):
+                log("Generated reply", **fields)
+            retained_blocks = sys.getallocatedblocks() - blocks_before
+        finally:
+            tracemalloc.stop()
+
+    _close(logger)
+    return {
+        "ns_per_record": round(best, 1),
+        "peak_bytes_per_record": round(peak_total / alloc_samples, 1),
+        "blocks_per_record": round(retained_blocks / alloc_samples, 3),
+    }
+
+
+def run_matrix(records: int, repeat: int, alloc_samples: int,
+               name_filter: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """Measure every matching combination, printing rows as they finish."""
+    results = {}
+    print(f"{'case':<32} {'ns/record':>10} {'peak B/record':>14} {'blocks/record':>14}")
+    with tempfile.TemporaryDirectory() as directory:
+        for level, formatter, handler in _cases():
+            case = _case_name(level, formatter, handler)
+            if name_filter and name_filter not in case:
+                continue
+            result = measure_case(directory, level, formatter, handler, records, repeat, alloc_samples)
+            results[case] = result
+            print(f"{case:<32} {result['ns_per_record']:>10.0f} "
+                  f"{result['peak_bytes_per_record']:>14.0f} {result['blocks_per_record']:>14.3f}")
+    return results
+
+
+async def _contention(logger: Logger, tasks: int, records_per_task: int) -> List[int]:
+    """Run logging tasks that yield between records; returns per-call latencies."""
+    latencies: List[int] = []
+
+    async def worker(task_id: int):
+        for i in range(records_per_task):
+            start = time.perf_counter_ns()
+            logger.info("Generated reply", task=task_id, turn=i, **_FIELDS)
+            latencies.append(time.perf_counter_ns() - start)
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(worker(task_id) for task_id in range(tasks)))
+    return latencies
+
+
+def run_contention(tasks: int, records_per_task: int) -> Dict[str, float]:
+    """Many asyncio tasks logging into one rotating JSON handler."""
+    with tempfile.TemporaryDirectory() as directory:
+        logger = _build_logger(directory, "contention", "rotating", "json")
+        with logger.context(**_CONTEXT):
+            start = time.perf_counter_ns()
+            latencies = asyncio.run(_contention(logger, tasks, records_per_task))
+            elapsed = time.perf_counter_ns() - start
+        _close(logger)
+
+    latencies.sort()
+    total = len(latencies)
+    result = {
+        "tasks": tasks,
+        "records": total,
+        "records_per_second": round(total / (elapsed / 1e9), 1),
+        "ns_per_record": round(sum(latencies) / total, 1),
+        "p50_ns": latencies[total // 2],
+        "p99_ns": latencies[min(total - 1, int(total * 0.99))],
+        "max_ns": latencies[-1],
+    }
+    print(f"\ncontention: {tasks} tasks x {records_per_task} records -> "
+          f"{result['records_per_second']:.0f} records/s, p50 {result['p50_ns'] / 1000:.1f}us, "
+          f"p99 {result['p99_ns'] / 1000:.1f}us, max {result['max_ns'] / 1000:.1f}us")
+    return result
+
+
+def _baseline_path(name: str) -> str:
+    """Path of a named baseline (or an explicit .json path)."""
+    return name if name.endswith(".json") else os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def save_baseline(name: str, results: Dict[str, Any]) -> str:
+    """Save results with machine metadata; returns the path."""
+    path = _baseline_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        **results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return path
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print changes against a baseline; returns the regressions beyond `threshold`."""
+    regressions = []
+    print(f"\n{'case':<32} {'metric':<22} {'baseline':>10} {'current':>10} {'change':>8}")
+    rows = [(case, metric, old.get(metric), results["cases"].get(case, {}).get(metric))
+            for case, old in sorted(baseline.get("cases", {}).items()) for metric in COMPARED_METRICS]
+    if "contention" in baseline and "contention" in results:
+        rows.append(("contention", "ns_per_record", baseline["contention"]["ns_per_record"],
+                     results["contention"]["ns_per_record"]))
+    for case, metric, old, new in rows:
+        if old is None or new is None:
+            continue
+        change = (new - old) / old if old else 0.0
+        flag = ""
+        # Allocation sizes are deterministic; ignore tiny absolute changes
+        if change > threshold and (metric == "ns_per_record" or new - old > 64):
+            flag = "  REGRESSION"
+            regressions.append(f"{case} {metric}: {old} -> {new} ({change:+.0%})")
+        print(f"{case:<32} {metric:<22} {old:>10.0f} {new:>10.0f} {change:>+7.0%}{flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark logger and handler throughput.")
+    parser.add_argument("--records", type=int, default=2000, help="Records per timed run")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (best is kept)")
+    parser.add_argument("--alloc-samples", type=int, default=200, help="Records traced for allocations")
+    parser.add_argument("--tasks", type=int, default=200, help="asyncio tasks in the contention test")
+    parser.add_argument("--task-records", type=int, default=50, help="Records per contention task")
+    parser.add_argument("--filter", help="Only run cases whose name contains this, e.g. 'rotating'")
+    parser.add_argument("--save", metavar="NAME", help="Save results as baselines/NAME.json")
+    parser.add_argument("--compare", metavar="NAME", help="Compare with baselines/NAME.json")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Relative change flagged as a regression")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Any] = {
+        "settings": {"records": args.records, "repeat": args.repeat, "alloc_samples": args.alloc_samples},
+        "cases": run_matrix(args.records, args.repeat, args.alloc_samples, args.filter),
+    }
+    if args.tasks > 0:
+        results["contention"] = run_contention(args.tasks, args.task_records)
+
+    status = 0
+    if args.compare:
+        with open(_baseline_path(args.compare), "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            status = 1
+    if args.save:
+        print(f"\nSaved baseline to {save_baseline(args.save, results)}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
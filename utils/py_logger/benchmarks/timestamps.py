@@ -0,0 +1,95 @@
+"""
+Microbenchmark for timestamp formatting across the formatters.
+
+Compares the previous approach (`datetime.utcnow().isoformat()` in the
+logger plus a `strftime`-based `formatTime` in every formatter) with the
+shared per-record timestamp from `timestamps.py`.
+
+Usage:
+    python -m utils.py_logger.benchmarks.timestamps --iterations 200000
+"""
+
+import argparse
+import logging
+import time
+from datetime import datetime
+
+from ..formatters import (
+    StandardFormatter, JSONFormatter, StructuredFormatter, ColorFormatter,
+    CompactFormatter, DetailedFormatter, PerformanceFormatter, SecurityFormatter
+)
+from ..timestamps import format_timestamp
+
+
+FORMATTERS = [
+    StandardFormatter, JSONFormatter, StructuredFormatter, ColorFormatter,
+    CompactFormatter, DetailedFormatter, PerformanceFormatter, SecurityFormatter
+]
+
+
+def _records(count: int):
+    """Fresh records spread over a few seconds, like a busy logger."""
+    base = time.time()
+    records = []
+    for i in range(count):
+        record = logging.LogRecord("bench", logging.INFO, __file__, 1, "message", None, None)
+        record.created = base + i * 0.00005
+        records.append(record)
+    return records
+
+
+def _ns_per_op(fn, records) -> float:
+    """Run fn over every record and return the mean cost in nanoseconds."""
+    start = time.perf_counter_ns()
+    for record in records:
+        fn(record)
+    return (time.perf_counter_ns() - start) / len(records)
+
+
+def run(iterations: int):
+    """Run every comparison and print ns/op."""
+    print(f"{'case':<34} {'before ns':>10} {'after ns':>10} {'speedup':>8}")
+
+    def report(name, before, after):
+        print(f"{name:<34} {before:>10.0f} {after:>10.0f} {before / after:>7.1f}x")
+
+    before = _ns_per_op(lambda r: datetime.utcnow().isoformat(), _records(iterations))
+    after = _ns_per_op(lambda r: format_timestamp(time.time()), _records(iterations))
+    report("Logger entry timestamp", before, after)
+
+    for formatter_class in FORMATTERS:
+        formatter = formatter_class()
+        before = _ns_per_op(lambda r: logging.Formatter.formatTime(formatter, r, formatter.datefmt),
+                            _records(iterations))
+        after = _ns_per_op(formatter.formatTime, _records(iterations))
+        report(f"{formatter_class.__name__}.formatTime", before, after)
+
+    # A Logger record fanned out to console (standard), file (JSON) and
+    # structured handlers: one entry timestamp plus three formatTime calls.
+    trio = [StandardFormatter(), JSONFormatter(), StructuredFormatter()]
+
+    def before_record(record):
+        datetime.utcnow().isoformat()
+        for formatter in trio:
+            logging.Formatter.formatTime(formatter, record, formatter.datefmt)
+
+    def after_record(record):
+        record.utc_timestamp = format_timestamp(time.time())
+        for formatter in trio:
+            formatter.formatTime(record)
+
+    report("Per record (entry + 3 formatters)",
+           _ns_per_op(before_record, _records(iterations)),
+           _ns_per_op(after_record, _records(iterations)))
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark timestamp formatting.")
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+    run(args.iterations)
+
+
+if __name__ == "__main__":
+    main()
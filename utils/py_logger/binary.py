@@ -0,0 +1,417 @@
+"""
+Compact binary event log for high-frequency telemetry.
+
+`Logger.event(name, **fields)` writes structured events to "binary"
+handlers without building a stdlib LogRecord or any JSON. The format is
+length-prefixed and schema-tagged:
+
+    file    := MAGIC frame*
+    frame   := u32 length (of tag + body), u8 tag, body
+    STRING  := u32 id, utf-8 bytes
+    SCHEMA  := u16 id, u32 logger, u32 event, u8 level, u16 count,
+               u32 key * count, ascii type codes * count
+    EVENT   := u16 schema, f64 timestamp, fixed values, inline text bytes
+
+Logger names, event names, keys and short string values are interned:
+each is written once per file as a STRING frame and referenced by id
+afterwards. A schema fixes the key order and value types of an event
+shape, so each EVENT is a single `struct.pack` of its values. Value type
+codes: b bool, i int64, f float64, n None (no bytes), s interned string,
+t inline text (u32 length in the fixed part, bytes after it).
+
+Reading is memory-mapped: frames are walked and fixed fields unpacked in
+place with `struct.unpack_from`; only the strings that are output get
+decoded.
+
+Usage:
+    python -m utils.py_logger.binary convert logs/events/events-1234.bin -o events.jsonl
+    python -m utils.py_logger.binary stats logs/events/*.bin
+"""
+
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from typing import Dict, Any, Optional, List, Iterator, Tuple
+
+from .config import HandlerConfig
+from .timestamps import format_timestamp
+
+
+MAGIC = b"PYLEVT1\n"
+
+TAG_STRING = 1
+TAG_SCHEMA = 2
+TAG_EVENT = 3
+
+# Context fields stored with every event (and restored into "context" by the converter)
+CONTEXT_KEYS = ('session_id', 'room_id', 'user_id', 'therapist_role')
+
+# Strings up to this many bytes are interned; longer ones are written inline
+MAX_INTERNED_LENGTH = 64
+MAX_STRINGS = 1 << 20
+MAX_SCHEMAS = 1 << 16
+
+_FRAME = struct.Struct("<IB")
+_EVENT_HEAD = struct.Struct("<IBHd")
+_STRING_HEAD = struct.Struct("<IBI")
+_SCHEMA_HEAD = struct.Struct("<IBHIIBH")
+
+_FIXED_CODES = {'b': '?', 'i': 'q', 'f': 'd', 'n': '', 's': 'I', 't': 'I'}
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+
+
+class _Schema:
+    """An interned event shape."""
+
+    __slots__ = ('id', 'fixed')
+
+    def __init__(self, schema_id: int, types: str):
+        self.id = schema_id
+        self.fixed = struct.Struct("<" + "".join(_FIXED_CODES[code] for code in types))
+
+
+class BinaryEventHandler(logging.Handler):
+    """
+    Handler writing the binary event format, with size-based rotation.
+
+    Config keys: filename (may contain "{pid}" so processes never share a
+    file), max_bytes, backup_count, buffer_bytes (frames are buffered and
+    written in chunks), flush_interval (seconds) and include_records
+    (also write ordinary log records as "log" events; off by default).
+    """
+
+    def __init__(self, config: HandlerConfig):
+        super().__init__()
+        self.config = config
+        self.setLevel(config.level.value)
+        self.filename = config.config.get("filename", "logs/events/events-{pid}.bin").format(pid=os.getpid())
+        self.max_bytes = config.config.get("max_bytes", 0)
+        self.backup_count = config.config.get("backup_count", 5)
+        self.buffer_bytes = config.config.get("buffer_bytes", 64 * 1024)
+        self.flush_interval = config.config.get("flush_interval", 1.0)
+        self.include_records = config.config.get("include_records", False)
+
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._stream = None
+        self._open()
+
+    def _open(self):
+        """Open a new file, starting a fresh string and schema table."""
+        if os.path.exists(self.filename) and os.path.getsize(self.filename) > len(MAGIC):
+            # A previous process left a file here; never append to its
+            # string table (or to a torn final frame)
+            self._stream = None
+            self._rotate_files()
+        self._stream = open(self.filename, "wb")
+        self._written = 0
+        self._buffer = bytearray(MAGIC)
+        self._strings: Dict[str, int] = {}
+        self._schemas: Dict[Tuple, _Schema] = {}
+        self._next_string = 0
+        self._next_schema = 0
+        self._last_flush = time.monotonic()
+
+    def _intern(self, value: str) -> int:
+        """Id of an interned string, writing its STRING frame if new."""
+        string_id = self._strings.get(value)
+        if string_id is None:
+            string_id = self._next_string
+            self._next_string += 1
+            self._strings[value] = string_id
+            data = value.encode("utf-8")
+            self._buffer += _STRING_HEAD.pack(5 + len(data), TAG_STRING, string_id)
+            self._buffer += data
+        return string_id
+
+    def write_event(self, logger_name: str, event: str, level: int, timestamp: float,
+                    fields: Dict[str, Any]):
+        """Encode one event; this is the path used by `Logger.event`."""
+        with self.lock:
+            if self._next_schema >= MAX_SCHEMAS:
+                self._rollover()
+            types = []
+            values = []
+            text = None
+            new_strings = False
+            strings = self._strings
+            for value in fields.values():
+                kind = type(value)
+                if kind is str:
+                    string_id = strings.get(value)
+                    if string_id is not None:
+                        types.append('s')
+                        values.append(string_id)
+                        continue
+                    if len(value) <= MAX_INTERNED_LENGTH and len(strings) < MAX_STRINGS:
+                        types.append('s')
+                        values.append(value)  # interned once the schema exists
+                        new_strings = True
+                        continue
+                    data = value.encode("utf-8")
+                    types.append('t')
+                    values.append(len(data))
+                    text = data if text is None else text + data
+                elif kind is int:
+                    if _INT64_MIN <= value <= _INT64_MAX:
+                        types.append('i')
+                        values.append(value)
+                    else:
+                        data = str(value).encode("utf-8")
+                        types.append('t')
+                        values.append(len(data))
+                        text = data if text is None else text + data
+                elif kind is float:
+                    types.append('f')
+                    values.append(value)
+                elif kind is bool:
+                    types.append('b')
+                    values.append(value)
+                elif value is None:
+                    types.append('n')
+                else:
+                    data = (value if isinstance(value, str) else json.dumps(value, default=str)).encode("utf-8")
+                    types.append('t')
+                    values.append(len(data))
+                    text = data if text is None else text + data
+            types = "".join(types)
+
+            key = (logger_name, event, level, tuple(fields), types)
+            schema = self._schemas.get(key)
+            if schema is None:
+                schema = self._define_schema(key)
+            if new_strings:
+                values = [self._intern(value) if code == 's' and type(value) is str else value
+                          for code, value in zip((code for code in types if code != 'n'), values)]
+            body = schema.fixed.pack(*values)
+            length = 11 + len(body) + (len(text) if text is not None else 0)
+            buffer = self._buffer
+            buffer += _EVENT_HEAD.pack(length, TAG_EVENT, schema.id, timestamp)
+            buffer += body
+            if text is not None:
+                buffer += text
+            if (len(buffer) >= self.buffer_bytes or level >= logging.ERROR
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_buffer()
+
+    def _define_schema(self, key: Tuple) -> _Schema:
+        """Intern an event shape, writing its SCHEMA frame."""
+        logger_name, event, level, keys, types = key
+        schema = _Schema(self._next_schema, types)
+        self._next_schema += 1
+        header = (self._intern(logger_name), self._intern(event), [self._intern(k) for k in keys])
+        body = struct.pack(f"<{len(keys)}I", *header[2]) + types.encode("ascii")
+        self._buffer += _SCHEMA_HEAD.pack(14 + len(body), TAG_SCHEMA, schema.id,
+                                          header[0], header[1], level, len(keys))
+        self._buffer += body
+        self._schemas[key] = schema
+        return schema
+
+    def _flush_buffer(self):
+        """Write buffered frames, rotating first if the file would grow too large."""
+        if not self._buffer or self._stream is None:
+            return
+        if self.max_bytes and self._written + len(self._buffer) > self.max_bytes and self._written > len(MAGIC):
+            self._rollover()
+        self._stream.write(self._buffer)
+        self._stream.flush()
+        self._written += len(self._buffer)
+        self._buffer = bytearray()
+        self._last_flush = time.monotonic()
+
+    def _rollover(self):
+        """
+        Rotate like RotatingFileHandler.
+
+        Buffered frames may reference strings defined earlier in the old
+        file, so they are written there before rotating.
+        """
+        self._stream.write(self._buffer)
+        self._stream.close()
+        self._stream = None
+        self._rotate_files()
+        self._open()
+    
+    def _rotate_files(self):
+        """Shift `<file>` to `<file>.1`, `<file>.1` to `<file>.2`, and so on."""
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = f"{self.filename}.{i}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.filename}.{i + 1}")
+            os.replace(self.filename, f"{self.filename}.1")
+        else:
+            os.remove(self.filename)
+
+    def emit(self, record: logging.LogRecord):
+        """Write an ordinary log record as a "log" event, if enabled."""
+        if not self.include_records:
+            return
+        try:
+            self.write_event(record.name, "log", record.levelno, record.created,
+                             {'message': record.getMessage()})
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        """Write buffered frames to disk."""
+        with self.lock:
+            self._flush_buffer()
+
+    def close(self):
+        """Flush and close the file."""
+        with self.lock:
+            if self._stream is not None:
+                self._flush_buffer()
+                self._stream.close()
+                self._stream = None
+        super().close()
+
+
+class BinaryEventReader:
+    """Memory-mapped reader for binary event files."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._view = memoryview(self.buffer)
+        if size and self._view[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path}: not a binary event log")
+        self._strings: Dict[int, memoryview] = {}
+        self._schemas: Dict[int, Tuple] = {}
+
+    def frames(self) -> Iterator[Tuple[int, int]]:
+        """Yield (tag, body offset) for each complete frame."""
+        buffer = self.buffer
+        end = len(buffer)
+        offset = len(MAGIC) if end else 0
+        unpack_from = _FRAME.unpack_from
+        while offset + 5 <= end:
+            length, tag = unpack_from(buffer, offset)
+            if offset + 4 + length > end:
+                break  # torn write at the tail
+            yield tag, offset + 5
+            offset += 4 + length
+
+    def events(self) -> Iterator[Tuple[str, str, int, float, Dict[str, Any]]]:
+        """Yield (logger, event, level, timestamp, fields) for each event."""
+        buffer = self.buffer
+        view = self._view
+        strings = self._strings
+        schemas = self._schemas
+        for tag, offset in self.frames():
+            length = _FRAME.unpack_from(buffer, offset - 5)[0]
+            frame_end = offset - 1 + length
+            if tag == TAG_STRING:
+                strings[struct.unpack_from("<I", buffer, offset)[0]] = view[offset + 4:frame_end]
+            elif tag == TAG_SCHEMA:
+                schema_id, logger_id, event_id, level, count = struct.unpack_from("<HIIBH", buffer, offset)
+                key_ids = struct.unpack_from(f"<{count}I", buffer, offset + 13)
+                types = bytes(view[offset + 13 + 4 * count:frame_end]).decode("ascii")
+                fixed = struct.Struct("<" + "".join(_FIXED_CODES[code] for code in types))
+                schemas[schema_id] = (
+                    self._string(logger_id), self._string(event_id), level,
+                    [self._string(key_id) for key_id in key_ids], types, fixed
+                )
+            elif tag == TAG_EVENT:
+                schema_id, timestamp = struct.unpack_from("<Hd", buffer, offset)
+                logger_name, event, level, keys, types, fixed = schemas[schema_id]
+                raw = iter(fixed.unpack_from(buffer, offset + 10))
+                text_offset = offset + 10 + fixed.size
+                fields = {}
+                for key, code in zip(keys, types):
+                    if code == 'n':
+                        fields[key] = None
+                        continue
+                    value = next(raw)
+                    if code == 's':
+                        value = self._string(value)
+                    elif code == 't':
+                        value, text_offset = str(view[text_offset:text_offset + value], "utf-8"), text_offset + value
+                    fields[key] = value
+                yield logger_name, event, level, timestamp, fields
+
+    def _string(self, string_id: int) -> str:
+        """Decode an interned string."""
+        return str(self._strings[string_id], "utf-8")
+
+    def close(self):
+        """Release the mapping and the file."""
+        self._strings.clear()
+        self._view.release()
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self._file.close()
+
+    def __enter__(self) -> 'BinaryEventReader':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def event_to_entry(logger_name: str, event: str, level: int, timestamp: float,
+                   fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a decoded event into the Logger's structured JSON entry."""
+    context = {key: fields.pop(key) for key in CONTEXT_KEYS if key in fields}
+    message = fields.pop('message', event) if event == "log" else event
+    return {
+        'timestamp': format_timestamp(timestamp),
+        'level': logging.getLevelName(level),
+        'logger': logger_name,
+        'message': message,
+        'context': context,
+        'extra': fields
+    }
+
+
+def convert_to_json_lines(paths: List[str], out) -> int:
+    """Write events from binary files as JSON lines; returns the number written."""
+    count = 0
+    for path in paths:
+        with BinaryEventReader(path) as reader:
+            for event in reader.events():
+                out.write(json.dumps(event_to_entry(*event)) + "\n")
+                count += 1
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Convert or inspect binary event logs.")
+    parser.add_argument("command", choices=("convert", "stats"))
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("-o", "--output", help="Output file for convert (default: stdout)")
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as out:
+                count = convert_to_json_lines(args.files, out)
+            print(f"Wrote {count} events to {args.output}", file=sys.stderr)
+        else:
+            convert_to_json_lines(args.files, sys.stdout)
+        return 0
+
+    for path in args.files:
+        counts: Dict[str, int] = {}
+        with BinaryEventReader(path) as reader:
+            for _, event, _, _, _ in reader.events():
+                counts[event] = counts.get(event, 0) + 1
+        print(json.dumps({'file': path, 'bytes': os.path.getsize(path),
+                          'events': sum(counts.values()), 'by_event': counts}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
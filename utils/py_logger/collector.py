@@ -0,0 +1,633 @@
+"""
+Multiprocess-safe log collection.
+
+LiveKit runs each job in its own child process. Instead of every process
+rotating the same file, children send serialized records over a Unix
+socket to a single `LogCollector` in the parent, which owns the file
+handlers (and therefore rotation).
+
+Child-side sends never block: frames that cannot be written immediately
+are queued up to a bound, and anything beyond that (or any record produced
+while the collector is unreachable) is spooled to a per-process file that
+is replayed on reconnect, or ingested by the collector if the child died.
+A replay renames the spool to `<pid>.replay` and reads it a frame at a
+time into the send buffer, never holding more than the buffer's bound;
+records logged meanwhile are spooled behind it so order is kept.
+"""
+
+import glob
+import json
+import logging
+import logging.handlers
+import os
+import selectors
+import shutil
+import socket
+import struct
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, List
+
+from .config import HandlerConfig
+
+
+COLLECTOR_SOCKET_ENV = "PY_LOGGER_COLLECTOR_SOCKET"
+
+_FRAME_HEADER = struct.Struct(">I")
+
+# Attributes every LogRecord has; anything else was attached via `extra`
+_RECORD_ATTRIBUTES = frozenset(logging.makeLogRecord({}).__dict__) | {'message', 'asctime'}
+
+
+def default_socket_path() -> str:
+    """Socket path for a collector owned by the current process."""
+    return os.path.join(tempfile.gettempdir(), f"py_logger-{os.getpid()}.sock")
+
+
+def serialize_record(record: logging.LogRecord) -> bytes:
+    """Encode a log record as a length-prefixed JSON frame."""
+    data = {
+        'name': record.name,
+        'msg': record.getMessage(),
+        'levelno': record.levelno,
+        'levelname': record.levelname,
+        'created': record.created,
+        'msecs': record.msecs,
+        'pathname': record.pathname,
+        'filename': record.filename,
+        'module': record.module,
+        'funcName': record.funcName,
+        'lineno': record.lineno,
+        'process': record.process,
+        'processName': record.processName,
+        'thread': record.thread,
+        'threadName': record.threadName
+    }
+    if record.exc_info and not record.exc_text:
+        record.exc_text = logging.Formatter().formatException(record.exc_info)
+    if record.exc_text:
+        data['exc_text'] = record.exc_text
+    for key, value in record.__dict__.items():
+        if key not in _RECORD_ATTRIBUTES:
+            data[key] = value
+
+    payload = json.dumps(data, default=str).encode('utf-8')
+    return _FRAME_HEADER.pack(len(payload)) + payload
+
+
+def deserialize_record(payload: bytes) -> logging.LogRecord:
+    """Rebuild a log record from a frame payload."""
+    return logging.makeLogRecord(json.loads(payload))
+
+
+def _split_frames(buffer: bytearray) -> List[bytes]:
+    """Remove and return every complete frame payload at the start of buffer."""
+    payloads = []
+    offset = 0
+    size = len(buffer)
+    while size - offset >= 4:
+        (length,) = _FRAME_HEADER.unpack_from(buffer, offset)
+        if size - offset - 4 < length:
+            break
+        payloads.append(bytes(buffer[offset + 4:offset + 4 + length]))
+        offset += 4 + length
+    del buffer[:offset]
+    return payloads
+
+
+def _pid_alive(pid: int) -> bool:
+    """Check whether a process still exists."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class LogCollector:
+    """
+    Single writer that receives records from child processes.
+
+    Runs a selector loop on a background thread; decoded records are passed
+    to the writer handlers, which are only ever touched from that thread.
+    """
+
+    def __init__(self, handlers: List[logging.Handler], socket_path: Optional[str] = None,
+                 spool_dir: str = "logs/spool", spool_scan_interval: float = 30.0):
+        self.handlers = handlers
+        self.socket_path = socket_path or default_socket_path()
+        self.spool_dir = spool_dir
+        self.spool_scan_interval = spool_scan_interval
+        self._selector = selectors.DefaultSelector()
+        self._server: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._buffers: Dict[socket.socket, bytearray] = {}
+        self.stats = {'records': 0, 'bytes': 0, 'connections': 0, 'spooled_records': 0, 'errors': 0}
+
+    def start(self) -> 'LogCollector':
+        """Bind the socket and start the collector thread."""
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.socket_path)
+        self._server.listen(128)
+        self._server.setblocking(False)
+        self._selector.register(self._server, selectors.EVENT_READ)
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="py_logger-collector", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the collector, draining open connections and closing handlers."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+        for handler in self.handlers:
+            handler.flush()
+            handler.close()
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+
+    def _run(self):
+        """Selector loop: accept connections, read frames, dispatch records."""
+        next_spool_scan = 0.0
+        while self._running:
+            for key, _ in self._selector.select(timeout=0.2):
+                if key.fileobj is self._server:
+                    self._accept()
+                else:
+                    self._read(key.fileobj)
+
+            now = time.monotonic()
+            if now >= next_spool_scan:
+                self.ingest_orphaned_spools()
+                next_spool_scan = now + self.spool_scan_interval
+
+        # Drain whatever the children already sent before shutting down
+        for conn in list(self._buffers):
+            self._read(conn, drain=True)
+        self._selector.unregister(self._server)
+        self._server.close()
+        self._selector.close()
+
+    def _accept(self):
+        """Accept a new producer connection."""
+        try:
+            conn, _ = self._server.accept()
+        except BlockingIOError:
+            return
+        conn.setblocking(False)
+        self._buffers[conn] = bytearray()
+        self._selector.register(conn, selectors.EVENT_READ)
+        self.stats['connections'] += 1
+
+    def _read(self, conn: socket.socket, drain: bool = False):
+        """Read available bytes from a producer and dispatch complete frames."""
+        buffer = self._buffers[conn]
+        closed = False
+        while True:
+            try:
+                chunk = conn.recv(262144)
+            except BlockingIOError:
+                break
+            except OSError:
+                closed = True
+                break
+            if not chunk:
+                closed = True
+                break
+            buffer += chunk
+            self.stats['bytes'] += len(chunk)
+            if not drain:
+                break
+
+        self._dispatch_batch(_split_frames(buffer))
+
+        if closed or drain:
+            self._selector.unregister(conn)
+            del self._buffers[conn]
+            conn.close()
+
+    def _dispatch_batch(self, payloads: List[bytes]):
+        """Decode frames and hand the records to every writer handler."""
+        if not payloads:
+            return
+        records = []
+        for payload in payloads:
+            try:
+                records.append(deserialize_record(payload))
+            except ValueError:
+                self.stats['errors'] += 1
+        self.stats['records'] += len(records)
+
+        for handler in self.handlers:
+            if _is_plain_file_handler(handler):
+                _write_batch(handler, records)
+            else:
+                for record in records:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+
+    def ingest_orphaned_spools(self):
+        """Replay spool files left behind by child processes that have exited."""
+        orphans = []
+        for path in glob.glob(os.path.join(self.spool_dir, "*.replay")) + \
+                glob.glob(os.path.join(self.spool_dir, "*.spool")):
+            try:
+                pid = int(os.path.basename(path).split(".")[0])
+            except ValueError:
+                continue
+            # A child's interrupted replay holds older records than its spool
+            orphans.append((pid, path.endswith(".spool"), path))
+        for pid, _, path in sorted(orphans):
+            if _pid_alive(pid):
+                continue
+            try:
+                with open(path, 'rb') as f:
+                    buffer = bytearray(f.read())
+                os.unlink(path)
+            except OSError:
+                continue
+            payloads = _split_frames(buffer)
+            self._dispatch_batch(payloads)
+            self.stats['spooled_records'] += len(payloads)
+
+
+def _is_plain_file_handler(handler: logging.Handler) -> bool:
+    """Check whether a handler writes formatted lines through the stock emit path."""
+    return (isinstance(handler, logging.FileHandler)
+            and type(handler).emit in (logging.FileHandler.emit, logging.handlers.RotatingFileHandler.emit))
+
+
+def _write_batch(handler: logging.FileHandler, records: List[logging.LogRecord]):
+    """
+    Write a batch of records with a single flush.
+
+    The stock emit path formats each record twice under rotation (once to
+    size it) and flushes after every line; here each record is formatted
+    once and rotation is checked against the running stream position.
+    """
+    handler.acquire()
+    try:
+        if handler.stream is None:
+            handler.stream = handler._open()
+        max_bytes = getattr(handler, 'maxBytes', 0)
+        for record in records:
+            if record.levelno < handler.level or not handler.filter(record):
+                continue
+            try:
+                line = handler.format(record) + handler.terminator
+                if max_bytes and handler.stream.tell() + len(line) >= max_bytes:
+                    handler.doRollover()
+                handler.stream.write(line)
+            except Exception:
+                handler.handleError(record)
+        handler.flush()
+    finally:
+        handler.release()
+
+
+class CollectorHandler(logging.Handler):
+    """
+    Child-side handler that ships records to the collector.
+
+    `emit` only appends the serialized frame to an outgoing buffer. The
+    buffer is written with non-blocking sends once it reaches
+    `batch_bytes`, and a background flusher sends whatever is left every
+    `flush_interval` seconds. Frames that do not fit in the buffer, or that
+    are produced while the collector is unreachable, are spooled to disk.
+    Spooled frames are replayed into the buffer as it drains, so it never
+    holds more than `max_pending_bytes`.
+    """
+
+    def __init__(self, config: HandlerConfig):
+        super().__init__()
+        self.config = config
+        self.setLevel(config.level.value)
+        self.socket_path = config.config.get("socket_path") or os.environ.get(COLLECTOR_SOCKET_ENV)
+        self.spool_dir = config.config.get("spool_dir", "logs/spool")
+        self.batch_bytes = config.config.get("batch_bytes", 64 * 1024)
+        self.flush_interval = config.config.get("flush_interval", 0.05)
+        self.max_pending_bytes = config.config.get("max_pending_bytes", 4 * 1024 * 1024)
+        self.max_spool_bytes = config.config.get("max_spool_bytes", 50 * 1024 * 1024)
+        self.reconnect_interval = config.config.get("reconnect_interval", 1.0)
+        self._closed = False
+        self._reset()
+
+    def _reset(self):
+        """Initialize per-process state (also used after a fork)."""
+        self._pid = os.getpid()
+        self._sock: Optional[socket.socket] = None
+        self._outbuf = bytearray()
+        self._frame_lengths: deque = deque()
+        self._head_sent = 0
+        self._next_connect = 0.0
+        self._spool_file = None
+        self._spooled = True  # frames may be waiting on disk; checked on connect
+        self._replay = None
+        self._flusher: Optional[threading.Thread] = None
+        self.stats = {'sent': 0, 'spooled': 0, 'dropped': 0, 'reconnects': 0}
+
+    @property
+    def spool_path(self) -> str:
+        """Spool file for this process."""
+        return os.path.join(self.spool_dir, f"{self._pid}.spool")
+
+    @property
+    def replay_path(self) -> str:
+        """Spool file being replayed for this process."""
+        return os.path.join(self.spool_dir, f"{self._pid}.replay")
+
+    def emit(self, record):
+        """Queue a record for the collector without blocking."""
+        try:
+            frame = serialize_record(record)
+        except Exception:
+            self.handleError(record)
+            return
+
+        if os.getpid() != self._pid:
+            self._reset()
+        if self._flusher is None:
+            self._start_flusher()
+
+        if self._sock is None and not self._connect():
+            self._spool([frame])
+            return
+
+        # Behind spooled frames, or past the bound, a frame waits on disk
+        if self._spooled or self._replay is not None or \
+                len(self._outbuf) + len(frame) > self.max_pending_bytes:
+            self._spool([frame])
+        else:
+            self._outbuf += frame
+            self._frame_lengths.append(len(frame))
+        if len(self._outbuf) - self._head_sent >= self.batch_bytes:
+            self._send_pending()
+
+    def _start_flusher(self):
+        """Start the background thread that sends partially filled batches."""
+        self._flusher = threading.Thread(target=self._flush_loop, name="py_logger-collector-flush", daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        """Periodically send buffered frames and retry the connection."""
+        pid = self._pid
+        while not self._closed and os.getpid() == pid:
+            time.sleep(self.flush_interval)
+            self.acquire()
+            try:
+                if self._sock is None:
+                    self._connect()
+                if self._sock is not None and (self._outbuf or self._spooled or self._replay is not None):
+                    self._send_pending()
+            finally:
+                self.release()
+
+    def _connect(self) -> bool:
+        """Try to connect to the collector, rate limited."""
+        now = time.monotonic()
+        if not self.socket_path or now < self._next_connect:
+            return False
+        self._next_connect = now + self.reconnect_interval
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(0.05)
+            sock.connect(self.socket_path)
+            sock.setblocking(False)
+        except OSError:
+            sock.close()
+            return False
+
+        self._sock = sock
+        self.stats['reconnects'] += 1
+        self._replay_spool()
+        return True
+
+    def _replay_spool(self):
+        """Queue spooled frames for sending, as far as the buffer's bound allows."""
+        while len(self._outbuf) < self.max_pending_bytes:
+            if self._replay is None and (self._outbuf or not self._open_replay()):
+                return
+            f = self._replay
+            header = f.read(4)
+            payload = b''
+            if len(header) == 4:
+                (length,) = _FRAME_HEADER.unpack(header)
+                if self._outbuf and len(self._outbuf) + 4 + length > self.max_pending_bytes:
+                    f.seek(-4, os.SEEK_CUR)
+                    return
+                payload = f.read(length)
+                if len(payload) == length:
+                    self._outbuf += header
+                    self._outbuf += payload
+                    self._frame_lengths.append(4 + length)
+                    continue
+            # End of the replay file (a torn last frame is dropped)
+            if self._outbuf:
+                # Finish once the buffer is sent; a disconnect rewinds into this file
+                f.seek(-(len(header) + len(payload)), os.SEEK_CUR)
+                return
+            self._close_replay(finished=True)
+
+    def _open_replay(self) -> bool:
+        """Start replaying this process's spool, moving its frames to the replay file."""
+        if not self._spooled:
+            return False
+        self._close_spool()
+        if not os.path.exists(self.replay_path):
+            try:
+                os.rename(self.spool_path, self.replay_path)
+            except OSError:
+                self._spooled = False
+                return False
+        try:
+            self._replay = open(self.replay_path, 'rb')
+        except OSError:
+            return False
+        self._spooled = False
+        return True
+
+    def _close_replay(self, finished: bool = False):
+        """Close the replay file, deleting it once finished and keeping the unsent rest otherwise."""
+        f, self._replay = self._replay, None
+        try:
+            with f:
+                if finished or not f.read(1):
+                    os.unlink(self.replay_path)
+                    return
+                f.seek(-1, os.SEEK_CUR)
+                tmp_path = f"{self.replay_path}.tmp"
+                with open(tmp_path, 'wb') as rest:
+                    shutil.copyfileobj(f, rest)
+                os.replace(tmp_path, self.replay_path)
+            self._spooled = True
+        except OSError:
+            pass
+
+    def _send_pending(self):
+        """Write as much of the buffer as the socket accepts right now."""
+        while True:
+            if self._replay is not None or self._spooled:
+                self._replay_spool()
+            if len(self._outbuf) <= self._head_sent:
+                return
+            try:
+                with memoryview(self._outbuf) as view:
+                    sent = self._sock.send(view[self._head_sent:])
+            except BlockingIOError:
+                return
+            except OSError:
+                self._disconnect()
+                return
+
+            consumed = self._head_sent + sent
+            done = 0
+            lengths = self._frame_lengths
+            while lengths and consumed - done >= lengths[0]:
+                done += lengths.popleft()
+                self.stats['sent'] += 1
+            del self._outbuf[:done]
+            self._head_sent = consumed - done
+
+    def _disconnect(self):
+        """Drop the connection and spool everything still buffered."""
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+        self._sock = None
+        if self._replay is not None:
+            # The buffer holds the frames just before the replay position; read them again later
+            self._replay.seek(-len(self._outbuf), os.SEEK_CUR)
+            self._outbuf.clear()
+            self._frame_lengths.clear()
+            self._head_sent = 0
+        else:
+            self._spool_buffered()
+
+    def _spool_buffered(self):
+        """Move every buffered frame to the spool."""
+        # A partially sent head frame is discarded by the collector, so spool it whole
+        frames = []
+        offset = 0
+        for length in self._frame_lengths:
+            frames.append(bytes(self._outbuf[offset:offset + length]))
+            offset += length
+        self._outbuf.clear()
+        self._frame_lengths.clear()
+        self._head_sent = 0
+        self._spool(frames)
+
+    def _spool(self, frames: List[bytes]):
+        """Append frames to the local spool file, within its size bound."""
+        try:
+            if self._spool_file is None:
+                os.makedirs(self.spool_dir, exist_ok=True)
+                self._spool_file = open(self.spool_path, 'ab')
+            f = self._spool_file
+            for frame in frames:
+                if f.tell() + len(frame) > self.max_spool_bytes:
+                    self.stats['dropped'] += 1
+                    continue
+                f.write(frame)
+                self.stats['spooled'] += 1
+                self._spooled = True
+            f.flush()
+        except OSError:
+            self.stats['dropped'] += len(frames)
+
+    def _close_spool(self):
+        """Close the spool file so it can be replayed or ingested."""
+        if self._spool_file is not None:
+            self._spool_file.close()
+            self._spool_file = None
+
+    def get_queue_depth(self) -> int:
+        """Records buffered for the collector."""
+        return len(self._frame_lengths)
+
+    def flush(self):
+        """Try briefly to deliver buffered frames; spool whatever remains."""
+        if os.getpid() != self._pid:
+            return
+        self.acquire()
+        try:
+            if self._sock is None:
+                if self._outbuf:
+                    self._spool_buffered()
+                return
+            deadline = time.monotonic() + 1.0
+            while self._sock is not None and time.monotonic() < deadline:
+                self._send_pending()
+                if not self._outbuf and self._replay is None and not self._spooled:
+                    break
+                time.sleep(0.001)
+            if self._outbuf and self._sock is not None:
+                self._disconnect()
+        finally:
+            self.release()
+
+    def close(self):
+        """Flush and close the connection."""
+        self.flush()
+        self._closed = True
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        self._close_spool()
+        if self._replay is not None:
+            self._close_replay()
+        super().close()
+
+
+_WRITER_TYPES = ("file", "rotating", "json")
+
+
+def use_collector(config: 'LogConfig', socket_path: Optional[str] = None) -> 'LogConfig':
+    """
+    Route a config's file-based handlers through the collector.
+
+    File, rotating and JSON handlers are replaced by one collector handler
+    at the lowest of their levels; console handlers are kept as they are.
+    """
+    from dataclasses import replace
+
+    writers = [h for h in config.handlers if h.type in _WRITER_TYPES]
+    if not writers:
+        return config
+
+    handlers = [h for h in config.handlers if h.type not in _WRITER_TYPES]
+    handlers.append(HandlerConfig(
+        type="collector",
+        level=min((h.level for h in writers), key=lambda level: level.value),
+        config={"socket_path": socket_path} if socket_path else {}
+    ))
+    return replace(config, handlers=handlers)
+
+
+def start_collector(config: 'LogConfig', socket_path: Optional[str] = None) -> LogCollector:
+    """
+    Start a collector that owns the config's file-based handlers.
+
+    Also exports the socket path through PY_LOGGER_COLLECTOR_SOCKET so that
+    child processes calling `get_config` log through the collector.
+    """
+    from .handlers import FileHandler, RotatingFileHandler, JSONHandler
+
+    writer_classes = {"file": FileHandler, "rotating": RotatingFileHandler, "json": JSONHandler}
+    writers = [writer_classes[h.type](h) for h in config.handlers if h.type in writer_classes]
+
+    collector = LogCollector(writers, socket_path=socket_path).start()
+    os.environ[COLLECTOR_SOCKET_ENV] = collector.socket_path
+    return collector
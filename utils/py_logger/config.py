@@ -2,6 +2,7 @@
 Configuration classes for the logging system.
 """
 
+import os
 from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional
 from .logger import LogLevel
@@ -10,18 +11,58 @@ from .logger import LogLevel
 @dataclass
 class HandlerConfig:
     """Configuration for a logging handler."""
-    type: str  # console, file, rotating, json
+    type: str  # console, file, rotating, json, collector, binary, shipping
     level: LogLevel = LogLevel.INFO
     formatter: Optional[str] = None
     config: Dict[str, Any] = field(default_factory=dict)
 
 
+@dataclass
+class FlightRecorderConfig:
+    """Configuration for the per-session flight recorder."""
+    capacity: int = 256  # records kept per session
+    max_bytes: int = 256 * 1024  # approximate bytes kept per session
+    max_value_chars: int = 2048  # longer strings and container reprs are truncated
+    max_sessions: int = 64
+    directory: str = "logs/flight"
+    trigger_level: LogLevel = LogLevel.ERROR
+    dump_interval: float = 60.0  # later dumps of a session within this many seconds append to its file
+
+
+@dataclass
+class RedactionConfig:
+    """Configuration for PII and secret redaction."""
+    enabled: bool = True
+    extra_keys: List[str] = field(default_factory=list)  # added to the sensitive key suffixes
+    patterns: Optional[List[str]] = None  # value patterns to scan for; None means all
+
+
+@dataclass
+class AdaptiveLevelConfig:
+    """Configuration for stepping to coarser levels under load."""
+    levels: List[LogLevel] = field(default_factory=lambda: [LogLevel.WARNING, LogLevel.ERROR])  # coarser steps
+    lag_threshold: float = 0.1  # event-loop lag in seconds that counts as overload
+    queue_threshold: int = 5000  # records waiting in handler queues that count as overload
+    restore_ratio: float = 0.5  # load below this fraction of the thresholds counts as subsided
+    restore_after: float = 10.0  # seconds of subsided load before stepping back up
+    escalate_after: float = 2.0  # seconds of overload before stepping further down
+    check_interval: float = 0.25
+
+
 @dataclass
 class LogConfig:
     """Main logging configuration."""
     level: LogLevel = LogLevel.INFO
     json_format: bool = False
     handlers: List[HandlerConfig] = field(default_factory=list)
+    trace_sample_rate: float = 1.0
+    trace_buffer_size: int = 4096
+    error_window: float = 60.0  # seconds per full traceback for each error fingerprint
+    error_max_fingerprints: int = 512
+    flight_recorder: Optional[FlightRecorderConfig] = None
+    adaptive: Optional[AdaptiveLevelConfig] = None
+    levels: Dict[str, LogLevel] = field(default_factory=dict)  # per-logger overrides
+    redaction: RedactionConfig = field(default_factory=RedactionConfig)
     
     def __post_init__(self):
         """Set up default configuration if none provided."""
@@ -49,6 +90,7 @@ DEFAULT_CONFIGS = {
     "development": {
         "level": "DEBUG",
         "json_format": False,
+        "trace_sample_rate": 1.0,
         "handlers": [
             {
                 "type": "console",
@@ -68,6 +110,17 @@ DEFAULT_CONFIGS = {
     "production": {
         "level": "INFO",
         "json_format": True,
+        "trace_sample_rate": 0.1,
+        "flight_recorder": {
+            "capacity": 256,
+            "max_sessions": 64,
+            "directory": "logs/flight"
+        },
+        "adaptive": {
+            "levels": ["WARNING", "ERROR"],
+            "lag_threshold": 0.1,
+            "queue_threshold": 5000
+        },
         "handlers": [
             {
                 "type": "console",
@@ -83,12 +136,23 @@ DEFAULT_CONFIGS = {
                     "max_bytes": 10485760,  # 10MB
                     "backup_count": 5
                 }
+            },
+            {
+                "type": "binary",
+                "level": "INFO",
+                "config": {
+                    # One file per process; binary event files are never shared
+                    "filename": "logs/events/events-{pid}.bin",
+                    "max_bytes": 52428800,  # 50MB
+                    "backup_count": 5
+                }
             }
         ]
     },
     "testing": {
         "level": "WARNING",
         "json_format": False,
+        "trace_sample_rate": 0.0,
         "handlers": [
             {
                 "type": "console",
@@ -101,7 +165,30 @@ DEFAULT_CONFIGS = {
 
 
 def get_config(environment: str = "development") -> LogConfig:
-    """Get configuration for the specified environment."""
+    """
+    Get configuration for the specified environment.
+    
+    When a parent process has started a log collector (and exported its
+    socket path), file-based handlers are routed through the collector.
+    When PY_LOGGER_SHIP_URL is set, records are also shipped to that
+    HTTP endpoint.
+    """
+    config = _build_config(environment)
+    
+    from .collector import COLLECTOR_SOCKET_ENV, use_collector
+    socket_path = os.environ.get(COLLECTOR_SOCKET_ENV)
+    if socket_path:
+        config = use_collector(config, socket_path)
+    
+    from .shipping import SHIP_URL_ENV, use_shipping
+    ship_url = os.environ.get(SHIP_URL_ENV)
+    if ship_url:
+        config = use_shipping(config, ship_url)
+    return config
+
+
+def _build_config(environment: str) -> LogConfig:
+    """Build the preset configuration for an environment."""
     if environment in DEFAULT_CONFIGS:
         config_dict = DEFAULT_CONFIGS[environment]
         
@@ -118,10 +205,37 @@ def get_config(environment: str = "development") -> LogConfig:
             )
             handlers.append(handler)
         
+        flight_recorder = None
+        if "flight_recorder" in config_dict:
+            recorder_dict = dict(config_dict["flight_recorder"])
+            if "trigger_level" in recorder_dict:
+                recorder_dict["trigger_level"] = LogLevel[recorder_dict["trigger_level"].upper()]
+            flight_recorder = FlightRecorderConfig(**recorder_dict)
+        
+        adaptive = None
+        if "adaptive" in config_dict:
+            adaptive_dict = dict(config_dict["adaptive"])
+            if "levels" in adaptive_dict:
+                adaptive_dict["levels"] = [LogLevel[name.upper()] for name in adaptive_dict["levels"]]
+            adaptive = AdaptiveLevelConfig(**adaptive_dict)
+        
+        redaction = RedactionConfig(**config_dict.get("redaction", {}))
+        
+        levels = {name: LogLevel[value.upper()]
+                  for name, value in config_dict.get("levels", {}).items()}
+        
         return LogConfig(
             level=level,
             json_format=json_format,
-            handlers=handlers
+            handlers=handlers,
+            trace_sample_rate=config_dict.get("trace_sample_rate", 1.0),
+            trace_buffer_size=config_dict.get("trace_buffer_size", 4096),
+            error_window=config_dict.get("error_window", 60.0),
+            error_max_fingerprints=config_dict.get("error_max_fingerprints", 512),
+            flight_recorder=flight_recorder,
+            adaptive=adaptive,
+            levels=levels,
+            redaction=redaction
         )
     else:
         return LogConfig() 
\ No newline at end of file
@@ -0,0 +1,365 @@
+"""
+Runtime log-level control.
+
+Levels of registered loggers (and of any stdlib logger, such as
+"livekit.agents") and of handlers can be changed without restarting the
+process or rebuilding handlers:
+
+- edit the watched level file (`PY_LOGGER_LEVEL_FILE`), or send SIGHUP to
+  re-read it
+- send commands to the process's control socket, `logs/control/<pid>.sock`
+
+The level file is JSON and declarative. Loggers and handlers it no longer
+lists go back to their configured levels:
+
+    {"levels": {"ai_therapist_worker": "DEBUG", "livekit": "WARNING"},
+     "handlers": {"rotating": "DEBUG"}}
+
+Control socket commands, one per line, each answered with a JSON line:
+
+    list
+    get <logger>
+    set <logger> <LEVEL|default>
+    handler <type> <LEVEL|default>
+    reload
+
+The socket is removed when the process exits. Sockets left behind by
+processes that died without exiting cleanly are skipped and removed by
+the command line tool.
+
+Usage:
+    python -m utils.py_logger.control set ai_therapist_worker DEBUG
+    python -m utils.py_logger.control --socket logs/control/1234.sock list
+"""
+
+import argparse
+import atexit
+import errno
+import glob
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+from typing import Dict, Any, Optional, List, Union
+
+from .logger import Logger, LogLevel, get_loggers, set_level
+
+
+LEVEL_FILE_ENV = "PY_LOGGER_LEVEL_FILE"
+DEFAULT_CONTROL_DIR = "logs/control"
+
+
+def parse_level(value: Union[str, int, LogLevel, None]) -> Optional[LogLevel]:
+    """Parse a level name or number; None or "default" means the configured level."""
+    if value is None or isinstance(value, LogLevel):
+        return value
+    if isinstance(value, int):
+        return LogLevel(value)
+    if value.lower() == "default":
+        return None
+    try:
+        return LogLevel[value.upper()]
+    except KeyError:
+        raise ValueError(f"unknown log level: {value}") from None
+
+
+def load_level_file(path: str) -> Dict[str, Dict[str, Optional[LogLevel]]]:
+    """Read a level file into {"levels": {...}, "handlers": {...}}."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a JSON object")
+    return {
+        'levels': {name: parse_level(value) for name, value in data.get('levels', {}).items()},
+        'handlers': {name: parse_level(value) for name, value in data.get('handlers', {}).items()}
+    }
+
+
+def _root_loggers() -> List[Logger]:
+    """Registered loggers that own handlers."""
+    return [logger for logger in get_loggers().values() if logger.parent is None]
+
+
+def set_handler_level(handler_type: str, level: Optional[LogLevel]) -> int:
+    """Change the level of every handler of a type; returns the number changed."""
+    return sum(logger.set_handler_level(handler_type, level) for logger in _root_loggers())
+
+
+def describe_levels() -> Dict[str, Any]:
+    """Current effective logger levels and handler levels."""
+    handlers: Dict[str, str] = {}
+    for logger in _root_loggers():
+        for handler_type, level in logger.get_handler_levels().items():
+            handlers[f"{logger.name}:{handler_type}"] = level
+    return {
+        'pid': os.getpid(),
+        'levels': {name: logger.get_level().name for name, logger in sorted(get_loggers().items())},
+        'handlers': handlers
+    }
+
+
+class LevelController:
+    """
+    Applies level changes from a level file, SIGHUP and a control socket.
+
+    All work happens on background threads; logging calls are unaffected
+    apart from the level changes themselves.
+    """
+
+    def __init__(self, level_file: Optional[str] = None, socket_path: Optional[str] = None,
+                 poll_interval: float = 1.0):
+        self.level_file = level_file
+        self.socket_path = socket_path
+        self.poll_interval = poll_interval
+        self.pid = os.getpid()
+        self._applied: Dict[str, Dict[str, Optional[LogLevel]]] = {'levels': {}, 'handlers': {}}
+        self._file_state = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+        self._previous_sighup = None
+
+    def apply(self, spec: Dict[str, Dict[str, Optional[LogLevel]]]):
+        """
+        Apply a declarative level spec.
+
+        Entries applied earlier but missing from `spec` are restored to
+        their configured levels.
+        """
+        with self._lock:
+            for name in self._applied['levels'].keys() - spec.get('levels', {}).keys():
+                set_level(name, None)
+            for handler_type in self._applied['handlers'].keys() - spec.get('handlers', {}).keys():
+                set_handler_level(handler_type, None)
+            for name, level in spec.get('levels', {}).items():
+                set_level(name, level)
+            for handler_type, level in spec.get('handlers', {}).items():
+                set_handler_level(handler_type, level)
+            self._applied = {'levels': dict(spec.get('levels', {})),
+                             'handlers': dict(spec.get('handlers', {}))}
+
+    def reload(self) -> bool:
+        """Re-read the level file; returns False if it could not be applied."""
+        if not self.level_file:
+            return False
+        try:
+            spec = load_level_file(self.level_file)
+        except FileNotFoundError:
+            spec = {'levels': {}, 'handlers': {}}
+        except (OSError, ValueError) as e:
+            print(f"Failed to load log levels from {self.level_file}: {e}")
+            return False
+        self.apply(spec)
+        return True
+
+    def _stat_level_file(self):
+        """Identity of the level file's current contents."""
+        try:
+            st = os.stat(self.level_file)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _watch(self):
+        """Reload when the level file changes or SIGHUP arrives."""
+        while not self._stopped.is_set():
+            requested = self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            state = self._stat_level_file() if self.level_file else None
+            if requested or state != self._file_state:
+                self._file_state = state
+                self.reload()
+
+    def _on_sighup(self, signum, frame):
+        """Signal handler; the reload itself runs on the watcher thread."""
+        self._wake.set()
+        if callable(self._previous_sighup):
+            self._previous_sighup(signum, frame)
+
+    def handle_command(self, line: str) -> Dict[str, Any]:
+        """Execute one control command and return the reply."""
+        parts = line.split()
+        if not parts:
+            return {'ok': False, 'error': 'empty command'}
+        command, args = parts[0].lower(), parts[1:]
+        try:
+            if command == "list" and not args:
+                return {'ok': True, **describe_levels()}
+            if command == "get" and len(args) == 1:
+                return {'ok': True, 'logger': args[0],
+                        'level': logging.getLevelName(logging.getLogger(args[0]).getEffectiveLevel())}
+            if command == "set" and len(args) == 2:
+                level = parse_level(args[1])
+                with self._lock:
+                    set_level(args[0], level)
+                return {'ok': True, 'logger': args[0], 'level': args[1].upper()}
+            if command == "handler" and len(args) == 2:
+                level = parse_level(args[1])
+                with self._lock:
+                    changed = set_handler_level(args[0], level)
+                return {'ok': changed > 0, 'handler': args[0], 'level': args[1].upper(), 'changed': changed}
+            if command == "reload" and not args:
+                return {'ok': self.reload()}
+        except ValueError as e:
+            return {'ok': False, 'error': str(e)}
+        return {'ok': False, 'error': f"invalid command: {line.strip()}"}
+
+    def start(self) -> 'LevelController':
+        """Apply the level file and start the watcher, SIGHUP handler and socket."""
+        if self.level_file:
+            self._file_state = self._stat_level_file()
+            self.reload()
+
+        try:
+            self._previous_sighup = signal.signal(signal.SIGHUP, self._on_sighup)
+        except (ValueError, AttributeError):
+            # Not the main thread, or no SIGHUP on this platform
+            self._previous_sighup = None
+
+        self._watcher = threading.Thread(target=self._watch, name="log-level-watcher", daemon=True)
+        self._watcher.start()
+
+        if self.socket_path:
+            self._start_server()
+        return self
+
+    def _start_server(self):
+        """Serve control commands on a Unix socket."""
+        directory = os.path.dirname(self.socket_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        controller = self
+
+        class _CommandHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for raw in self.rfile:
+                    reply = controller.handle_command(raw.decode('utf-8', errors='replace'))
+                    self.wfile.write(json.dumps(reply).encode('utf-8') + b"\n")
+
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, _CommandHandler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="log-level-control",
+                         daemon=True).start()
+
+    def stop(self):
+        """Stop background threads and remove the control socket."""
+        self._stopped.set()
+        self._wake.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=1)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+        if self._previous_sighup is not None:
+            try:
+                signal.signal(signal.SIGHUP, self._previous_sighup)
+            except ValueError:
+                pass
+            self._previous_sighup = None
+
+
+_controller: Optional[LevelController] = None
+
+
+def _stop_at_exit(controller: LevelController):
+    """atexit hook; forked children inherit it but do not own the socket or threads."""
+    if controller.pid == os.getpid():
+        controller.stop()
+
+
+def start_level_control(level_file: Optional[str] = None,
+                        control_dir: str = DEFAULT_CONTROL_DIR) -> LevelController:
+    """
+    Start runtime level control for this process (once per process).
+
+    The level file defaults to `$PY_LOGGER_LEVEL_FILE`; the control socket
+    is `<control_dir>/<pid>.sock`.
+    """
+    global _controller
+
+    if _controller is not None and _controller.pid == os.getpid():
+        return _controller
+
+    if level_file is None:
+        level_file = os.environ.get(LEVEL_FILE_ENV)
+    socket_path = os.path.join(control_dir, f"{os.getpid()}.sock") if control_dir else None
+    _controller = LevelController(level_file=level_file, socket_path=socket_path).start()
+    atexit.register(_stop_at_exit, _controller)
+    return _controller
+
+
+def send_command(socket_path: str, command: str, timeout: float = 2.0) -> Dict[str, Any]:
+    """Send one command to a control socket and return its reply."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(command.encode('utf-8') + b"\n")
+        sock.shutdown(socket.SHUT_WR)
+        with sock.makefile('rb') as f:
+            return json.loads(f.readline())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Change log levels of running processes.")
+    parser.add_argument("--socket", help="Control socket of one process (default: every socket in --dir)")
+    parser.add_argument("--dir", default=DEFAULT_CONTROL_DIR, help="Directory of control sockets")
+    parser.add_argument("command", nargs="+", help="list | get NAME | set NAME LEVEL | handler TYPE LEVEL | reload")
+    args = parser.parse_args(argv)
+
+    sockets = [args.socket] if args.socket else sorted(glob.glob(os.path.join(args.dir, "*.sock")))
+    command = " ".join(args.command)
+    failed = 0
+    replied = 0
+    for path in sockets:
+        try:
+            reply = send_command(path, command)
+        except (ConnectionRefusedError, FileNotFoundError) as e:
+            if args.socket:
+                print(f"{path}: {e}", file=sys.stderr)
+                failed += 1
+            else:
+                # Nobody is listening: left behind by a process that is gone
+                _remove_stale_socket(path)
+            continue
+        except (OSError, ValueError) as e:
+            print(f"{path}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        print(json.dumps({'socket': path, **reply}))
+        replied += 1
+        failed += not reply.get('ok')
+    if not replied and not failed:
+        print(f"No live control sockets found in {args.dir}", file=sys.stderr)
+        return 1
+    return 1 if failed else 0
+
+
+def _remove_stale_socket(path: str):
+    """Remove a control socket that refuses connections."""
+    try:
+        os.unlink(path)
+        print(f"{path}: removed stale socket", file=sys.stderr)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            print(f"{path}: stale socket, could not remove: {e}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+Exception fingerprinting and storm suppression for `Logger.log_exception`.
+
+An exception's fingerprint is a short hash of its type, the types in its
+cause/context chain and its normalized frame stack: (file, function)
+pairs without line numbers or messages, with file paths cut down to
+their package-relative part. Identical failures from a flapping
+connection therefore share one fingerprint across releases and hosts.
+
+Per fingerprint, within each window:
+
+- the first occurrence is logged in full, with its traceback
+- occurrences 2, 4, 8, ... are logged as counters without a traceback
+- all others are only counted
+
+When a window with repeats ends, a summary with its occurrence count is
+returned for logging. Windows are swept on later observations, by
+`sweep()` (which `Logger` calls from a timer while windows are open, so a
+storm that goes quiet is still reported) and on `flush()`.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Dict, Any, Optional, List, Tuple
+
+
+FULL = "full"
+COUNT = "count"
+SUPPRESS = "suppress"
+
+# Frames kept per fingerprint (innermost last); deeper stacks keep the innermost
+_MAX_FRAMES = 32
+_MAX_CHAIN = 5
+
+
+@dataclass
+class ErrorStats:
+    """Occurrence statistics for one fingerprint."""
+    fingerprint: str
+    exception_type: str
+    location: str
+    sample: str
+    first_seen: float
+    last_seen: float
+    total: int = 0
+    suppressed: int = 0
+    window_start: Optional[float] = None
+    window_count: int = 0
+
+
+def _normalize_filename(path: str) -> str:
+    """Drop install-specific prefixes from a source path."""
+    path = path.replace(os.sep, "/")
+    marker = path.rfind("site-packages/")
+    if marker != -1:
+        return path[marker + len("site-packages/"):]
+    return "/".join(path.rsplit("/", 2)[-2:])
+
+
+def _frames(exc: BaseException) -> List[Tuple[str, str]]:
+    """(file, function) pairs of an exception's traceback, outermost first."""
+    frames = []
+    tb = exc.__traceback__
+    while tb is not None:
+        code = tb.tb_frame.f_code
+        frames.append((code.co_filename, code.co_name))
+        tb = tb.tb_next
+    return frames[-_MAX_FRAMES:]
+
+
+def fingerprint_exception(exc: BaseException) -> Tuple[str, str, str]:
+    """Return (fingerprint, exception type, innermost location) for an exception."""
+    exc_type = type(exc)
+    type_name = f"{exc_type.__module__}.{exc_type.__qualname__}"
+    frames = [(_normalize_filename(filename), function) for filename, function in _frames(exc)]
+
+    chain = []
+    linked = exc.__cause__ or exc.__context__
+    while linked is not None and len(chain) < _MAX_CHAIN:
+        chain.append(type(linked).__qualname__)
+        linked = linked.__cause__ or linked.__context__
+
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(type_name.encode())
+    for name in chain:
+        digest.update(b"<" + name.encode())
+    for filename, function in frames:
+        digest.update(f"|{filename}:{function}".encode())
+
+    location = f"{frames[-1][0]}:{frames[-1][1]}" if frames else "<unknown>"
+    return digest.hexdigest(), type_name, location
+
+
+class ErrorFingerprinter:
+    """Tracks exception fingerprints and decides what to log for each occurrence."""
+
+    def __init__(self, window: float = 60.0, max_fingerprints: int = 512,
+                 redactor: Optional['Redactor'] = None):
+        self.window = window
+        self.max_fingerprints = max_fingerprints
+        self.redactor = redactor
+        self._stats: "OrderedDict[str, ErrorStats]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+        self._suppressed = 0
+        self._evicted = 0
+
+    def observe(self, exc: BaseException, now: Optional[float] = None
+                ) -> Tuple[str, ErrorStats, List[Dict[str, Any]]]:
+        """
+        Record an occurrence.
+
+        Returns the action (FULL, COUNT or SUPPRESS), a snapshot of the
+        fingerprint's statistics and summaries of windows that have ended.
+        """
+        if now is None:
+            now = time.time()
+        key, type_name, location = fingerprint_exception(exc)
+
+        with self._lock:
+            summaries = self._sweep(now) if now >= self._next_sweep else []
+
+            stats = self._stats.get(key)
+            if stats is None:
+                sample = str(exc)[:200]
+                if self.redactor is not None:
+                    sample = self.redactor.redact_text(sample)
+                stats = ErrorStats(key, type_name, location, sample, now, now)
+                self._stats[key] = stats
+                while len(self._stats) > self.max_fingerprints:
+                    self._stats.popitem(last=False)
+                    self._evicted += 1
+            else:
+                self._stats.move_to_end(key)
+                if stats.window_start is not None and now - stats.window_start >= self.window:
+                    summary = self._close_window(stats)
+                    if summary is not None:
+                        summaries.append(summary)
+
+            if stats.window_start is None:
+                stats.window_start = now
+            stats.total += 1
+            stats.window_count += 1
+            stats.last_seen = now
+
+            count = stats.window_count
+            if count == 1:
+                action = FULL
+            elif count & (count - 1) == 0:
+                action = COUNT
+            else:
+                action = SUPPRESS
+                stats.suppressed += 1
+                self._suppressed += 1
+            return action, replace(stats), summaries
+
+    def _sweep(self, now: float) -> List[Dict[str, Any]]:
+        """Close every window that has ended; runs at most once per second."""
+        self._next_sweep = now + min(self.window, 1.0)
+        summaries = []
+        for stats in self._stats.values():
+            if stats.window_start is not None and now - stats.window_start >= self.window:
+                summary = self._close_window(stats)
+                if summary is not None:
+                    summaries.append(summary)
+        return summaries
+
+    def _close_window(self, stats: ErrorStats) -> Optional[Dict[str, Any]]:
+        """Reset a fingerprint's window; returns a summary if it had repeats."""
+        summary = None
+        if stats.window_count > 1:
+            summary = {
+                'fingerprint': stats.fingerprint,
+                'exception_type': stats.exception_type,
+                'location': stats.location,
+                'occurrences': stats.window_count,
+                'window_start': stats.window_start,
+                'window_seconds': self.window,
+                'total': stats.total
+            }
+        stats.window_start = None
+        stats.window_count = 0
+        return summary
+
+    def sweep(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Close the windows that have ended, returning summaries of those with repeats."""
+        with self._lock:
+            return self._sweep(time.time() if now is None else now)
+
+    def open_windows(self) -> int:
+        """Number of fingerprints with an open window."""
+        with self._lock:
+            return sum(1 for stats in self._stats.values() if stats.window_start is not None)
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Close all open windows now, returning summaries of those with repeats."""
+        with self._lock:
+            summaries = []
+            for stats in self._stats.values():
+                if stats.window_start is not None:
+                    summary = self._close_window(stats)
+                    if summary is not None:
+                        summaries.append(summary)
+            return summaries
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get per-fingerprint statistics."""
+        with self._lock:
+            fingerprints = {
+                key: {
+                    'exception_type': stats.exception_type,
+                    'location': stats.location,
+                    'sample': stats.sample,
+                    'total': stats.total,
+                    'suppressed': stats.suppressed,
+                    'window_count': stats.window_count,
+                    'first_seen': stats.first_seen,
+                    'last_seen': stats.last_seen
+                }
+                for key, stats in self._stats.items()
+            }
+        return {
+            'window': self.window,
+            'fingerprints': fingerprints,
+            'suppressed': self._suppressed,
+            'evicted_fingerprints': self._evicted
+        }
@@ -0,0 +1,292 @@
+"""
+In-memory flight recorder for per-session debug context.
+
+Records at every level are kept in a small per-session ring buffer in
+their raw form (message, context object and extra kwargs). Nothing is
+formatted until an error or critical record triggers a dump, at which
+point the buffered history for that session is written to a file.
+
+`dump` only takes the session's records out of its buffer and queues
+them; a background thread formats them and writes the file, so an error
+logged on the event loop never waits on the disk. Dumps of a session
+within `dump_interval` seconds of its first dump are appended to the
+same file, so a session that keeps failing produces one file per
+interval rather than one per error.
+
+A session's buffer is bounded by record count and by approximate bytes.
+When a record is buffered, its `extra` dict is copied. Strings longer
+than `max_value_chars` are truncated, and so are large containers, which
+are stored as a truncated repr. Smaller lists, dicts and sets are copied
+shallowly. A few large transcripts therefore cannot hold megabytes per
+session, and later mutation of the caller's objects does not change the
+history.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Tuple
+
+from .logger import LogLevel
+from .timestamps import format_timestamp
+
+
+class FlightRecorder:
+    """
+    Per-session ring buffers of raw log records.
+
+    Memory is bounded by `capacity` records and `max_bytes` (approximate)
+    per session, and `max_sessions` live buffers; the oldest record, and
+    the oldest session, are evicted first. Dumps are written by a
+    background thread; `flush` waits for queued dumps.
+    """
+
+    def __init__(self, capacity: int = 256, max_sessions: int = 64,
+                 directory: str = "logs/flight", trigger_level: LogLevel = LogLevel.ERROR,
+                 redactor: Optional['Redactor'] = None, max_bytes: int = 256 * 1024,
+                 max_value_chars: int = 2048, dump_interval: float = 60.0):
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.max_value_chars = max_value_chars
+        self.redactor = redactor
+        self.max_sessions = max_sessions
+        self.directory = directory
+        self.trigger_level = trigger_level.value
+        self.dump_interval = dump_interval
+        self._buffers: "OrderedDict[str, _SessionBuffer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dumps = 0
+        self._dump_files_opened = 0
+        self._evictions = 0
+        # session key -> (dump file, monotonic time it was opened)
+        self._dump_files: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._pending: deque = deque()
+        self._wake = threading.Event()
+        self._idle = threading.Condition()
+        self._busy = False
+        self._writer: Optional[threading.Thread] = None
+        self._pid = os.getpid()
+
+    def record(self, session_key: str, level: LogLevel, logger_name: str,
+               message: str, context: Any, extra: Dict[str, Any]):
+        """Append a bounded copy of a record to the session's buffer."""
+        limit = self.max_value_chars
+        if len(message) > limit:
+            message = _truncate(message, limit)
+        size = 64 + len(message)
+        copied = {}
+        for key, value in extra.items():
+            value, value_size = _bounded(value, limit)
+            copied[key] = value
+            size += len(key) + value_size
+        buffer = self._buffers.get(session_key)
+        if buffer is None:
+            buffer = self._new_buffer(session_key)
+        with self._lock:
+            buffer.append((time.time(), level, logger_name, message, context, copied), size,
+                          self.capacity, self.max_bytes)
+
+    def _new_buffer(self, session_key: str) -> '_SessionBuffer':
+        """Create a buffer for a session, evicting the oldest if needed."""
+        with self._lock:
+            buffer = self._buffers.get(session_key)
+            if buffer is None:
+                buffer = _SessionBuffer()
+                self._buffers[session_key] = buffer
+                while len(self._buffers) > self.max_sessions:
+                    self._buffers.popitem(last=False)
+                    self._evictions += 1
+            else:
+                self._buffers.move_to_end(session_key)
+            return buffer
+
+    def dump(self, session_key: str, reason: str = "error") -> Optional[str]:
+        """
+        Queue the session's buffered records for writing and clear the buffer.
+
+        Returns the file the records will be appended to.
+        """
+        now = time.monotonic()
+        with self._lock:
+            buffer = self._buffers.get(session_key)
+            if not buffer:
+                return None
+            records = buffer.take()
+            filename, opened = self._dump_files.get(session_key, (None, 0.0))
+            if filename is None or now - opened >= self.dump_interval:
+                stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+                filename = os.path.join(self.directory, f"{_safe_name(session_key)}-{stamp}.log")
+                self._dump_files[session_key] = (filename, now)
+                self._dump_files.move_to_end(session_key)
+                while len(self._dump_files) > self.max_sessions:
+                    self._dump_files.popitem(last=False)
+                self._dump_files_opened += 1
+            self._dumps += 1
+
+        if os.getpid() != self._pid:
+            self._reset()
+        if self._writer is None:
+            self._start_writer()
+        self._pending.append((filename, records, reason))
+        self._wake.set()
+        return filename
+
+    def _reset(self):
+        """Drop writer state inherited from the parent process after a fork."""
+        self._pid = os.getpid()
+        self._pending = deque()
+        self._wake = threading.Event()
+        self._idle = threading.Condition()
+        self._busy = False
+        self._writer = None
+
+    def _start_writer(self):
+        """Start the background dump writer."""
+        with self._lock:
+            if self._writer is not None:
+                return
+            self._writer = threading.Thread(target=self._run, name="py_logger-flight-recorder", daemon=True)
+            self._writer.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        """Write queued dumps as they arrive."""
+        pid = self._pid
+        while os.getpid() == pid:
+            self._wake.wait()
+            self._wake.clear()
+            with self._idle:
+                self._busy = True
+            try:
+                self._write_pending()
+            finally:
+                with self._idle:
+                    self._busy = False
+                    self._idle.notify_all()
+
+    def _write_pending(self):
+        """Format queued dumps and append them to their files."""
+        pending = self._pending
+        while pending:
+            filename, records, reason = pending.popleft()
+            try:
+                os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+                with open(filename, "a", encoding="utf-8") as f:
+                    for record in records:
+                        f.write(json.dumps(_format_record(record, reason, self.redactor), default=str) + "\n")
+            except Exception as e:
+                print(f"Failed to write flight recorder dump {filename}: {e}")
+
+    def flush(self, timeout: float = 5.0):
+        """Wait until queued dumps have been written."""
+        if self._writer is None or os.getpid() != self._pid:
+            return
+        deadline = time.monotonic() + timeout
+        with self._idle:
+            while time.monotonic() < deadline and (self._pending or self._busy):
+                self._wake.set()
+                self._idle.wait(min(0.05, max(0.0, deadline - time.monotonic())))
+
+    def discard(self, session_key: str):
+        """Drop the buffer of a finished session."""
+        with self._lock:
+            self._buffers.pop(session_key, None)
+            self._dump_files.pop(session_key, None)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get flight recorder statistics."""
+        return {
+            'sessions': len(self._buffers),
+            'buffered_records': sum(len(buffer) for buffer in self._buffers.values()),
+            'buffered_bytes': sum(buffer.bytes for buffer in self._buffers.values()),
+            'capacity': self.capacity,
+            'max_bytes': self.max_bytes,
+            'dumps': self._dumps,
+            'dump_files': self._dump_files_opened,
+            'pending_dumps': len(self._pending),
+            'evicted_sessions': self._evictions
+        }
+
+
+class _SessionBuffer:
+    """Records of one session and their approximate total size."""
+
+    __slots__ = ('records', 'sizes', 'bytes')
+
+    def __init__(self):
+        self.records: deque = deque()
+        self.sizes: deque = deque()
+        self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def append(self, record: Tuple, size: int, capacity: int, max_bytes: int):
+        """Add a record, dropping the oldest ones beyond the count or byte budget."""
+        self.records.append(record)
+        self.sizes.append(size)
+        self.bytes += size
+        while len(self.records) > 1 and (len(self.records) > capacity or self.bytes > max_bytes):
+            self.records.popleft()
+            self.bytes -= self.sizes.popleft()
+
+    def take(self) -> list:
+        """Remove and return every record."""
+        records = list(self.records)
+        self.records.clear()
+        self.sizes.clear()
+        self.bytes = 0
+        return records
+
+
+def _truncate(text, limit: int):
+    if type(text) is bytes:
+        return text[:limit] + b"..."
+    return f"{text[:limit]}...[{len(text) - limit} more chars]"
+
+
+def _bounded(value: Any, limit: int) -> Tuple[Any, int]:
+    """A value that is safe to keep in the buffer, and its approximate size in bytes."""
+    kind = type(value)
+    if kind is str or kind is bytes:
+        if len(value) > limit:
+            value = _truncate(value, limit)
+        return value, len(value)
+    if value is None or kind is int or kind is float or kind is bool:
+        return value, 8
+    text = repr(value)
+    if len(text) > limit:
+        # Large containers are kept as a truncated snapshot
+        return _truncate(text, limit), limit
+    if kind is list or kind is dict or kind is set:
+        value = kind(value)
+    return value, len(text)
+
+
+def _format_record(record: Tuple, reason: str, redactor: Optional['Redactor'] = None) -> Dict[str, Any]:
+    """Render a raw buffered record as a JSON-serializable entry."""
+    created, level, logger_name, message, context, extra = record
+    if redactor is not None:
+        message = redactor.redact_text(message)
+        context = redactor.redact_context(context) if context is not None else {}
+        extra = redactor.redact_mapping(extra)
+    else:
+        context = context.to_dict() if context is not None else {}
+    return {
+        'timestamp': format_timestamp(created),
+        'level': level.name,
+        'logger': logger_name,
+        'message': message,
+        'context': context,
+        'extra': extra,
+        'dump_reason': reason
+    }
+
+
+def _safe_name(session_key: str) -> str:
+    """Make a session key safe to use in a filename."""
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in session_key)
@@ -6,9 +6,19 @@ import logging
 import json
 from datetime import datetime
 from typing import Dict, Any, Optional
+from .timestamps import record_timestamp
+from .redaction import get_redactor
 
 
-class StandardFormatter(logging.Formatter):
+class BaseFormatter(logging.Formatter):
+    """Base formatter that renders the record's shared UTC timestamp."""
+    
+    def formatTime(self, record, datefmt=None):
+        """Return the record's ISO-8601 UTC timestamp (datefmt is ignored)."""
+        return record_timestamp(record)
+
+
+class StandardFormatter(BaseFormatter):
     """Standard log formatter with timestamp and structured data."""
     
     def __init__(self):
@@ -29,7 +39,7 @@ class StandardFormatter(logging.Formatter):
         return super().format(record)
 
 
-class JSONFormatter(logging.Formatter):
+class JSONFormatter(BaseFormatter):
     """JSON formatter for structured logging."""
     
     def __init__(self):
@@ -63,7 +73,7 @@ class JSONFormatter(logging.Formatter):
         return json.dumps(log_entry)
 
 
-class StructuredFormatter(logging.Formatter):
+class StructuredFormatter(BaseFormatter):
     """Structured formatter with key-value pairs."""
     
     def __init__(self):
@@ -94,7 +104,7 @@ class StructuredFormatter(logging.Formatter):
         return " | ".join(parts)
 
 
-class ColorFormatter(logging.Formatter):
+class ColorFormatter(BaseFormatter):
     """Colorized formatter for console output."""
     
     # ANSI color codes
@@ -140,7 +150,7 @@ class ColorFormatter(logging.Formatter):
         return formatted
 
 
-class CompactFormatter(logging.Formatter):
+class CompactFormatter(BaseFormatter):
     """Compact formatter for high-volume logging."""
     
     def __init__(self):
@@ -149,6 +159,10 @@ class CompactFormatter(logging.Formatter):
             datefmt='%H:%M:%S'
         )
     
+    def formatTime(self, record, datefmt=None):
+        """Return only the time of day from the shared timestamp."""
+        return record_timestamp(record)[11:19]
+    
     def format(self, record):
         """Format log record in compact format."""
         formatted = super().format(record)
@@ -169,7 +183,7 @@ class CompactFormatter(logging.Formatter):
         return formatted
 
 
-class DetailedFormatter(logging.Formatter):
+class DetailedFormatter(BaseFormatter):
     """Detailed formatter with comprehensive information."""
     
     def __init__(self):
@@ -196,7 +210,7 @@ class DetailedFormatter(logging.Formatter):
         return formatted
 
 
-class PerformanceFormatter(logging.Formatter):
+class PerformanceFormatter(BaseFormatter):
     """Specialized formatter for performance logging."""
     
     def __init__(self):
@@ -228,7 +242,7 @@ class PerformanceFormatter(logging.Formatter):
         return formatted
 
 
-class SecurityFormatter(logging.Formatter):
+class SecurityFormatter(BaseFormatter):
     """Specialized formatter for security-related logging."""
     
     def __init__(self):
@@ -255,14 +269,5 @@ class SecurityFormatter(logging.Formatter):
         return formatted
     
     def _sanitize_context(self, context: Dict[str, Any]) -> Dict[str, Any]:
-        """Sanitize sensitive information in context."""
-        sanitized = {}
-        sensitive_keys = ['password', 'token', 'secret', 'key', 'auth']
-        
-        for key, value in context.items():
-            if any(sensitive in key.lower() for sensitive in sensitive_keys):
-                sanitized[key] = '***REDACTED***'
-            else:
-                sanitized[key] = value
-        
-        return sanitized 
\ No newline at end of file
+        """Sanitize sensitive keys and PII values in context."""
+        return get_redactor().redact_mapping(context) 
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""
+Helpers for locating and parsing the JSON log files written by the handlers.
+"""
+
+import ast
+import glob
+import json
+import os
+import re
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List, Union
+
+
+_ROTATED_SUFFIX = re.compile(r"\.(\d+)(\.gz|\.bz2|\.xz)?")
+
+
+def find_log_files(base_path: str, include_compressed: bool = False) -> List[str]:
+    """
+    Find a log file and its rotated backups, oldest first.
+
+    RotatingFileHandler names backups `<base>.1` (newest) to `<base>.N`
+    (oldest); compressed backups such as `<base>.3.gz` are included on request.
+    """
+    rotated = []
+    for path in glob.glob(glob.escape(base_path) + ".*"):
+        match = _ROTATED_SUFFIX.fullmatch(path[len(base_path):])
+        if not match:
+            continue
+        if match.group(2) and not include_compressed:
+            continue
+        rotated.append((int(match.group(1)), path))
+
+    files = [path for _, path in sorted(rotated, reverse=True)]
+    if os.path.exists(base_path):
+        files.append(base_path)
+    return files
+
+
+def parse_timestamp(value: Any) -> Optional[float]:
+    """
+    Parse a log timestamp into epoch seconds.
+
+    Naive ISO timestamps are treated as UTC (the logger writes UTC);
+    `formatTime` style timestamps ("2024-01-15 10:30:15,123") are local time.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        if "," in value:
+            return datetime.strptime(value, "%Y-%m-%d %H:%M:%S,%f").timestamp()
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _parse_message(message: str) -> Optional[Dict[str, Any]]:
+    """Decode a structured entry embedded in a record's message, if any."""
+    if not message or message[0] != "{":
+        return None
+    try:
+        entry = json.loads(message)
+    except ValueError:
+        try:
+            entry = ast.literal_eval(message)
+        except (ValueError, SyntaxError):
+            return None
+    return entry if isinstance(entry, dict) else None
+
+
+def parse_record(line: Union[str, bytes]) -> Optional[Dict[str, Any]]:
+    """
+    Parse one JSON log line into a flat record.
+
+    Logger output is wrapped by the handler's formatter, so the structured
+    entry (context, extra, UTC timestamp) may be embedded in `message`.
+    Returns None for lines that are not JSON objects.
+    """
+    try:
+        outer = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(outer, dict):
+        return None
+
+    record = {
+        'timestamp': outer.get('timestamp'),
+        'level': outer.get('level'),
+        'logger': outer.get('logger'),
+        'message': outer.get('message'),
+        'context': outer.get('context') or {},
+        'extra': outer.get('extra') or {}
+    }
+
+    inner = _parse_message(record['message']) if isinstance(record['message'], str) else None
+    if inner is not None and 'message' in inner:
+        record['message'] = inner.get('message')
+        record['timestamp'] = inner.get('timestamp') or record['timestamp']
+        record['level'] = inner.get('level') or record['level']
+        record['context'] = inner.get('context') or record['context']
+        record['extra'] = inner.get('extra') or record['extra']
+        for key in ('trace_id', 'span_id'):
+            if key in inner:
+                record[key] = inner[key]
+
+    record['time'] = parse_timestamp(record['timestamp'])
+    return record
+
+
+def record_field(record: Dict[str, Any], key: str) -> Any:
+    """Look up a field in a record's context, falling back to its extra data."""
+    value = record['context'].get(key) if isinstance(record['context'], dict) else None
+    if value is None and isinstance(record['extra'], dict):
+        value = record['extra'].get(key)
+    return value
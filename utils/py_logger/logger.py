@@ -4,15 +4,18 @@ Core logging functionality with structured logging support.
 
 import logging
 import sys
+import threading
 import time
 import uuid
-from datetime import datetime
 from enum import Enum
 from typing import Dict, Any, Optional, List
 from dataclasses import dataclass, field
 from contextlib import contextmanager
 import traceback
 import json
+from .tracing import Tracer, get_current_span
+from .fingerprint import ErrorFingerprinter, FULL, COUNT
+from .timestamps import format_timestamp
 
 
 class LogLevel(Enum):
@@ -56,34 +59,84 @@ class Logger:
     - Multiple handlers (console, file, JSON)
     - Structured logging with context
     - Performance timing
+    - Span tracing with Chrome Trace / OTLP export
     - Error tracking
     - Configurable formatting
+    - Named component loggers with runtime-adjustable levels
+    
+    A logger created with a `parent` is a component logger: it has no
+    handlers of its own and shares the parent's configuration, tracer,
+    flight recorder and context. Its records propagate to the parent's
+    handlers through the stdlib logger hierarchy, so its level can be
+    changed independently without rebuilding anything.
     """
     
-    def __init__(self, name: str = "ai_therapist", config: Optional['LogConfig'] = None):
+    def __init__(self, name: str = "ai_therapist", config: Optional['LogConfig'] = None,
+                 parent: Optional['Logger'] = None):
         self.name = name
+        self.parent = parent
+        self._children: List['Logger'] = []
+        self._logger = logging.getLogger(name)
+        
+        if parent is not None:
+            self.config = parent.config
+            self.tracer = parent.tracer
+            self.flight_recorder = parent.flight_recorder
+            self.redactor = parent.redactor
+            self.error_tracker = parent.error_tracker
+            self._context_stack = parent._context_stack
+            self._event_handlers = parent._event_handlers
+            parent._children.append(self)
+            for handler in self._logger.handlers[:]:
+                self._logger.removeHandler(handler)
+            self._logger.propagate = True
+            return
+        
         if config is None:
             from .config import LogConfig
             self.config = LogConfig()
         else:
             self.config = config
-        self._logger = logging.getLogger(name)
+        self.tracer = Tracer(
+            sample_rate=self.config.trace_sample_rate,
+            buffer_size=self.config.trace_buffer_size,
+            service_name=name
+        )
+        self.redactor = self._create_redactor()
+        self.flight_recorder = self._create_flight_recorder()
+        self.error_tracker = ErrorFingerprinter(
+            window=self.config.error_window,
+            max_fingerprints=self.config.error_max_fingerprints,
+            redactor=self.redactor
+        )
+        self._event_handlers: List[logging.Handler] = []
+        self._summary_lock = threading.Lock()
+        self._summary_timer: Optional[threading.Timer] = None
         self._setup_logger()
         self._context_stack: List[LogContext] = []
     
     def _setup_logger(self):
         """Setup the underlying logging configuration."""
         self._logger.setLevel(self.config.level.value)
+        for name, level in self.config.levels.items():
+            logging.getLogger(name).setLevel(level.value)
         
         # Clear existing handlers
         for handler in self._logger.handlers[:]:
             self._logger.removeHandler(handler)
+            handler.close()
         
         # Add configured handlers
         for handler_config in self.config.handlers:
             handler = self._create_handler(handler_config)
             if handler:
+                if self.redactor is not None:
+                    from .redaction import RedactionFilter
+                    handler.addFilter(RedactionFilter(self.redactor))
                 self._logger.addHandler(handler)
+        
+        # Shared in place with component loggers
+        self._event_handlers[:] = [h for h in self._logger.handlers if hasattr(h, 'write_event')]
     
     def _create_handler(self, handler_config: 'HandlerConfig') -> Optional[logging.Handler]:
         """Create a handler based on configuration."""
@@ -100,11 +153,125 @@ class Logger:
             elif handler_config.type == "json":
                 from .handlers import JSONHandler
                 return JSONHandler(handler_config)
+            elif handler_config.type == "collector":
+                from .collector import CollectorHandler
+                return CollectorHandler(handler_config)
+            elif handler_config.type == "binary":
+                from .binary import BinaryEventHandler
+                return BinaryEventHandler(handler_config)
+            elif handler_config.type == "shipping":
+                from .shipping import ShippingHandler
+                return ShippingHandler(handler_config)
         except Exception as e:
             # Fallback to console handler if configuration fails
             print(f"Failed to create handler {handler_config.type}: {e}")
             return None
     
+    def _create_flight_recorder(self) -> Optional['FlightRecorder']:
+        """Create the flight recorder if enabled in configuration."""
+        recorder_config = self.config.flight_recorder
+        if recorder_config is None:
+            return None
+        from .flight_recorder import FlightRecorder
+        return FlightRecorder(
+            capacity=recorder_config.capacity,
+            max_bytes=recorder_config.max_bytes,
+            max_value_chars=recorder_config.max_value_chars,
+            max_sessions=recorder_config.max_sessions,
+            directory=recorder_config.directory,
+            trigger_level=recorder_config.trigger_level,
+            dump_interval=recorder_config.dump_interval,
+            redactor=self.redactor
+        )
+    
+    def _create_redactor(self) -> Optional['Redactor']:
+        """Create the redactor if enabled in configuration."""
+        redaction = self.config.redaction
+        if not redaction.enabled:
+            return None
+        from .redaction import Redactor, get_redactor
+        if not redaction.extra_keys and redaction.patterns is None:
+            return get_redactor()
+        return Redactor(extra_keys=redaction.extra_keys, patterns=redaction.patterns)
+    
+    def reconfigure(self, config: 'LogConfig'):
+        """Replace the configuration and rebuild handlers."""
+        if self.parent is not None:
+            self.parent.reconfigure(config)
+            return
+        self.config = config
+        self.tracer.configure(sample_rate=config.trace_sample_rate,
+                              buffer_size=config.trace_buffer_size)
+        self.redactor = self._create_redactor()
+        self.flight_recorder = self._create_flight_recorder()
+        self.error_tracker.window = config.error_window
+        self.error_tracker.max_fingerprints = config.error_max_fingerprints
+        self.error_tracker.redactor = self.redactor
+        for child in self._children:
+            child._inherit(self)
+        self._setup_logger()
+    
+    def _inherit(self, parent: 'Logger'):
+        """Pick up a reconfigured parent's shared state."""
+        self.config = parent.config
+        self.flight_recorder = parent.flight_recorder
+        self.redactor = parent.redactor
+        self._logger.setLevel(logging.NOTSET)
+        for child in self._children:
+            child._inherit(self)
+    
+    def get_child(self, suffix: str) -> 'Logger':
+        """Get the component logger named `<name>.<suffix>`."""
+        return get_logger(f"{self.name}.{suffix}")
+    
+    def configured_level(self) -> Optional[LogLevel]:
+        """Level from configuration; None for components that inherit."""
+        level = self.config.levels.get(self.name)
+        if level is None and self.parent is None:
+            level = self.config.level
+        return level
+    
+    def set_level(self, level: Optional[LogLevel]):
+        """
+        Change this logger's level at runtime.
+        
+        Passing None restores the configured level. Stdlib caches the
+        effective level per logger and clears the cache on change, so
+        `_log` pays nothing for levels that can change.
+        """
+        if level is None:
+            level = self.configured_level()
+        self._logger.setLevel(level.value if level is not None else logging.NOTSET)
+    
+    def get_level(self) -> LogLevel:
+        """Effective level, including levels inherited from parents."""
+        return LogLevel(self._logger.getEffectiveLevel())
+    
+    def set_handler_level(self, handler_type: str, level: Optional[LogLevel]) -> int:
+        """
+        Change the level of this logger's handlers of a type in place.
+        
+        Passing None restores each handler's configured level. Returns the
+        number of handlers changed.
+        """
+        changed = 0
+        for handler in self._logger.handlers:
+            handler_config = getattr(handler, 'config', None)
+            if handler_config is None or handler_config.type != handler_type:
+                continue
+            handler.setLevel((level or handler_config.level).value)
+            changed += 1
+        return changed
+    
+    def get_handler_levels(self) -> Dict[str, str]:
+        """Levels of this logger's handlers, keyed by handler type."""
+        levels = {}
+        for handler in self._logger.handlers:
+            handler_config = getattr(handler, 'config', None)
+            if handler_config is not None:
+                levels[handler_config.type] = logging.getLevelName(handler.level)
+        return levels
+    
     def set_context(self, context: LogContext):
         """Set the current logging context."""
         self._context_stack.append(context)
@@ -128,20 +295,34 @@ class Logger:
         """Get the current logging context."""
         return self._context_stack[-1] if self._context_stack else None
     
-    def _format_message(self, level: LogLevel, message: str, **kwargs) -> str:
+    def _format_message(self, level: LogLevel, message: str, timestamp: str, /, **kwargs) -> str:
         """Format log message with context and extra data."""
         context = self._get_current_context()
         
+        redactor = self.redactor
+        if redactor is not None:
+            message = redactor.redact_text(message)
+            context_dict = redactor.redact_context(context) if context else {}
+            if kwargs:
+                kwargs = redactor.redact_mapping(kwargs)
+        else:
+            context_dict = context.to_dict() if context else {}
+        
         # Build structured log entry
         log_entry = {
-            'timestamp': datetime.utcnow().isoformat(),
+            'timestamp': timestamp,
             'level': level.name,
             'logger': self.name,
             'message': message,
-            'context': context.to_dict() if context else {},
+            'context': context_dict,
             'extra': kwargs
         }
         
+        span = get_current_span()
+        if span is not None:
+            log_entry['trace_id'] = span.trace_id
+            log_entry['span_id'] = span.span_id
+        
         return json.dumps(log_entry) if self.config.json_format else str(log_entry)
     
     def debug(self, message: str, **kwargs):
@@ -166,29 +347,136 @@ class Logger:
     
     def _log(self, level: LogLevel, message: str, **kwargs):
         """Internal logging method."""
-        formatted_message = self._format_message(level, message, **kwargs)
-        self._logger.log(level.value, formatted_message)
+        recorder = self.flight_recorder
+        if recorder is not None:
+            context = self._get_current_context()
+            session_key = self._session_key(context)
+            recorder.record(session_key, level, self.name, message, context, kwargs)
+        
+        if self._logger.isEnabledFor(level.value):
+            # One timestamp per record, shared by the entry and every formatter
+            timestamp = format_timestamp(time.time())
+            formatted_message = self._format_message(level, message, timestamp, **kwargs)
+            self._logger.log(level.value, formatted_message,
+                             extra={'utc_timestamp': timestamp, 'redacted': self.redactor is not None})
+        
+        if recorder is not None and level.value >= recorder.trigger_level:
+            # Queues the records; the recorder's writer thread does the I/O
+            recorder.dump(session_key, reason=level.name.lower())
+    
+    def event(self, name: str, level: LogLevel = LogLevel.INFO, **fields):
+        """
+        Record a high-frequency telemetry event.
+        
+        Events go only to "binary" handlers and skip message formatting and
+        stdlib records entirely. The current context's ids are stored with
+        the event's fields. Events follow the logger's level but not
+        `logging.disable`, so adaptive levels never drop telemetry.
+        """
+        handlers = self._event_handlers
+        if not handlers or level.value < self._logger.getEffectiveLevel():
+            return
+        context = self._context_stack[-1] if self._context_stack else None
+        if context is not None:
+            fields = {'session_id': context.session_id, 'room_id': context.room_id,
+                      'user_id': context.user_id, 'therapist_role': context.therapist_role,
+                      **fields}
+        if self.redactor is not None:
+            fields = self.redactor.redact_mapping(fields)
+        timestamp = time.time()
+        for handler in handlers:
+            if level.value >= handler.level:
+                handler.write_event(self.name, name, level.value, timestamp, fields)
+    
+    @staticmethod
+    def _session_key(context: Optional[LogContext]) -> str:
+        """Key used to group records per session in the flight recorder."""
+        if context is None:
+            return "global"
+        return context.session_id or context.room_id or "global"
+    
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Context manager that records a tracing span around the block."""
+        with self.tracer.span(name, **attributes) as span:
+            yield span
     
     @contextmanager
     def performance_timer(self, operation: str, **kwargs):
         """Context manager for performance timing."""
         start_time = time.time()
         try:
-            yield
+            with self.tracer.span(operation, **kwargs):
+                yield
         finally:
             duration = time.time() - start_time
             self.info(f"Performance: {operation} completed in {duration:.3f}s", 
                      operation=operation, duration=duration, **kwargs)
     
     def log_exception(self, message: str, exc_info: Optional[Exception] = None, **kwargs):
-        """Log exception with full traceback."""
+        """
+        Log an exception, suppressing storms of identical failures.
+        
+        The first occurrence of a fingerprint in each window is logged with
+        its full traceback; occurrences 2, 4, 8, ... are logged as counters
+        and the rest are only counted (see `get_metrics()['errors']`).
+        """
         if exc_info is None:
             exc_info = sys.exc_info()[1]
+        if exc_info is None:
+            self.error(message, **kwargs)
+            return
+        
+        action, stats, summaries = self.error_tracker.observe(exc_info)
+        for summary in summaries:
+            self._log_error_summary(summary)
+        self._root()._schedule_error_summaries()
         
-        self.error(f"{message}: {str(exc_info)}", 
-                  exception_type=type(exc_info).__name__,
-                  traceback=traceback.format_exc(),
-                  **kwargs)
+        if action == FULL:
+            self.error(f"{message}: {str(exc_info)}", 
+                      exception_type=type(exc_info).__name__,
+                      traceback="".join(traceback.format_exception(
+                          type(exc_info), exc_info, exc_info.__traceback__)),
+                      fingerprint=stats.fingerprint,
+                      occurrences=stats.window_count,
+                      **kwargs)
+        elif action == COUNT:
+            self.error(f"{message}: {str(exc_info)} (repeated {stats.window_count}x)",
+                      exception_type=type(exc_info).__name__,
+                      fingerprint=stats.fingerprint,
+                      occurrences=stats.window_count,
+                      suppressed=stats.suppressed,
+                      **kwargs)
+    
+    def _log_error_summary(self, summary: Dict[str, Any]):
+        """Log the occurrence count of an error fingerprint's finished window."""
+        self.warning(f"Error summary: {summary['exception_type']} at {summary['location']} "
+                     f"occurred {summary['occurrences']} times",
+                     **summary)
+    
+    def _schedule_error_summaries(self):
+        """Start the summary timer, which runs once per error window while windows are open."""
+        with self._summary_lock:
+            if self._summary_timer is not None:
+                return
+            timer = threading.Timer(self.error_tracker.window, self._log_ended_error_windows)
+            timer.daemon = True
+            self._summary_timer = timer
+        timer.start()
+
+    def _log_ended_error_windows(self):
+        """Timer callback: log summaries of windows that ended without a later error."""
+        with self._summary_lock:
+            self._summary_timer = None
+        for summary in self.error_tracker.sweep():
+            self._log_error_summary(summary)
+        if self.error_tracker.open_windows():
+            self._schedule_error_summaries()
+
+    def flush_error_summaries(self):
+        """Log summaries for all open error windows with repeats."""
+        for summary in self.error_tracker.flush():
+            self._log_error_summary(summary)
     
     def log_user_interaction(self, interaction_type: str, user_id: str, **kwargs):
         """Log user interaction for analytics."""
@@ -216,25 +504,100 @@ class Logger:
         return {
             'logger_name': self.name,
             'context_stack_size': len(self._context_stack),
-            'current_context': self._get_current_context().to_dict() if self._get_current_context() else None
+            'current_context': self._get_current_context().to_dict() if self._get_current_context() else None,
+            'tracing': self.tracer.get_metrics(),
+            'flight_recorder': self.flight_recorder.get_metrics() if self.flight_recorder else None,
+            'errors': self.error_tracker.get_metrics(),
+            'handlers': [handler.get_metrics() for handler in self._root()._logger.handlers
+                         if hasattr(handler, 'get_metrics')]
         }
+    
+    def _root(self) -> 'Logger':
+        """The logger that owns the handlers."""
+        logger = self
+        while logger.parent is not None:
+            logger = logger.parent
+        return logger
+    
+    def end_session(self, session_id: str):
+        """Release per-session state once a session has finished."""
+        if self.flight_recorder is not None:
+            self.flight_recorder.discard(session_id)
+    
+    def export_traces(self, filename: str, format: str = "chrome") -> str:
+        """Export recorded spans to a file in "chrome" or "otlp" format."""
+        if format == "otlp":
+            return self.tracer.export_otlp_json(filename)
+        return self.tracer.export_chrome_trace(filename)
 
 
 # Global logger instance
 _global_logger: Optional[Logger] = None
 
+# Loggers by name; dotted names below a registered logger are its components
+_loggers: Dict[str, Logger] = {}
+_registry_lock = threading.Lock()
+
 
 def get_logger(name: str = "ai_therapist", config: Optional['LogConfig'] = None) -> Logger:
-    """Get or create a logger instance."""
+    """
+    Get or create a logger instance.
+    
+    Loggers are kept by name. A dotted name below an existing logger (for
+    example "ai_therapist_worker.text_stream") creates a component logger
+    sharing that logger's handlers and context; any other name creates a
+    logger with its own handlers from `config`. The first such logger is
+    also the global logger.
+    """
     global _global_logger
     
-    if _global_logger is None:
-        _global_logger = Logger(name, config)
+    logger = _loggers.get(name)
+    if logger is not None:
+        return logger
     
-    return _global_logger
+    with _registry_lock:
+        logger = _loggers.get(name)
+        if logger is None:
+            parent = _find_parent(name) if config is None else None
+            logger = Logger(name, config, parent=parent)
+            _loggers[name] = logger
+            if _global_logger is None and parent is None:
+                _global_logger = logger
+    return logger
+
+
+def _find_parent(name: str) -> Optional[Logger]:
+    """Find the closest registered ancestor of a dotted logger name."""
+    while "." in name:
+        name = name.rsplit(".", 1)[0]
+        if name in _loggers:
+            return _loggers[name]
+    return None
+
+
+def get_loggers() -> Dict[str, Logger]:
+    """Get a snapshot of all registered loggers."""
+    return dict(_loggers)
+
+
+def set_level(name: str, level: Optional[LogLevel]):
+    """
+    Set the level of a logger by name at runtime.
+    
+    Names that are not registered loggers (such as "livekit.agents") set
+    the stdlib logger directly. Passing None restores the configured level.
+    """
+    logger = _loggers.get(name)
+    if logger is not None:
+        logger.set_level(level)
+        return
+    if level is None and _global_logger is not None:
+        level = _global_logger.config.levels.get(name)
+    logging.getLogger(name).setLevel(level.value if level is not None else logging.NOTSET)
 
 
 def set_global_logger(logger: Logger):
     """Set the global logger instance."""
     global _global_logger
-    _global_logger = logger 
\ No newline at end of file
+    _global_logger = logger
+    _loggers.setdefault(logger.name, logger)
\ No newline at end of file
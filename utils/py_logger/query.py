@@ -0,0 +1,393 @@
+"""
+Indexed search over rotated JSON log files.
+
+The index maps session_id, room_id and user_id values to byte offsets in
+each log file. It is a directory (`<log>.idx/`) holding one sidecar per
+log file, named after the file's inode so that it follows the file across
+rotation. Only bytes appended since the last run are scanned, and only
+the sidecars of files that grew are rewritten, which in practice is the
+active file's.
+
+A sidecar is a JSON header line followed by one JSON line per indexed
+key. The header records where each key's line starts, so a search reads
+the headers and then only the lines of the keys it filters on.
+
+Usage:
+    python -m utils.py_logger.query logs/ai_therapist.log --session-id abc123
+    python -m utils.py_logger.query logs/ai_therapist.log --room-id room1 \\
+        --since 2024-01-15T10:00:00 --until 2024-01-15T11:00:00
+"""
+
+import argparse
+import json
+import mmap
+import os
+import shutil
+import sys
+import time
+import zlib
+from typing import Dict, Any, Optional, List, Iterator, Tuple
+
+from .logfiles import find_log_files, parse_record, parse_timestamp, record_field
+
+
+INDEX_VERSION = 2
+INDEXED_KEYS = ('session_id', 'room_id', 'user_id')
+
+# Number of leading bytes hashed to tell a renamed file from a reused inode
+_HEAD_BYTES = 256
+
+_SIDECAR_SUFFIX = '.json'
+
+
+class LogIndex:
+    """Incremental per-file sidecar index over a log file and its rotated backups."""
+
+    def __init__(self, base_path: str, index_path: Optional[str] = None):
+        self.base_path = base_path
+        self.index_path = index_path or f"{base_path}.idx"
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self):
+        """Read the sidecar headers of the log files on disk; key offsets are read on demand."""
+        if os.path.isfile(self.index_path):
+            os.remove(self.index_path)  # single-file index from INDEX_VERSION 1
+            return
+        for path in find_log_files(self.base_path):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            file_id = _file_id(st)
+            entry = self._read_header(file_id)
+            if entry is not None:
+                entry['path'] = path
+                self._files[file_id] = entry
+
+    def _sidecar_path(self, file_id: str) -> str:
+        return os.path.join(self.index_path, file_id + _SIDECAR_SUFFIX)
+
+    def _read_header(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """Read a sidecar's header line, or None if it is missing, unreadable or outdated."""
+        try:
+            with open(self._sidecar_path(file_id), 'rb') as f:
+                header = json.loads(f.readline())
+                data_start = f.tell()
+        except (OSError, ValueError):
+            return None
+        if not isinstance(header, dict) or header.pop('version', None) != INDEX_VERSION:
+            return None
+        header['data_start'] = data_start
+        header['keys'] = {}
+        return header
+
+    def _load_keys(self, file_id: str, entry: Dict[str, Any], keys) -> None:
+        """Read the offset tables of the given keys from the entry's sidecar."""
+        missing = [key for key in keys if key not in entry['keys']]
+        if not missing:
+            return
+        sections = entry.get('sections')
+        if sections is None:  # not yet saved
+            for key in missing:
+                entry['keys'][key] = {}
+            return
+        with open(self._sidecar_path(file_id), 'rb') as f:
+            for key in missing:
+                offset, length = sections[key]
+                f.seek(entry['data_start'] + offset)
+                entry['keys'][key] = json.loads(f.read(length))
+
+    def _save(self, file_id: str, entry: Dict[str, Any]):
+        """Atomically write one file's sidecar."""
+        sections = {}
+        data = []
+        offset = 0
+        for key in INDEXED_KEYS:
+            line = json.dumps(entry['keys'][key], separators=(',', ':')).encode('utf-8') + b'\n'
+            sections[key] = [offset, len(line)]
+            data.append(line)
+            offset += len(line)
+        header = {'version': INDEX_VERSION, 'head_len': entry['head_len'], 'head_crc': entry['head_crc'],
+                  'indexed_bytes': entry['indexed_bytes'], 'min_time': entry['min_time'],
+                  'max_time': entry['max_time'], 'sections': sections}
+        header_line = json.dumps(header, separators=(',', ':')).encode('utf-8') + b'\n'
+
+        os.makedirs(self.index_path, exist_ok=True)
+        path = self._sidecar_path(file_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(header_line)
+            f.writelines(data)
+        os.replace(tmp_path, path)
+        entry['sections'] = sections
+        entry['data_start'] = len(header_line)
+
+    def update(self) -> Dict[str, int]:
+        """
+        Bring the index up to date with the files on disk.
+
+        Returns counts of files and bytes scanned during this update.
+        """
+        seen: Dict[str, Dict[str, Any]] = {}
+        stats = {'files': 0, 'bytes_scanned': 0}
+
+        for path in find_log_files(self.base_path):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            file_id = _file_id(st)
+            entry = self._files.get(file_id)
+            if entry is None:
+                entry = self._read_header(file_id)
+
+            changed = entry is None or not self._same_file(path, entry, st.st_size)
+            if changed:
+                entry = {'head_len': 0, 'head_crc': 0, 'indexed_bytes': 0,
+                         'min_time': None, 'max_time': None,
+                         'keys': {key: {} for key in INDEXED_KEYS}}
+
+            entry['path'] = path
+            if st.st_size > entry['indexed_bytes']:
+                self._load_keys(file_id, entry, INDEXED_KEYS)
+                scanned = self._scan(path, entry)
+                changed = changed or scanned > 0
+                stats['bytes_scanned'] += scanned
+                stats['files'] += 1
+            if changed:
+                self._save(file_id, entry)
+            seen[file_id] = entry
+
+        self._files = seen
+        self._remove_stale_sidecars()
+        return stats
+
+    def _remove_stale_sidecars(self):
+        """Delete the sidecars of log files that no longer exist."""
+        try:
+            names = os.listdir(self.index_path)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith(_SIDECAR_SUFFIX) and name[:-len(_SIDECAR_SUFFIX)] not in self._files:
+                try:
+                    os.remove(os.path.join(self.index_path, name))
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _same_file(path: str, entry: Dict[str, Any], size: int) -> bool:
+        """Check that an indexed inode still holds the same content."""
+        if size < entry['indexed_bytes']:
+            return False
+        if entry['head_len'] == 0:
+            return True
+        with open(path, 'rb') as f:
+            head = f.read(entry['head_len'])
+        return len(head) == entry['head_len'] and zlib.crc32(head) == entry['head_crc']
+
+    @staticmethod
+    def _scan(path: str, entry: Dict[str, Any]) -> int:
+        """Index complete lines appended since the last scan."""
+        start = entry['indexed_bytes']
+        keys = entry['keys']
+
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = mm.rfind(b'\n', start) + 1
+            if end <= start:
+                return 0
+
+            if entry['head_len'] == 0:
+                head_len = min(_HEAD_BYTES, end)
+                entry['head_len'] = head_len
+                entry['head_crc'] = zlib.crc32(mm[:head_len])
+
+            offset = start
+            while offset < end:
+                newline = mm.find(b'\n', offset, end)
+                record = parse_record(mm[offset:newline])
+                if record is not None:
+                    for key in INDEXED_KEYS:
+                        value = record_field(record, key)
+                        if value is not None:
+                            keys[key].setdefault(str(value), []).append(offset)
+                    when = record['time']
+                    if when is not None:
+                        if entry['min_time'] is None or when < entry['min_time']:
+                            entry['min_time'] = when
+                        if entry['max_time'] is None or when > entry['max_time']:
+                            entry['max_time'] = when
+                offset = newline + 1
+
+        entry['indexed_bytes'] = end
+        return end - start
+
+    def search(self, session_id: Optional[str] = None, room_id: Optional[str] = None,
+               user_id: Optional[str] = None, since: Optional[float] = None,
+               until: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield matching records, oldest file first.
+
+        Key filters are combined with AND; with no key filter every record
+        in files overlapping the time range is returned.
+        """
+        filters = {key: value for key, value in
+                   (('session_id', session_id), ('room_id', room_id), ('user_id', user_id))
+                   if value is not None}
+
+        for file_id, entry in sorted(self._files.items(), key=lambda item: _file_order(item[1])):
+            if not _overlaps(entry, since, until):
+                continue
+
+            self._load_keys(file_id, entry, filters)
+            offsets = self._matching_offsets(entry, filters)
+            if offsets is not None and not offsets:
+                continue
+
+            for raw, record in _read_records(entry['path'], offsets, entry['indexed_bytes']):
+                when = record['time']
+                if since is not None and (when is None or when < since):
+                    continue
+                if until is not None and (when is None or when > until):
+                    continue
+                record['raw'] = raw
+                yield record
+
+    @staticmethod
+    def _matching_offsets(entry: Dict[str, Any], filters: Dict[str, str]) -> Optional[List[int]]:
+        """Intersect the offset lists of all key filters (None means all lines)."""
+        if not filters:
+            return None
+        result = None
+        for key, value in filters.items():
+            offsets = entry['keys'][key].get(str(value), [])
+            result = set(offsets) if result is None else result & set(offsets)
+        return sorted(result)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get statistics about the index."""
+        for file_id, entry in self._files.items():
+            self._load_keys(file_id, entry, INDEXED_KEYS)
+        return {
+            'files': len(self._files),
+            'indexed_bytes': sum(entry['indexed_bytes'] for entry in self._files.values()),
+            'keys': {key: len({value for entry in self._files.values() for value in entry['keys'][key]})
+                     for key in INDEXED_KEYS}
+        }
+
+
+def _file_id(st: os.stat_result) -> str:
+    """Identify a log file by device and inode, which survive rotation renames."""
+    return f"{st.st_dev}-{st.st_ino}"
+
+
+def _file_order(entry: Dict[str, Any]) -> Tuple[float, str]:
+    """Sort files chronologically by their first indexed record."""
+    return (entry['min_time'] if entry['min_time'] is not None else float('inf'), entry['path'])
+
+
+def _overlaps(entry: Dict[str, Any], since: Optional[float], until: Optional[float]) -> bool:
+    """Check whether a file's time span can contain records in the range."""
+    if entry['min_time'] is None:
+        return since is None and until is None
+    if since is not None and entry['max_time'] < since:
+        return False
+    if until is not None and entry['min_time'] > until:
+        return False
+    return True
+
+
+def _read_records(path: str, offsets: Optional[List[int]], limit: int) -> Iterator[Tuple[bytes, Dict[str, Any]]]:
+    """Read records at the given offsets (or every line) through mmap."""
+    if limit == 0:
+        return
+    try:
+        f = open(path, 'rb')
+    except OSError:
+        return
+    with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if offsets is None:
+            offsets = _line_offsets(mm, limit)
+        for offset in offsets:
+            newline = mm.find(b'\n', offset, limit)
+            raw = mm[offset:newline if newline != -1 else limit]
+            record = parse_record(raw)
+            if record is not None:
+                yield raw, record
+
+
+def _line_offsets(mm: mmap.mmap, limit: int) -> Iterator[int]:
+    """Yield the start offset of every line before `limit`."""
+    offset = 0
+    while offset < limit:
+        yield offset
+        newline = mm.find(b'\n', offset, limit)
+        if newline == -1:
+            break
+        offset = newline + 1
+
+
+def _parse_time_arg(value: str) -> float:
+    """argparse type for ISO timestamps or epoch seconds."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parsed = parse_timestamp(value)
+    if parsed is None:
+        raise argparse.ArgumentTypeError(f"invalid timestamp: {value}")
+    return parsed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Search rotated JSON logs by session, room or user.")
+    parser.add_argument("log_file", help="Base log file, e.g. logs/ai_therapist.log")
+    parser.add_argument("--session-id")
+    parser.add_argument("--room-id")
+    parser.add_argument("--user-id")
+    parser.add_argument("--since", type=_parse_time_arg, help="ISO timestamp (UTC if naive) or epoch seconds")
+    parser.add_argument("--until", type=_parse_time_arg, help="ISO timestamp (UTC if naive) or epoch seconds")
+    parser.add_argument("--format", choices=("raw", "json", "text"), default="raw",
+                        help="raw log lines, flattened JSON records or one-line text")
+    parser.add_argument("--rebuild", action="store_true", help="Discard the index and rebuild it")
+    parser.add_argument("--stats", action="store_true", help="Print index timings to stderr")
+    args = parser.parse_args(argv)
+
+    index_path = f"{args.log_file}.idx"
+    if args.rebuild:
+        if os.path.isdir(index_path):
+            shutil.rmtree(index_path)
+        elif os.path.exists(index_path):
+            os.remove(index_path)
+
+    started = time.perf_counter()
+    index = LogIndex(args.log_file)
+    update_stats = index.update()
+    indexed = time.perf_counter()
+
+    count = 0
+    out = sys.stdout
+    for record in index.search(session_id=args.session_id, room_id=args.room_id,
+                               user_id=args.user_id, since=args.since, until=args.until):
+        raw = record.pop('raw')
+        if args.format == "raw":
+            out.write(raw.decode('utf-8', errors='replace') + "\n")
+        elif args.format == "json":
+            out.write(json.dumps(record, default=str) + "\n")
+        else:
+            out.write(f"{record['timestamp']} {record['level']} {record['message']}\n")
+        count += 1
+
+    if args.stats:
+        finished = time.perf_counter()
+        print(f"index update: {(indexed - started) * 1000:.1f}ms "
+              f"({update_stats['files']} files, {update_stats['bytes_scanned']} bytes scanned); "
+              f"search: {(finished - indexed) * 1000:.1f}ms; {count} records",
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
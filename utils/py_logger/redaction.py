@@ -0,0 +1,244 @@
+"""
+PII and secret redaction shared by the logger, every handler and the
+flight recorder.
+
+Two checks run on structured data:
+
+- keys: a key is normalized to snake case ("authToken" -> "auth_token",
+  "LIVEKIT_API_SECRET" -> "livekit_api_secret"). It is sensitive if the
+  whole key is a bare credential name ("token", "key", "pin") or it ends
+  with a sensitive suffix ("password", "secret", "api_key",
+  "access_token"). Telemetry keys such as `first_token` or `key_count`
+  are not. Only string and bytes values of sensitive keys are masked;
+  numbers, booleans and containers are kept (containers are still
+  scanned). Decisions are cached per key, so each distinct key is
+  tokenized once.
+- values: each value pattern (emails, phone numbers, bearer tokens, JWTs,
+  provider API keys) has literal "gates" that any match must contain,
+  such as "@" for emails. Gates are checked with plain substring tests;
+  the patterns whose gates pass are then run as one compiled alternation
+  (compiled once per combination). Digits are in most records, so a phone
+  number also needs its shape: "+" and a digit, or three digits, a
+  separator and four digits, found with substring tests on a copy of the
+  string whose digits and separators are translated to one of each. Most
+  strings pass no gate and are never regex-scanned. Results for short strings, which repeat a lot
+  (ids, roles, tool names), are cached.
+
+Redacted context dicts are cached by the context's current values, so a
+session's context is scanned once rather than on every record, and a
+context that has been changed since is scanned again.
+"""
+
+import logging
+import re
+from typing import Dict, Any, Optional, Iterable, Tuple
+
+
+REDACTED = "[REDACTED]"
+
+# Sensitive only as the whole normalized key
+SENSITIVE_KEYS = frozenset({"token", "key", "auth", "pin", "bearer", "otp"})
+
+# Sensitive as the whole normalized key or its last one or two parts
+SENSITIVE_KEY_SUFFIXES = frozenset({
+    "password", "passwd", "pwd", "passphrase", "secret", "authorization",
+    "credential", "credentials", "cookie", "apikey", "jwt", "ssn", "signature",
+    "api_key", "access_key", "secret_key", "private_key", "signing_key",
+    "access_token", "refresh_token", "auth_token", "id_token", "session_token",
+    "bearer_token", "api_token", "pin_code",
+})
+
+# (name, regex); each group name becomes the placeholder tag
+VALUE_PATTERNS = (
+    ("email", r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}"),
+    ("jwt", r"\beyJ[A-Za-z0-9_-]{5,}\.[A-Za-z0-9_-]{5,}\.[A-Za-z0-9_-]{5,}"),
+    ("bearer", r"(?i:\bbearer\s+)[A-Za-z0-9._~+/-]{8,}=*"),
+    ("api_key", r"\b(?:sk-[A-Za-z0-9_-]{16,}|(?:AKIA|ASIA)[A-Z0-9]{16}"
+                r"|gh[pousr]_[A-Za-z0-9]{30,}|xox[abprs]-[A-Za-z0-9-]{10,}|AIza[A-Za-z0-9_-]{35})"),
+    # International numbers need a "+"; national ones need separators, so
+    # bare 10-digit numbers such as epoch seconds are left alone. ASCII
+    # digits and whitespace only, as `_phone_shaped` assumes
+    ("phone", r"(?a:(?<![\w.+-])(?:\+\d{1,3}[\s.-]?(?:\(\d{3}\)\s?|\d{3}[\s.-]?)\d{3}[\s.-]?\d{4}"
+              r"|(?:\(\d{3}\)\s?|\d{3}[\s.-])\d{3}[\s.-]\d{4})(?![\w-]))"),
+)
+
+# Substrings of which every match of a pattern contains at least one
+_PATTERN_GATES = {
+    "email": ("@",),
+    "jwt": ("eyJ",),
+    "bearer": ("earer", "EARER"),
+    "api_key": ("sk-", "AKIA", "ASIA", "ghp_", "gho_", "ghu_", "ghs_", "ghr_", "xox", "AIza"),
+    "phone": tuple("0123456789"),
+}
+
+# Digits to "0", whitespace to " " and "." to "-"
+_PHONE_SHAPE = str.maketrans({**dict.fromkeys("0123456789", "0"), **dict.fromkeys(" \t\n\r\f\v", " "), ".": "-"})
+
+
+def _phone_shaped(text: str) -> bool:
+    """Whether the text has "+<digit>" or "<3 digits><separator><4 digits>", as every phone match does."""
+    shape = text.translate(_PHONE_SHAPE)
+    return "+0" in shape or "000-0000" in shape or "000 0000" in shape
+
+
+# Checks run after a pattern's gate passes; the pattern runs only if they pass too
+_PATTERN_CHECKS = {
+    "phone": _phone_shaped,
+}
+
+_KEY_TOKENS = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+
+# Strings up to this length have their redacted form cached
+_CACHED_VALUE_LENGTH = 128
+_CACHE_SIZE = 4096
+
+
+class Redactor:
+    """Redacts sensitive keys and PII patterns from log data."""
+
+    def __init__(self, extra_keys: Iterable[str] = (), patterns: Optional[Iterable[str]] = None):
+        self.key_suffixes = SENSITIVE_KEY_SUFFIXES | {key.lower() for key in extra_keys}
+        names = set(patterns) if patterns is not None else None
+        self._selected = [(name, regex) for name, regex in VALUE_PATTERNS if names is None or name in names]
+        self._gates = [(1 << i, _PATTERN_GATES[name], _PATTERN_CHECKS.get(name))
+                       for i, (name, _) in enumerate(self._selected)]
+        self._compiled: Dict[int, 're.Pattern'] = {}
+        self._keys: Dict[str, bool] = {}
+        self._values: Dict[str, str] = {}
+        self._contexts: Dict[Tuple, Dict[str, Any]] = {}
+
+    def is_sensitive_key(self, key: str) -> bool:
+        """Check a key against the sensitive names and suffixes (cached)."""
+        sensitive = self._keys.get(key)
+        if sensitive is None:
+            tokens = [token.lower() for token in _KEY_TOKENS.findall(key)]
+            normalized = "_".join(tokens)
+            sensitive = (normalized in SENSITIVE_KEYS
+                         or "".join(tokens) in self.key_suffixes
+                         or "_".join(tokens[-2:]) in self.key_suffixes
+                         or bool(tokens) and tokens[-1] in self.key_suffixes)
+            if len(self._keys) >= _CACHE_SIZE:
+                self._keys.clear()
+            self._keys[key] = sensitive
+        return sensitive
+
+    @staticmethod
+    def _placeholder(match: 're.Match') -> str:
+        """Replacement naming the pattern that matched."""
+        return f"[REDACTED:{match.lastgroup}]"
+
+    def _scan(self, text: str) -> str:
+        """Run the patterns whose gates occur in the text."""
+        active = 0
+        for bit, literals, check in self._gates:
+            for literal in literals:
+                if literal in text:
+                    if check is None or check(text):
+                        active |= bit
+                    break
+        if not active:
+            return text
+        pattern = self._compiled.get(active)
+        if pattern is None:
+            pattern = re.compile("|".join(f"(?P<{name}>{regex})" for i, (name, regex)
+                                          in enumerate(self._selected) if active & (1 << i)))
+            self._compiled[active] = pattern
+        return pattern.sub(self._placeholder, text)
+    
+    def redact_text(self, text: str) -> str:
+        """Replace PII and secrets found in a string."""
+        if len(text) > _CACHED_VALUE_LENGTH:
+            return self._scan(text)
+        redacted = self._values.get(text)
+        if redacted is None:
+            redacted = self._scan(text)
+            if len(self._values) >= _CACHE_SIZE:
+                self._values.clear()
+            self._values[text] = redacted
+        return redacted
+
+    def redact_value(self, value: Any) -> Any:
+        """Redact a string or, recursively, the contents of a container."""
+        kind = type(value)
+        if kind is str:
+            return self.redact_text(value)
+        if kind is dict:
+            return self.redact_mapping(value)
+        if kind is list or kind is tuple:
+            return [self.redact_value(item) for item in value]
+        return value
+
+    def redact_mapping(self, mapping: Dict[str, Any]) -> Dict[str, Any]:
+        """Redact a dict: string values of sensitive keys are masked, other values scanned."""
+        redacted = {}
+        for key, value in mapping.items():
+            if type(key) is str and isinstance(value, (str, bytes)) and self.is_sensitive_key(key):
+                redacted[key] = REDACTED
+            else:
+                redacted[key] = self.redact_value(value)
+        return redacted
+
+    def redact_context(self, context) -> Dict[str, Any]:
+        """Redacted `context.to_dict()`, cached by the context's current values."""
+        metadata = context.metadata
+        try:
+            key = (context.user_id, context.session_id, context.room_id, context.therapist_role,
+                   context.request_id, context.correlation_id, _freeze(metadata) if metadata else None)
+            cached = self._contexts.get(key)
+        except TypeError:  # unhashable metadata
+            return self.redact_mapping(context.to_dict())
+        if cached is None:
+            cached = self.redact_mapping(context.to_dict())
+            if len(self._contexts) >= _CACHE_SIZE:
+                self._contexts.clear()
+            self._contexts[key] = cached
+        return cached
+
+
+def _freeze(value: Any) -> Any:
+    """Hashable form of a context value; types are kept so 1 and True differ."""
+    kind = type(value)
+    if kind is dict:
+        return kind, tuple((key, _freeze(item)) for key, item in value.items())
+    if kind is list or kind is tuple:
+        return kind, tuple(_freeze(item) for item in value)
+    return kind, value
+
+
+class RedactionFilter(logging.Filter):
+    """
+    Handler filter redacting records that did not come through `Logger`.
+
+    Records from `Logger` are redacted before they are serialized and are
+    marked with a `redacted` attribute, so they pass through untouched.
+    """
+
+    def __init__(self, redactor: Redactor):
+        super().__init__()
+        self.redactor = redactor
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        attributes = record.__dict__
+        if attributes.get('redacted'):
+            return True
+        redactor = self.redactor
+        if isinstance(record.msg, str):
+            record.msg = redactor.redact_text(record.getMessage())
+            record.args = None
+        for name in ('context', 'extra'):
+            value = attributes.get(name)
+            if type(value) is dict:
+                attributes[name] = redactor.redact_mapping(value)
+        record.redacted = True
+        return True
+
+
+_default_redactor: Optional[Redactor] = None
+
+
+def get_redactor() -> Redactor:
+    """Shared redactor with the default keys and patterns."""
+    global _default_redactor
+    if _default_redactor is None:
+        _default_redactor = Redactor()
+    return _default_redactor
@@ -0,0 +1,384 @@
+"""
+Batched log shipping to an HTTP collector.
+
+`ShippingHandler` gets formatted records off the box without a sidecar
+tailing files. `emit` formats the record and appends it to an in-memory
+queue, nothing more, so logging from the event loop never waits on the
+network or the disk. A background thread:
+
+- takes up to `batch_size` records from the queue every `flush_interval`
+  seconds, or as soon as a full batch is waiting
+- gzips them as one newline-delimited body and POSTs it to `url`
+- retries a failed batch with exponential backoff (with jitter)
+- after `max_retries` failed attempts, treats the endpoint as
+  unavailable: the batch and every following batch are written to a
+  bounded spool directory, and only the oldest spooled batch is retried
+  after each backoff delay
+- once a delivery succeeds again, replays the spool, oldest first
+
+The spool holds compressed request bodies, one file per batch. When it
+would grow past `max_spool_bytes`, the oldest batches are dropped. Spool
+files of processes that have exited are replayed as well.
+
+Usage:
+    HandlerConfig(type="shipping", formatter="json",
+                  config={"url": "http://127.0.0.1:8428/ingest"})
+
+or export PY_LOGGER_SHIP_URL, which adds a shipping handler to every
+preset returned by `get_config`.
+"""
+
+import glob
+import gzip
+import logging
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from typing import Dict, Any, Optional, List, Tuple
+
+from .collector import _pid_alive
+from .config import HandlerConfig
+from .formatters import JSONFormatter, StructuredFormatter, StandardFormatter
+
+
+SHIP_URL_ENV = "PY_LOGGER_SHIP_URL"
+
+# Latency samples kept for percentiles
+_LATENCY_SAMPLES = 256
+
+
+def _percentile(samples: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of unsorted samples."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class ShippingHandler(logging.Handler):
+    """Handler that ships batches of formatted records to an HTTP endpoint."""
+
+    def __init__(self, config: HandlerConfig):
+        super().__init__()
+        self.config = config
+        self.setLevel(config.level.value)
+        self.setFormatter(self._get_formatter())
+        options = config.config
+        self.url = options.get("url") or os.environ.get(SHIP_URL_ENV)
+        if not self.url:
+            raise ValueError("shipping handler needs a url")
+        self.headers = dict(options.get("headers", {}))
+        self.batch_size = options.get("batch_size", 500)
+        self.flush_interval = options.get("flush_interval", 1.0)
+        self.max_queue = options.get("max_queue", 20000)
+        self.timeout = options.get("timeout", 5.0)
+        self.max_retries = options.get("max_retries", 3)
+        self.backoff_base = options.get("backoff_base", 0.5)
+        self.backoff_max = options.get("backoff_max", 30.0)
+        self.spool_dir = options.get("spool_dir", "logs/ship_spool")
+        self.max_spool_bytes = options.get("max_spool_bytes", 100 * 1024 * 1024)
+        self.compresslevel = options.get("compresslevel", 6)
+        self._closed = False
+        self._reset()
+
+    def _get_formatter(self):
+        """Get the appropriate formatter for this handler."""
+        if self.config.formatter == "structured":
+            return StructuredFormatter()
+        elif self.config.formatter == "standard":
+            return StandardFormatter()
+        else:
+            return JSONFormatter()
+
+    def _reset(self):
+        """Initialize per-process state (also used after a fork)."""
+        self._pid = os.getpid()
+        self._queue: deque = deque()
+        self._wake = threading.Event()
+        self._idle = threading.Condition()
+        self._busy = False
+        self._sender: Optional[threading.Thread] = None
+        self._pending: Optional[Tuple[bytes, int, float]] = None
+        self._failures = 0
+        self._retry_at = 0.0
+        self._spool_seq = 0
+        self._spool_files: deque = deque()
+        self._spool_bytes = 0
+        self._spool_records = 0
+        self._spool_scanned = False
+        self._request_latencies: deque = deque(maxlen=_LATENCY_SAMPLES)
+        self._delivery_latencies: deque = deque(maxlen=_LATENCY_SAMPLES)
+        self.stats = {
+            'records': 0, 'shipped_records': 0, 'batches': 0, 'raw_bytes': 0, 'sent_bytes': 0,
+            'failed_requests': 0, 'rejected_records': 0, 'dropped_records': 0,
+            'spooled_records': 0, 'spool_dropped_records': 0, 'last_batch_records': 0
+        }
+
+    def emit(self, record):
+        """Queue a formatted record for the sender thread without blocking."""
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        if os.getpid() != self._pid:
+            self._reset()
+        if self._sender is None:
+            self._start_sender()
+
+        queue = self._queue
+        if len(queue) >= self.max_queue:
+            self.stats['dropped_records'] += 1
+            return
+        queue.append((time.monotonic(), line))
+        self.stats['records'] += 1
+        if len(queue) == self.batch_size:
+            self._wake.set()
+
+    def _start_sender(self):
+        """Start the background sender thread."""
+        self._sender = threading.Thread(target=self._run, name="py_logger-shipping", daemon=True)
+        self._sender.start()
+
+    def _run(self):
+        """Ship batches until the handler is closed."""
+        pid = self._pid
+        while os.getpid() == pid:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            closing = self._closed
+            with self._idle:
+                self._busy = True
+            try:
+                self._ship(final=closing)
+            except Exception as e:
+                print(f"Log shipping failed: {e}")
+            finally:
+                with self._idle:
+                    self._busy = False
+                    self._idle.notify_all()
+            if closing:
+                return
+
+    def _ship(self, final: bool = False):
+        """
+        Deliver spooled and queued batches while the endpoint accepts them.
+
+        With `final`, backoff delays are ignored once and whatever cannot
+        be delivered is spooled.
+        """
+        if not self._spool_scanned:
+            self._scan_spool()
+        if final:
+            self._retry_at = 0.0
+
+        if self._spool_files and time.monotonic() >= self._retry_at:
+            self._replay_spool()
+
+        while True:
+            if self._pending is None:
+                self._pending = self._take_batch()
+                if self._pending is None:
+                    return
+            if time.monotonic() < self._retry_at:
+                if final or self._failures >= self.max_retries:
+                    self._spool(self._pending)
+                    self._pending = None
+                    continue
+                return
+            if self._post(self._pending):
+                self._pending = None
+            elif self._failures >= self.max_retries or final:
+                self._spool(self._pending)
+                self._pending = None
+
+    def _take_batch(self) -> Optional[Tuple[bytes, int, float]]:
+        """Compress up to `batch_size` queued records; returns (body, records, oldest enqueue time)."""
+        queue = self._queue
+        if not queue:
+            return None
+        count = min(len(queue), self.batch_size)
+        entries = [queue.popleft() for _ in range(count)]
+        raw = "\n".join(line for _, line in entries).encode("utf-8") + b"\n"
+        self.stats['raw_bytes'] += len(raw)
+        return gzip.compress(raw, compresslevel=self.compresslevel), count, entries[0][0]
+
+    def _post(self, batch: Tuple[bytes, int, float]) -> bool:
+        """POST one batch; on failure schedule the next attempt."""
+        body, count, enqueued = batch
+        request = urllib.request.Request(self.url, data=body, method="POST", headers={
+            'Content-Type': 'application/x-ndjson',
+            'Content-Encoding': 'gzip',
+            **self.headers
+        })
+        start = time.monotonic()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            if 400 <= e.code < 500 and e.code not in (408, 429):
+                # The collector refused the payload; resending it cannot help
+                self.stats['rejected_records'] += count
+                self._record_delivery(start, enqueued)
+                return True
+            self._record_failure()
+            return False
+        except (OSError, ValueError):
+            self._record_failure()
+            return False
+
+        self._record_delivery(start, enqueued)
+        self.stats['shipped_records'] += count
+        self.stats['batches'] += 1
+        self.stats['sent_bytes'] += len(body)
+        self.stats['last_batch_records'] = count
+        return True
+
+    def _record_delivery(self, start: float, enqueued: float):
+        """Reset the backoff and record latencies after a completed request."""
+        now = time.monotonic()
+        self._request_latencies.append(now - start)
+        self._delivery_latencies.append(now - enqueued)
+        self._failures = 0
+        self._retry_at = 0.0
+
+    def _record_failure(self):
+        """Schedule the next attempt with exponential backoff and jitter."""
+        self.stats['failed_requests'] += 1
+        delay = min(self.backoff_max, self.backoff_base * (2 ** self._failures))
+        self._failures += 1
+        self._retry_at = time.monotonic() + delay * random.uniform(0.5, 1.0)
+
+    def _scan_spool(self):
+        """Adopt spool files of this process and of processes that have exited."""
+        self._spool_scanned = True
+        files = []
+        for path in glob.glob(os.path.join(self.spool_dir, "*.ndjson.gz")):
+            try:
+                pid, seq, count = os.path.basename(path).split(".")[0].split("-")
+                if int(pid) != self._pid:
+                    if _pid_alive(int(pid)):
+                        continue
+                    # Claim the file so that no other process replays it too
+                    claimed = os.path.join(self.spool_dir, f"{self._pid}-{pid}{seq}-{count}.ndjson.gz")
+                    os.rename(path, claimed)
+                    path = claimed
+                files.append((os.path.getmtime(path), path, int(count), os.path.getsize(path)))
+            except (ValueError, OSError):
+                continue
+        for _, path, count, size in sorted(files):
+            self._spool_files.append((path, count, size))
+            self._spool_bytes += size
+            self._spool_records += count
+
+    def _spool(self, batch: Tuple[bytes, int, float]):
+        """Write a batch to the spool, dropping the oldest batches beyond the bound."""
+        body, count, _ = batch
+        if len(body) > self.max_spool_bytes:
+            self.stats['spool_dropped_records'] += count
+            return
+        while self._spool_files and self._spool_bytes + len(body) > self.max_spool_bytes:
+            path, dropped, size = self._spool_files.popleft()
+            self._remove_spooled(path, dropped, size)
+            self.stats['spool_dropped_records'] += dropped
+
+        self._spool_seq += 1
+        path = os.path.join(self.spool_dir, f"{self._pid}-{self._spool_seq:08d}-{count}.ndjson.gz")
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(body)
+        except OSError:
+            self.stats['spool_dropped_records'] += count
+            return
+        self._spool_files.append((path, count, len(body)))
+        self._spool_bytes += len(body)
+        self._spool_records += count
+        self.stats['spooled_records'] += count
+
+    def _replay_spool(self):
+        """Send spooled batches oldest first, stopping at the first failure."""
+        while self._spool_files:
+            path, count, size = self._spool_files[0]
+            try:
+                with open(path, 'rb') as f:
+                    body = f.read()
+            except OSError:
+                self._spool_files.popleft()
+                self._remove_spooled(path, count, size)
+                continue
+            if not self._post((body, count, os.path.getmtime(path) - time.time() + time.monotonic())):
+                return
+            self._spool_files.popleft()
+            self._remove_spooled(path, count, size)
+
+    def _remove_spooled(self, path: str, count: int, size: int):
+        """Delete a spool file and update the spool depth."""
+        self._spool_bytes -= size
+        self._spool_records -= count
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def flush(self, timeout: float = 5.0):
+        """Wake the sender and wait until it has handled everything queued so far."""
+        if self._sender is None or os.getpid() != self._pid:
+            return
+        deadline = time.monotonic() + timeout
+        with self._idle:
+            while time.monotonic() < deadline and (self._queue or self._busy):
+                self._wake.set()
+                self._idle.wait(min(0.05, max(0.0, deadline - time.monotonic())))
+
+    def close(self):
+        """Ship or spool everything queued, then stop the sender."""
+        if not self._closed:
+            self._closed = True
+            if self._sender is not None and os.getpid() == self._pid:
+                self._wake.set()
+                self._sender.join(self.timeout * 2)
+        super().close()
+
+    def get_queue_depth(self) -> int:
+        """Records waiting to be shipped."""
+        return len(self._queue)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get batch, latency and spool depth metrics."""
+        stats = self.stats
+        request = list(self._request_latencies)
+        delivery = list(self._delivery_latencies)
+        return {
+            'type': 'shipping',
+            'url': self.url,
+            **stats,
+            'queue_depth': len(self._queue),
+            'avg_batch_records': stats['shipped_records'] / stats['batches'] if stats['batches'] else 0.0,
+            'compression_ratio': stats['raw_bytes'] / stats['sent_bytes'] if stats['sent_bytes'] else None,
+            'request_latency_p50': _percentile(request, 0.5),
+            'request_latency_p99': _percentile(request, 0.99),
+            'delivery_latency_p50': _percentile(delivery, 0.5),
+            'delivery_latency_p99': _percentile(delivery, 0.99),
+            'spool_batches': len(self._spool_files),
+            'spool_records': self._spool_records,
+            'spool_bytes': self._spool_bytes,
+            'endpoint_available': self._failures < self.max_retries
+        }
+
+
+def use_shipping(config: 'LogConfig', url: str) -> 'LogConfig':
+    """Add a JSON shipping handler for `url` to a config."""
+    from dataclasses import replace
+    from .logger import LogLevel
+
+    if any(h.type == "shipping" for h in config.handlers):
+        return config
+    handlers = list(config.handlers)
+    handlers.append(HandlerConfig(type="shipping", level=LogLevel.INFO, formatter="json",
+                                  config={"url": url}))
+    return replace(config, handlers=handlers)
@@ -0,0 +1,826 @@
+"""
+Tests for the logging system.
+"""
+
+import asyncio
+import gzip
+import io
+import itertools
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the parent directory to the path so we can import the logger
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from py_logger import Logger, LogConfig, LogContext, LogLevel, Tracer, get_logger
+from py_logger.config import HandlerConfig, FlightRecorderConfig, AdaptiveLevelConfig
+from py_logger.flight_recorder import FlightRecorder
+from py_logger.query import LogIndex
+from py_logger.analytics import LogAnalyzer, QuantileSketch
+from py_logger.collector import LogCollector
+from py_logger.handlers import FileHandler
+from py_logger.control import LevelController, main as control_main, send_command
+from py_logger.binary import BinaryEventReader, convert_to_json_lines
+from py_logger.logfiles import parse_record
+from py_logger.adaptive import AdaptiveLevelController, EventLoopLagMonitor
+from py_logger.redaction import REDACTED, Redactor
+
+
+def _make_logger(name: str, **config_kwargs) -> Logger:
+    """Create a logger whose only handler is a quiet console handler."""
+    config = LogConfig(
+        handlers=[HandlerConfig(type="console", level=LogLevel.CRITICAL)],
+        **config_kwargs
+    )
+    return Logger(name, config)
+
+
+def test_nested_spans_share_trace():
+    """Child spans inherit the trace and point at their parent."""
+    tracer = Tracer()
+
+    with tracer.span("turn") as root:
+        with tracer.span("generate_reply") as child:
+            pass
+
+    spans = {span.name: span for span in tracer.get_spans()}
+    assert spans["generate_reply"].trace_id == root.trace_id
+    assert spans["generate_reply"].parent_id == root.span_id
+    assert spans["turn"].parent_id is None
+    assert child.duration <= root.duration
+
+
+def test_spans_propagate_across_tasks():
+    """Spans opened in child tasks are parented to the span that spawned them."""
+    tracer = Tracer()
+
+    async def stage(name):
+        with tracer.span(name):
+            await asyncio.sleep(0)
+
+    async def main():
+        with tracer.span("startup") as root:
+            await asyncio.gather(stage("connect"), stage("render_prompt"))
+        return root
+
+    root = asyncio.run(main())
+    children = [span for span in tracer.get_spans() if span.parent_id == root.span_id]
+    assert sorted(span.name for span in children) == ["connect", "render_prompt"]
+    assert len({span.track for span in children}) == 2
+
+
+def test_unsampled_traces_record_nothing():
+    """A zero sample rate drops the whole trace, children included."""
+    tracer = Tracer(sample_rate=0.0)
+
+    with tracer.span("turn") as root:
+        with tracer.span("speak") as child:
+            pass
+
+    assert root is None and child is None
+    assert tracer.get_spans() == []
+
+
+def test_ring_buffer_is_bounded():
+    """Old spans are evicted once the buffer is full."""
+    tracer = Tracer(buffer_size=4)
+
+    for i in range(10):
+        with tracer.span(f"op-{i}"):
+            pass
+
+    assert [span.name for span in tracer.get_spans()] == ["op-6", "op-7", "op-8", "op-9"]
+    assert tracer.get_metrics()["dropped_spans"] == 6
+
+
+def test_trace_export_formats():
+    """Chrome and OTLP exports contain every recorded span."""
+    logger = _make_logger("test_trace_export")
+
+    with logger.span("turn", role="sleep"):
+        with logger.performance_timer("generate_reply"):
+            pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        chrome_path = logger.export_traces(os.path.join(tmp, "trace.json"))
+        otlp_path = logger.export_traces(os.path.join(tmp, "trace.otlp.json"), format="otlp")
+
+        with open(chrome_path) as f:
+            chrome = json.load(f)
+        with open(otlp_path) as f:
+            otlp = json.load(f)
+
+    complete = [event for event in chrome["traceEvents"] if event["ph"] == "X"]
+    assert sorted(event["name"] for event in complete) == ["generate_reply", "turn"]
+
+    spans = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    by_name = {span["name"]: span for span in spans}
+    assert by_name["generate_reply"]["parentSpanId"] == by_name["turn"]["spanId"]
+
+
+def test_flight_recorder_dumps_debug_history_on_error():
+    """Records below the logger level are dumped when the session errors."""
+    with tempfile.TemporaryDirectory() as tmp:
+        logger = _make_logger(
+            "test_flight_recorder",
+            level=LogLevel.INFO,
+            flight_recorder=FlightRecorderConfig(capacity=3, directory=tmp)
+        )
+
+        with logger.context(session_id="session-a"):
+            for i in range(5):
+                logger.debug(f"step {i}", step=i)
+        with logger.context(session_id="session-b"):
+            logger.debug("unrelated")
+        with logger.context(session_id="session-a"):
+            logger.error("generate_reply failed")
+        logger.flight_recorder.flush()
+
+        dumps = os.listdir(tmp)
+        assert len(dumps) == 1 and dumps[0].startswith("session-a-")
+
+        with open(os.path.join(tmp, dumps[0])) as f:
+            records = [json.loads(line) for line in f]
+
+    assert [record["message"] for record in records] == ["step 3", "step 4", "generate_reply failed"]
+    assert records[0]["level"] == "DEBUG"
+    assert records[0]["context"]["session_id"] == "session-a"
+    assert logger.get_metrics()["flight_recorder"]["sessions"] == 2
+
+
+def test_flight_recorder_appends_repeated_dumps_of_a_session_to_one_file():
+    """Errors within the dump interval append to the session's file; the next interval starts a new one."""
+    with tempfile.TemporaryDirectory() as tmp:
+        recorder = FlightRecorder(directory=tmp, dump_interval=60.0)
+        for i in range(5):
+            recorder.record("s1", LogLevel.ERROR, "test", f"failure {i}", None, {})
+            first = recorder.dump("s1")
+        recorder.record("s2", LogLevel.ERROR, "test", "other", None, {})
+        recorder.dump("s2")
+        recorder.flush()
+        assert sorted(os.listdir(tmp))[0] == os.path.basename(first) and len(os.listdir(tmp)) == 2
+        with open(first) as f:
+            assert [json.loads(line)["message"] for line in f] == [f"failure {i}" for i in range(5)]
+
+        recorder.dump_interval = 0.0
+        recorder.record("s1", LogLevel.ERROR, "test", "later", None, {})
+        assert recorder.dump("s1") != first
+        recorder.flush()
+        assert len(os.listdir(tmp)) == 3
+        metrics = recorder.get_metrics()
+        assert metrics["dumps"] == 7 and metrics["dump_files"] == 3 and metrics["pending_dumps"] == 0
+
+
+def test_flight_recorder_bounds_session_memory_in_bytes():
+    """Large payloads are copied truncated, and a session's buffer stays within its byte budget."""
+    recorder = FlightRecorder(capacity=100, max_bytes=20_000, max_value_chars=1000)
+    tools = ["breathing_exercise"]
+    for i in range(50):
+        recorder.record("s1", LogLevel.DEBUG, "test", f"turn {i}", None,
+                        {"transcript": "x" * 100_000, "turn": i, "tools": tools, "history": list(range(10_000))})
+    tools.append("changed later")
+
+    metrics = recorder.get_metrics()
+    assert metrics["buffered_bytes"] <= 20_000 and 0 < metrics["buffered_records"] < 50
+    with tempfile.TemporaryDirectory() as tmp:
+        recorder.directory = tmp
+        filename = recorder.dump("s1")
+        recorder.flush()
+        with open(filename) as f:
+            records = [json.loads(line) for line in f]
+    last = records[-1]["extra"]
+    assert last["turn"] == 49 and last["tools"] == ["breathing_exercise"]
+    assert last["transcript"].startswith("x" * 1000) and len(last["transcript"]) < 1100
+    assert isinstance(last["history"], str) and len(last["history"]) < 1100
+
+
+def test_log_index_follows_rotation():
+    """The index finds a session's records across rotated files and only rescans new bytes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "therapist.log")
+        logger = Logger("test_log_index", LogConfig(
+            json_format=True,
+            handlers=[HandlerConfig(
+                type="rotating",
+                formatter="json",
+                config={"filename": filename, "max_bytes": 20000, "backup_count": 10}
+            )]
+        ))
+
+        def write(start, count):
+            for i in range(start, start + count):
+                with logger.context(session_id=f"session-{i % 5}", room_id="room-1"):
+                    logger.info("turn", turn=i)
+
+        write(0, 100)
+        index = LogIndex(filename)
+        first = index.update()
+        assert first["files"] > 1
+
+        write(100, 50)
+        second = LogIndex(filename).update()
+        assert 0 < second["bytes_scanned"] < first["bytes_scanned"]
+
+        index = LogIndex(filename)
+        turns = [record["extra"]["turn"] for record in index.search(session_id="session-2", room_id="room-1")]
+        assert turns == list(range(2, 150, 5))
+
+
+def test_log_index_rewrites_only_the_sidecars_of_grown_files():
+    """Appending to the active file leaves the rotated files' sidecars alone, and searches read only their keys."""
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "therapist.log")
+        logger = Logger("test_log_index_sidecars", LogConfig(
+            json_format=True,
+            handlers=[HandlerConfig(
+                type="rotating",
+                formatter="json",
+                config={"filename": filename, "max_bytes": 10 ** 9, "backup_count": 10}
+            )]
+        ))
+        handler = logger._logger.handlers[0]
+
+        def write(start, count):
+            for i in range(start, start + count):
+                with logger.context(session_id=f"session-{i % 5}", room_id="room-1"):
+                    logger.info("turn", turn=i)
+
+        def sidecar_inodes():
+            index_dir = f"{filename}.idx"
+            return {name: os.stat(os.path.join(index_dir, name)).st_ino for name in os.listdir(index_dir)}
+
+        def sidecar(path):
+            st = os.stat(path)
+            return f"{st.st_dev}-{st.st_ino}.json"
+
+        write(0, 20)
+        handler.doRollover()
+        write(20, 20)
+        LogIndex(filename).update()
+        before = sidecar_inodes()
+        assert before.keys() == {sidecar(filename), sidecar(filename + ".1")}
+
+        write(40, 10)
+        assert LogIndex(filename).update()["files"] == 1
+        after = sidecar_inodes()
+        assert after[sidecar(filename + ".1")] == before[sidecar(filename + ".1")]
+        assert after[sidecar(filename)] != before[sidecar(filename)]
+
+        index = LogIndex(filename)
+        turns = [record["extra"]["turn"] for record in index.search(session_id="session-3")]
+        assert turns == list(range(3, 50, 5))
+        assert all(set(entry["keys"]) == {"session_id"} for entry in index._files.values())
+
+
+def test_follow_reads_lines_written_just_before_rotation():
+    """Lines appended between the last read and a rotation are not lost."""
+    import py_logger.analytics as analytics
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "worker.log")
+        with open(path, "w") as f:
+            f.write("one\n")
+        rotate = []
+
+        class RotatingOs:
+            """`os` whose next stat first appends to the file and rotates it."""
+            def __getattr__(self, name):
+                return getattr(os, name)
+
+            def stat(self, name):
+                while rotate:
+                    rotate.pop()()
+                return os.stat(name)
+
+        def write_and_rotate():
+            with open(path, "a") as f:
+                f.write("two\nthree")
+            os.rename(path, path + ".1")
+            with open(path, "w") as f:
+                f.write("four\n")
+
+        analytics.os = RotatingOs()
+        try:
+            lines = analytics.follow(path, poll_interval=0.001, from_start=True)
+            assert next(lines) == "one"
+            rotate.append(write_and_rotate)
+            received = [line for line in itertools.islice(lines, 8) if line is not None]
+        finally:
+            analytics.os = os
+        assert received[:3] == ["two", "three", "four"]
+
+def test_quantile_sketch_relative_error():
+    """Sketch quantiles stay within the configured relative accuracy."""
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    values = [i / 1000 for i in range(1, 10001)]
+    for value in values:
+        sketch.add(value)
+
+    for q in (0.5, 0.9, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(sketch.quantile(q) - exact) <= 0.01 * exact
+
+
+def test_log_analyzer_aggregates_performance_records():
+    """Durations are grouped per operation and role; errors and sessions are counted."""
+    analyzer = LogAnalyzer(bucket_seconds=60)
+    entries = [
+        ("INFO", "Performance: generate_reply completed in 0.500s",
+         {"operation": "generate_reply", "duration": 0.5}, "session-1"),
+        ("INFO", "Performance: generate_reply completed in 1.500s",
+         {"operation": "generate_reply", "duration": 1.5}, "session-2"),
+        ("ERROR", "Failed to handle text stream", {}, "session-2"),
+    ]
+    for level, message, extra, session_id in entries:
+        inner = {"timestamp": "2024-01-15T10:30:15.000000", "level": level, "message": message,
+                 "context": {"session_id": session_id, "therapist_role": "sleep"}, "extra": extra}
+        analyzer.process_line(json.dumps({"level": level, "message": json.dumps(inner)}))
+
+    [row] = analyzer.bucket_rows()
+    assert (row["operation"], row["therapist_role"], row["count"]) == ("generate_reply", "sleep", 2)
+    assert row["errors"] == 1 and row["sessions"] == 2
+    assert abs(row["p50"] - 0.5) <= 0.005 and row["max"] == 1.5
+
+
+def test_collector_spools_until_available_then_delivers():
+    """Records logged while the collector is down are replayed once it is up."""
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, "collector.sock")
+        spool_dir = os.path.join(tmp, "spool")
+        filename = os.path.join(tmp, "collected.log")
+        logger = Logger("test_collector", LogConfig(json_format=True, handlers=[HandlerConfig(
+            type="collector",
+            config={"socket_path": socket_path, "spool_dir": spool_dir, "reconnect_interval": 0}
+        )]))
+
+        for i in range(5):
+            logger.info("before collector", turn=i)
+        assert os.path.exists(os.path.join(spool_dir, f"{os.getpid()}.spool"))
+
+        writer = FileHandler(HandlerConfig(type="file", formatter="json", config={"filename": filename}))
+        collector = LogCollector([writer], socket_path=socket_path, spool_dir=spool_dir).start()
+        try:
+            for i in range(5, 10):
+                logger.info("after collector", turn=i)
+            for handler in logger._logger.handlers:
+                handler.close()
+
+            deadline = time.monotonic() + 5
+            while collector.stats["records"] < 10 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            collector.stop()
+
+        with open(filename) as f:
+            turns = [json.loads(json.loads(line)["message"])["extra"]["turn"] for line in f]
+        assert turns == list(range(10))
+
+
+def test_collector_replays_spool_within_pending_bound():
+    """A large spool is replayed a buffer at a time, ahead of records logged during the replay."""
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, "collector.sock")
+        spool_dir = os.path.join(tmp, "spool")
+        filename = os.path.join(tmp, "collected.log")
+        logger = Logger("test_collector_replay", LogConfig(json_format=True, handlers=[HandlerConfig(
+            type="collector",
+            config={"socket_path": socket_path, "spool_dir": spool_dir, "reconnect_interval": 0,
+                    "max_pending_bytes": 8 * 1024}
+        )]))
+        [handler] = logger._logger.handlers
+        buffered = []
+        replay_spool = handler._replay_spool
+
+        def tracked_replay_spool():
+            replay_spool()
+            buffered.append(len(handler._outbuf))
+        handler._replay_spool = tracked_replay_spool
+
+        for i in range(500):
+            logger.info("before collector", turn=i)
+        assert os.path.getsize(os.path.join(spool_dir, f"{os.getpid()}.spool")) > 20 * 8 * 1024
+
+        writer = FileHandler(HandlerConfig(type="file", formatter="json", config={"filename": filename}))
+        collector = LogCollector([writer], socket_path=socket_path, spool_dir=spool_dir).start()
+        try:
+            for i in range(500, 1000):
+                logger.info("after collector", turn=i)
+            handler.close()
+
+            deadline = time.monotonic() + 5
+            while collector.stats["records"] < 1000 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            collector.stop()
+
+        with open(filename) as f:
+            turns = [json.loads(json.loads(line)["message"])["extra"]["turn"] for line in f]
+        assert turns == list(range(1000))
+        assert buffered and max(buffered) <= 8 * 1024
+        assert os.listdir(spool_dir) == []
+
+
+def test_formatters_share_entry_timestamp():
+    """Formatters reuse the UTC timestamp written into the structured entry."""
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "timestamps.log")
+        logger = Logger("test_timestamps", LogConfig(json_format=True, handlers=[HandlerConfig(
+            type="file", formatter="json", config={"filename": filename}
+        )]))
+        logger.info("first")
+        logger.info("second")
+        for handler in logger._logger.handlers:
+            handler.close()
+
+        with open(filename) as f:
+            for line in f:
+                outer = json.loads(line)
+                assert outer["timestamp"] == json.loads(outer["message"])["timestamp"]
+
+
+def test_component_levels_change_at_runtime():
+    """Component loggers share handlers but have independently adjustable levels."""
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "components.log")
+        root = get_logger("test_runtime_levels", LogConfig(level=LogLevel.INFO, json_format=True, handlers=[HandlerConfig(
+            type="file", level=LogLevel.INFO, formatter="json", config={"filename": filename}
+        )]))
+        stream = get_logger("test_runtime_levels.text_stream")
+        assert stream.parent is root and root.get_child("text_stream") is stream
+
+        stream.debug("dropped by logger level")
+        stream.set_level(LogLevel.DEBUG)
+        stream.debug("dropped by handler level")
+        root.set_handler_level("file", LogLevel.DEBUG)
+        with root.context(session_id="s1"):
+            stream.debug("delivered")
+        root.debug("dropped by root level")
+        stream.set_level(None)
+        stream.debug("dropped again")
+        assert stream.get_level() == LogLevel.INFO
+
+        for handler in root._logger.handlers:
+            handler.close()
+        with open(filename) as f:
+            entries = [json.loads(json.loads(line)["message"]) for line in f]
+        assert [(e["logger"], e["message"], e["context"]["session_id"]) for e in entries] == \
+            [("test_runtime_levels.text_stream", "delivered", "s1")]
+
+
+def test_level_controller_applies_file_and_socket_commands():
+    """Level file changes are applied declaratively; the socket accepts commands."""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = get_logger("test_level_control", LogConfig(level=LogLevel.WARNING, handlers=[
+            HandlerConfig(type="console", level=LogLevel.CRITICAL)
+        ]))
+        tools = root.get_child("tools")
+        level_file = os.path.join(tmp, "levels.json")
+        with open(level_file, "w") as f:
+            json.dump({"levels": {"test_level_control.tools": "DEBUG"}, "handlers": {"console": "ERROR"}}, f)
+
+        controller = LevelController(level_file=level_file, socket_path=os.path.join(tmp, "control.sock"),
+                                     poll_interval=0.01).start()
+        try:
+            assert tools.get_level() == LogLevel.DEBUG and root.get_level() == LogLevel.WARNING
+            assert root.get_handler_levels() == {"console": "ERROR"}
+
+            with open(level_file, "w") as f:
+                json.dump({"levels": {}}, f)
+            controller.reload()
+            assert tools.get_level() == LogLevel.WARNING
+            assert root.get_handler_levels() == {"console": "CRITICAL"}
+
+            reply = send_command(controller.socket_path, "set test_level_control INFO")
+            assert reply["ok"] and tools.get_level() == LogLevel.INFO
+            reply = send_command(controller.socket_path, "list")
+            assert reply["levels"]["test_level_control.tools"] == "INFO"
+            assert not send_command(controller.socket_path, "set test_level_control LOUD")["ok"]
+
+            # A socket nobody listens on is skipped and removed by the CLI
+            stale = os.path.join(tmp, "99999.sock")
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.bind(stale)
+            assert control_main(["--dir", tmp, "list"]) == 0 and not os.path.exists(stale)
+        finally:
+            controller.stop()
+
+        # A process's socket is removed when it exits
+        control_dir = os.path.join(tmp, "control")
+        subprocess.run([sys.executable, "-c", "import sys; sys.path.insert(0, sys.argv[1]); "
+                        "from py_logger.control import start_level_control; start_level_control(control_dir=sys.argv[2])",
+                        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), control_dir], check=True)
+        assert os.listdir(control_dir) == []
+
+
+def test_binary_events_round_trip_across_rotation():
+    """Events survive rotation and convert back to structured JSON entries."""
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "events.bin")
+        logger = Logger("test_binary", LogConfig(handlers=[HandlerConfig(
+            type="binary", config={"filename": filename, "max_bytes": 4096, "buffer_bytes": 512}
+        )]))
+        with logger.context(session_id="s1", therapist_role="sleep"):
+            for i in range(200):
+                logger.event("tool_call", tool_name="breathing_exercise", turn=i, duration=i / 10,
+                             success=i % 2 == 0, note=None, detail="x" * 100 if i == 7 else "short")
+        logger.debug("ordinary records are not written")
+        for handler in logger._logger.handlers:
+            handler.close()
+
+        files = [f"{filename}.{i}" for i in range(5, 0, -1) if os.path.exists(f"{filename}.{i}")] + [filename]
+        assert len(files) > 1
+        events = []
+        for path in files:
+            with BinaryEventReader(path) as reader:
+                events.extend(reader.events())
+        turns = [fields["turn"] for _, _, _, _, fields in events]
+        assert turns == list(range(200 - len(turns), 200))
+
+        out = io.StringIO()
+        convert_to_json_lines(files, out)
+        records = [parse_record(line) for line in out.getvalue().splitlines()]
+        record = next(r for r in records if r["extra"]["turn"] == 7)
+        assert record["message"] == "tool_call" and record["level"] == "INFO"
+        assert record["context"] == {"session_id": "s1", "room_id": None, "user_id": None,
+                                     "therapist_role": "sleep"}
+        assert record["extra"] == {"tool_name": "breathing_exercise", "turn": 7, "duration": 0.7,
+                                   "success": False, "note": None, "detail": "x" * 100}
+
+
+def test_redaction_covers_logger_and_stdlib_records():
+    """Sensitive keys and PII values are redacted before reaching any handler."""
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "redacted.log")
+        logger = Logger("test_redaction", LogConfig(json_format=True, handlers=[HandlerConfig(
+            type="file", level=LogLevel.DEBUG, formatter="json", config={"filename": filename}
+        )]))
+        with logger.context(session_id="s1", metadata={"callback": "+1 415-555-2671"}):
+            logger.info("Reply to jane.doe@example.com", api_key="sk-live-123", authToken="abc",
+                        transcript="my number is (415) 555-2671", duration=0.5, tokens_used=12)
+        logging.getLogger("test_redaction.livekit").warning("bearer %s", "Bearer abcdefgh12345678")
+        for handler in logger._logger.handlers:
+            handler.close()
+
+        with open(filename) as f:
+            first, second = [json.loads(line) for line in f]
+        entry = json.loads(first["message"])
+        assert entry["message"] == "Reply to [REDACTED:email]"
+        assert entry["context"]["session_id"] == "s1"
+        assert entry["context"]["metadata"] == {"callback": "[REDACTED:phone]"}
+        assert entry["extra"] == {"api_key": "[REDACTED]", "authToken": "[REDACTED]",
+                                  "transcript": "my number is [REDACTED:phone]",
+                                  "duration": 0.5, "tokens_used": 12}
+        assert second["message"] == "bearer [REDACTED:bearer]"
+
+
+def test_redaction_keeps_numeric_telemetry_fields():
+    """Telemetry keys that merely contain "token" or "key" survive; credential values do not."""
+    redactor = Redactor()
+    telemetry = {"time_to_first_token": 0.42, "first_token": 0.35, "token_count": 120, "key_count": 3,
+                 "pin_count": 1, "auth_ok": True, "tokens_used": 12, "tool_result_tokens": 64,
+                 "access_token": 12345, "metadata": {"password": None}}
+    assert redactor.redact_mapping(telemetry) == telemetry
+
+    secrets = {"api_key": "sk-x", "access_token": "abc", "x-api-key": "abc", "LIVEKIT_API_SECRET": "s",
+               "password": "hunter2", "token": "t", "key": "k", "pin": "1234", "sessionCookie": b"c"}
+    assert redactor.redact_mapping(secrets) == {key: REDACTED for key in secrets}
+    assert Redactor(extra_keys=["diagnosis"]).redact_mapping({"patient_diagnosis": "x"}) == {
+        "patient_diagnosis": REDACTED}
+
+
+def test_phone_pattern_runs_only_on_phone_shaped_strings():
+    """Digits alone do not run the value patterns; phone-shaped strings still get redacted."""
+    redactor = Redactor()
+    plain = ["user-42", "Turn 17 took 0.734 s", "2026-10-19T13:57:32.568218", "room 1a2b3c4d, 312 chars",
+             "epoch 1760882252"]
+    assert [redactor.redact_text(text) for text in plain] == plain
+    assert not redactor._compiled
+    for number in ("+1 415-555-2671", "(415) 555-2671", "415.555.2671", "+1 (415) 555 2671"):
+        assert redactor.redact_text(f"call {number} today") == "call [REDACTED:phone] today", number
+
+
+def test_redacted_context_follows_changes_to_the_context():
+    """A context changed after it was first logged is logged with its current values."""
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "context.log")
+        logger = Logger("test_context_cache", LogConfig(json_format=True, handlers=[HandlerConfig(
+            type="file", level=LogLevel.DEBUG, formatter="json", config={"filename": filename}
+        )]))
+        context = LogContext(session_id="s1")
+        logger.set_context(context)
+        logger.info("first")
+        context.request_id = "req-2"
+        context.metadata["turn"] = 2
+        logger.info("second")
+        context.metadata["email"] = "jane.doe@example.com"
+        logger.info("third")
+        for handler in logger._logger.handlers:
+            handler.close()
+
+        with open(filename) as f:
+            contexts = [json.loads(json.loads(line)["message"])["context"] for line in f]
+        assert [(c["request_id"], c["metadata"]) for c in contexts] == [
+            (None, {}), ("req-2", {"turn": 2}), ("req-2", {"turn": 2, "email": "[REDACTED:email]"})]
+
+
+def test_exception_storms_are_fingerprinted_and_suppressed():
+    """Identical failures log one traceback per window, then counters and a summary."""
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "errors.log")
+        logger = Logger("test_fingerprints", LogConfig(json_format=True, error_window=60.0, handlers=[
+            HandlerConfig(type="file", level=LogLevel.DEBUG, formatter="json", config={"filename": filename})
+        ]))
+
+        def connect(attempt):
+            raise ConnectionError(f"connection reset (attempt {attempt})")
+
+        for attempt in range(100):
+            try:
+                connect(attempt)
+            except ConnectionError as e:
+                logger.log_exception("Realtime connection failed", e)
+        try:
+            {}["missing"]
+        except KeyError as e:
+            logger.log_exception("Lookup failed", e)
+        logger.flush_error_summaries()
+        for handler in logger._logger.handlers:
+            handler.close()
+
+        with open(filename) as f:
+            entries = [json.loads(json.loads(line)["message"]) for line in f]
+        storm = [e for e in entries if e["extra"].get("exception_type") == "ConnectionError"]
+        assert [e["extra"]["occurrences"] for e in storm] == [1, 2, 4, 8, 16, 32, 64]
+        assert "Traceback" in storm[0]["extra"]["traceback"] and "in connect" in storm[0]["extra"]["traceback"]
+        assert all("traceback" not in e["extra"] for e in storm[1:])
+        [summary] = [e for e in entries if e["level"] == "WARNING"]
+        assert summary["extra"]["occurrences"] == 100
+
+        metrics = logger.get_metrics()["errors"]["fingerprints"]
+        assert sorted(stats["total"] for stats in metrics.values()) == [1, 100]
+        assert storm[0]["extra"]["fingerprint"] in metrics
+
+
+def test_error_summary_is_logged_after_a_storm_goes_quiet():
+    """A storm's summary is written by the timer, without a later error or a flush."""
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "errors.log")
+        logger = Logger("test_error_timer", LogConfig(json_format=True, error_window=0.05, handlers=[
+            HandlerConfig(type="file", level=LogLevel.DEBUG, formatter="json", config={"filename": filename})
+        ]))
+        for attempt in range(10):
+            try:
+                raise TimeoutError("model timed out")
+            except TimeoutError as e:
+                logger.log_exception("Model call failed", e)
+
+        def summaries():
+            with open(filename) as f:
+                entries = [json.loads(json.loads(line)["message"]) for line in f]
+            return [e for e in entries if e["level"] == "WARNING"]
+
+        deadline = time.monotonic() + 5
+        while not summaries() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        [summary] = summaries()
+        assert summary["extra"]["occurrences"] == 10
+        deadline = time.monotonic() + 5
+        while logger._summary_timer is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert logger._summary_timer is None and logger.error_tracker.open_windows() == 0
+        for handler in logger._logger.handlers:
+            handler.close()
+
+
+def test_shipping_spools_while_endpoint_is_down_then_delivers():
+    """Batches are spooled while the endpoint fails and replayed once it accepts them."""
+    received = []
+    state = {"available": False}
+
+    class Collector(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            if not state["available"]:
+                self.send_response(503)
+            else:
+                assert self.headers["Content-Encoding"] == "gzip"
+                received.extend(gzip.decompress(body).decode().splitlines())
+                self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Collector)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            logger = Logger("test_shipping", LogConfig(json_format=True, handlers=[HandlerConfig(
+                type="shipping", formatter="json",
+                config={"url": f"http://127.0.0.1:{server.server_port}/ingest", "batch_size": 10,
+                        "flush_interval": 0.01, "max_retries": 2, "backoff_base": 0.01, "backoff_max": 0.02,
+                        "spool_dir": tmp, "max_spool_bytes": 64 * 1024}
+            )]))
+            [handler] = logger._logger.handlers
+
+            for i in range(25):
+                logger.info("before endpoint", turn=i)
+            deadline = time.monotonic() + 5
+            while handler.get_metrics()["spool_records"] < 25 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert handler.get_metrics()["spool_records"] == 25 and not received
+
+            state["available"] = True
+            for i in range(25, 40):
+                logger.info("after endpoint", turn=i)
+            while len(received) < 40 and time.monotonic() < deadline + 5:
+                time.sleep(0.01)
+            handler.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        turns = sorted(json.loads(json.loads(line)["message"])["extra"]["turn"] for line in received)
+        assert turns == list(range(40))
+        [metrics] = logger.get_metrics()["handlers"]
+        assert metrics["shipped_records"] == 40 and metrics["spool_records"] == 0
+        assert metrics["failed_requests"] >= 2 and metrics["delivery_latency_p99"] is not None
+        assert not os.listdir(tmp)
+
+
+def test_adaptive_levels_step_down_under_load_and_restore():
+    """Overload steps INFO -> WARNING -> ERROR with markers; calm restores one step at a time."""
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "adaptive.log")
+        events_file = os.path.join(tmp, "events.bin")
+        logger = Logger("test_adaptive", LogConfig(json_format=True, handlers=[
+            HandlerConfig(type="file", level=LogLevel.DEBUG, formatter="json", config={"filename": filename}),
+            HandlerConfig(type="binary", config={"filename": events_file}),
+        ]))
+        controller = AdaptiveLevelController(logger, AdaptiveLevelConfig(
+            lag_threshold=0.1, queue_threshold=100, restore_after=5.0, escalate_after=2.0))
+        try:
+            assert controller.evaluate(lag=0.05, queue_depth=10, now=0.0) == 0
+            assert controller.evaluate(lag=0.0, queue_depth=150, now=1.0) == 1
+            logger.info("dropped while degraded")
+            logger.warning("kept while degraded")
+            assert controller.evaluate(lag=0.3, queue_depth=0, now=2.0) == 1
+            assert controller.evaluate(lag=0.3, queue_depth=0, now=3.0) == 2
+            logger.warning("dropped at error")
+            logger.event("voice_turn", turn=1, first_token=0.4)
+            # Between the restore ratio and the threshold neither direction moves
+            assert controller.evaluate(lag=0.07, queue_depth=0, now=4.0) == 2
+            assert controller.evaluate(lag=0.01, queue_depth=0, now=5.0) == 2
+            assert controller.evaluate(lag=0.01, queue_depth=0, now=10.0) == 1
+            assert controller.evaluate(lag=0.01, queue_depth=0, now=15.0) == 0
+            logger.info("kept after restore")
+        finally:
+            controller.stop()
+        assert logging.root.manager.disable == logging.NOTSET
+        for handler in logger._logger.handlers:
+            handler.close()
+
+        with open(filename) as f:
+            entries = [json.loads(json.loads(line)["message"]) for line in f]
+        assert [e["message"] for e in entries] == [
+            "Log verbosity lowered: INFO -> WARNING", "kept while degraded",
+            "Log verbosity lowered: WARNING -> ERROR",
+            "Log verbosity restored: ERROR -> WARNING", "Log verbosity restored: WARNING -> INFO",
+            "kept after restore",
+        ]
+        assert entries[0]["extra"]["queue_depth"] == 150 and entries[2]["extra"]["lag"] == 0.3
+        with BinaryEventReader(events_file) as reader:
+            assert [(name, fields) for _, name, _, _, fields in reader.events()] == [
+                ("voice_turn", {"turn": 1, "first_token": 0.4})]
+
+    async def stall():
+        monitor = EventLoopLagMonitor(asyncio.get_running_loop())
+        monitor.sample()
+        time.sleep(0.05)  # blocks the loop with the probe pending
+        stalled = monitor.sample()
+        await asyncio.sleep(0)
+        return stalled, monitor.lag
+
+    stalled, measured = asyncio.run(stall())
+    assert stalled >= 0.05 and measured >= 0.05
+
+
+def run_all_tests():
+    """Run all tests."""
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
+    print(f"Tests passed: {len(tests)}/{len(tests)}")
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,51 @@
+"""
+Shared UTC timestamp formatting.
+
+Each record gets one ISO-8601 UTC timestamp, produced once and reused by
+the logger and every formatter. The "YYYY-MM-DDTHH:MM:SS" prefix only
+changes once per second, so it is cached and only the microseconds are
+formatted per record.
+"""
+
+import logging
+import time
+from typing import Tuple
+
+
+class TimestampCache:
+    """Formats epoch seconds as naive ISO-8601 UTC with a cached second prefix."""
+
+    def __init__(self):
+        # (whole second, "YYYY-MM-DDTHH:MM:SS."); replaced as a single tuple so
+        # concurrent readers never see a mismatched pair
+        self._cached: Tuple[int, str] = (-1, "")
+
+    def format(self, created: float) -> str:
+        """Format an epoch time, e.g. "2024-01-15T10:30:15.123456"."""
+        second = int(created)
+        cached = self._cached
+        if cached[0] != second:
+            cached = (second, time.strftime("%Y-%m-%dT%H:%M:%S.", time.gmtime(second)))
+            self._cached = cached
+        return cached[1] + "%06d" % ((created - second) * 1000000)
+
+
+_cache = TimestampCache()
+
+
+def format_timestamp(created: float) -> str:
+    """Format an epoch time with the shared cache."""
+    return _cache.format(created)
+
+
+def record_timestamp(record: logging.LogRecord) -> str:
+    """
+    Get the record's UTC timestamp, formatting it at most once.
+
+    Records created by `Logger` already carry the timestamp used in the
+    structured entry; other records are stamped from `record.created`.
+    """
+    timestamp = record.__dict__.get('utc_timestamp')
+    if timestamp is None:
+        timestamp = record.utc_timestamp = _cache.format(record.created)
+    return timestamp
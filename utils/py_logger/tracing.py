@@ -0,0 +1,277 @@
+"""
+Lightweight span tracing for the logging system.
+
+Spans carry parent IDs through contextvars so nested operations (across
+awaits and tasks) link up automatically. Completed spans are kept in a
+bounded ring buffer and can be exported as Chrome Trace / Perfetto JSON
+or as OTLP-style JSON for offline analysis.
+"""
+
+import asyncio
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, List
+
+
+# Offset used to turn monotonic perf_counter readings into wall-clock nanoseconds
+_EPOCH_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
+
+# Marker stored in the context when the enclosing trace was not sampled,
+# so child spans can bail out without generating IDs or timestamps.
+_UNSAMPLED = object()
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("py_logger_current_span", default=None)
+
+
+@dataclass
+class Span:
+    """A single timed operation within a trace."""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: int = 0
+    track: int = 0
+    status: str = "ok"
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        """Duration of the span in seconds."""
+        return max(self.end_ns - self.start_ns, 0) / 1e9
+
+    def set_attribute(self, key: str, value: Any):
+        """Attach an attribute to the span."""
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert span to dictionary."""
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start_ns': self.start_ns + _EPOCH_OFFSET_NS,
+            'end_ns': self.end_ns + _EPOCH_OFFSET_NS,
+            'duration': self.duration,
+            'status': self.status,
+            'attributes': self.attributes
+        }
+
+
+def _current_track() -> int:
+    """Identify the execution track (asyncio task or thread) of the caller."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return id(task) if task is not None else threading.get_ident()
+
+
+def get_current_span() -> Optional[Span]:
+    """Get the active span for the current context, if it is being recorded."""
+    span = _current_span.get()
+    return span if isinstance(span, Span) else None
+
+
+class Tracer:
+    """
+    Span recorder with head-based sampling.
+
+    The sampling decision is taken once per trace at the root span and
+    inherited by every child, so a trace is either recorded in full or
+    costs a single contextvar lookup per span.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, buffer_size: int = 4096,
+                 service_name: str = "ai_therapist"):
+        self.sample_rate = sample_rate
+        self.service_name = service_name
+        self._spans: deque = deque(maxlen=buffer_size)
+        self._dropped = 0
+
+    def configure(self, sample_rate: Optional[float] = None, buffer_size: Optional[int] = None):
+        """Update sampling and buffer settings."""
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if buffer_size is not None and buffer_size != self._spans.maxlen:
+            self._spans = deque(self._spans, maxlen=buffer_size)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Context manager that records a span around the enclosed block."""
+        parent = _current_span.get()
+
+        if parent is _UNSAMPLED or (parent is None and not self._should_sample()):
+            token = _current_span.set(_UNSAMPLED)
+            try:
+                yield None
+            finally:
+                _current_span.reset(token)
+            return
+
+        if parent is None:
+            trace_id = '%032x' % random.getrandbits(128)
+            parent_id = None
+        else:
+            trace_id = parent.trace_id
+            parent_id = parent.span_id
+
+        span = Span(
+            name=name,
+            trace_id=trace_id,
+            span_id='%016x' % random.getrandbits(64),
+            parent_id=parent_id,
+            start_ns=time.perf_counter_ns(),
+            track=_current_track(),
+            attributes=attributes
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attributes['exception_type'] = type(e).__name__
+            raise
+        finally:
+            span.end_ns = time.perf_counter_ns()
+            _current_span.reset(token)
+            self._record(span)
+
+    def _should_sample(self) -> bool:
+        """Decide whether a new trace should be recorded."""
+        rate = self.sample_rate
+        if rate >= 1.0:
+            return True
+        if rate <= 0.0:
+            return False
+        return random.random() < rate
+
+    def _record(self, span: Span):
+        """Store a completed span in the ring buffer."""
+        if len(self._spans) == self._spans.maxlen:
+            self._dropped += 1
+        self._spans.append(span)
+
+    def get_spans(self) -> List[Span]:
+        """Get a snapshot of the completed spans."""
+        return list(self._spans)
+
+    def clear(self):
+        """Discard all recorded spans."""
+        self._spans.clear()
+        self._dropped = 0
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get tracer statistics."""
+        return {
+            'sample_rate': self.sample_rate,
+            'buffered_spans': len(self._spans),
+            'buffer_size': self._spans.maxlen,
+            'dropped_spans': self._dropped
+        }
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Build a Chrome Trace Event Format document from recorded spans."""
+        pid = os.getpid()
+        tracks: Dict[int, int] = {}
+        events = []
+
+        for span in self.get_spans():
+            tid = tracks.setdefault(span.track, len(tracks) + 1)
+            args = dict(span.attributes)
+            args.update(trace_id=span.trace_id, span_id=span.span_id,
+                        parent_id=span.parent_id, status=span.status)
+            events.append({
+                'name': span.name,
+                'cat': self.service_name,
+                'ph': 'X',
+                'ts': (span.start_ns + _EPOCH_OFFSET_NS) / 1000,
+                'dur': max(span.end_ns - span.start_ns, 0) / 1000,
+                'pid': pid,
+                'tid': tid,
+                'args': args
+            })
+
+        for tid in tracks.values():
+            events.append({
+                'name': 'thread_name',
+                'ph': 'M',
+                'pid': pid,
+                'tid': tid,
+                'args': {'name': f"track-{tid}"}
+            })
+
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Build an OTLP/JSON ExportTraceServiceRequest from recorded spans."""
+        spans = []
+        for span in self.get_spans():
+            entry = {
+                'traceId': span.trace_id,
+                'spanId': span.span_id,
+                'name': span.name,
+                'kind': 1,
+                'startTimeUnixNano': str(span.start_ns + _EPOCH_OFFSET_NS),
+                'endTimeUnixNano': str(span.end_ns + _EPOCH_OFFSET_NS),
+                'attributes': [_otlp_attribute(k, v) for k, v in span.attributes.items()],
+                'status': {'code': 2 if span.status == "error" else 1}
+            }
+            if span.parent_id:
+                entry['parentSpanId'] = span.parent_id
+            spans.append(entry)
+
+        return {
+            'resourceSpans': [{
+                'resource': {
+                    'attributes': [
+                        _otlp_attribute('service.name', self.service_name),
+                        _otlp_attribute('process.pid', os.getpid())
+                    ]
+                },
+                'scopeSpans': [{
+                    'scope': {'name': 'py_logger.tracing'},
+                    'spans': spans
+                }]
+            }]
+        }
+
+    def export_chrome_trace(self, filename: str) -> str:
+        """Write recorded spans as Chrome Trace JSON (loadable in Perfetto)."""
+        return _write_json(filename, self.to_chrome_trace())
+
+    def export_otlp_json(self, filename: str) -> str:
+        """Write recorded spans as OTLP-style JSON."""
+        return _write_json(filename, self.to_otlp())
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    """Encode a key/value pair as an OTLP attribute."""
+    if isinstance(value, bool):
+        encoded = {'boolValue': value}
+    elif isinstance(value, int):
+        encoded = {'intValue': str(value)}
+    elif isinstance(value, float):
+        encoded = {'doubleValue': value}
+    else:
+        encoded = {'stringValue': str(value)}
+    return {'key': key, 'value': encoded}
+
+
+def _write_json(filename: str, document: Dict[str, Any]) -> str:
+    """Write a JSON document, creating the parent directory if needed."""
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(document, f)
+    return filename